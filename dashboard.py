@@ -253,6 +253,14 @@ class DashboardState:
         self.planner_thinking_since = 0.0
         self.completion_times: deque[float] = deque(maxlen=300)
 
+        # Sandbox phase latencies (ms), most recent per phase
+        self.phase_ms: dict[str, deque[int]] = {}
+        # Spawner's adaptive concurrent-create limit, as of the latest create
+        self.create_limit: float | None = None
+        self.hedged_creates = 0
+        self.hedge_wins = 0
+        self.stalled = 0
+
     def _derive_counts_from_tree(self):
         """Derive task counts from tree state for real-time updates between Monitor polls."""
         running = 0
@@ -476,6 +484,18 @@ class DashboardState:
                 else:
                     self._feed(ts_str, f"  \u25b8 {task_id}  {detail}", "dim")
 
+            elif msg == "Sandbox phase":
+                phase = data.get("phase", "")
+                duration = data.get("durationMs")
+                if phase and isinstance(duration, (int, float)):
+                    self.phase_ms.setdefault(phase, deque(maxlen=200)).append(int(duration))
+                if phase == "create" and isinstance(data.get("createLimit"), (int, float)):
+                    self.create_limit = data["createLimit"]
+                if phase == "create" and data.get("hedged"):
+                    self.hedged_creates += 1
+                    if data.get("hedgeWon"):
+                        self.hedge_wins += 1
+
             # -- Timeouts / errors ------------------------------------------
             elif msg == "Worker timed out":
                 tid = data.get("taskId", "")
@@ -488,6 +508,10 @@ class DashboardState:
                     )
                 self._feed(ts_str, f"  TIMEOUT  {tid}", "bold red")
 
+            elif msg == "Task stalled":
+                self.stalled += 1
+                self._feed(ts_str, f"  STALL  {data.get('taskId', '')}", "bold yellow")
+
             elif level == "error":
                 if agent_role == "planner" or agent_role == "root-planner":
                     self.planner_thinking = False
@@ -547,8 +571,20 @@ class DashboardState:
                 "planner_thinking_since": self.planner_thinking_since,
                 "recent_velocity": self._compute_velocity(),
                 "sparkline": self._compute_sparkline(),
+                "phase_p50": self._compute_phase_p50(),
+                "create_limit": self.create_limit,
+                "hedged_creates": self.hedged_creates,
+                "hedge_wins": self.hedge_wins,
+                "stalled": self.stalled,
             }
 
+    def _compute_phase_p50(self) -> dict[str, int]:
+        return {
+            phase: sorted(samples)[len(samples) // 2]
+            for phase, samples in self.phase_ms.items()
+            if samples
+        }
+
     def _compute_velocity(self) -> float:
         now = time.time()
         cutoff = now - 60
@@ -692,6 +728,18 @@ def render_metrics(s: dict[str, Any]) -> Panel:
     tbl.add_row("Velocity", f"[bright_green]{sparkline}[/] [bright_white]{velocity:.1f}[/][dim]/min[/]")
     tbl.add_row("Running", f"[bright_yellow]{s['active']}[/]" if s['active'] else "[dim]0[/]")
 
+    phase_p50 = s.get("phase_p50", {})
+    for phase, label in (("create", "Create p50"), ("clone", "Clone p50"), ("agent_end", "Agent p50"),
+                         ("terminate", "Teardown p50")):
+        if phase in phase_p50:
+            tbl.add_row(label, f"[bright_white]{phase_p50[phase] / 1000:.1f}s[/]")
+    if s.get("create_limit") is not None:
+        tbl.add_row("Create limit", f"[bright_white]{s['create_limit']:g}[/]")
+    if s.get("hedged_creates"):
+        tbl.add_row("Hedged", f"[bright_white]{s['hedged_creates']}[/] [dim]({s['hedge_wins']} won)[/]")
+    if s.get("stalled"):
+        tbl.add_row("Stalled", f"[bright_white]{s['stalled']}[/]")
+
     return Panel(tbl, title="[bold]METRICS[/]", border_style="bright_blue")
 
 
@@ -0,0 +1,287 @@
+"""
+Sandbox Create Admission Control
+================================
+
+When Modal is slow or failing, firing ``Sandbox.create`` for every dispatch
+only deepens the overload: creates time out, ``run_task`` returns failure
+stubs, the planner retries, and even more creates pile up. The admission
+controller sits in front of every Modal create (``run_task``, the warm pool,
+prefetch) and bounds how many may be in flight at once:
+
+    additive increase        a create that succeeds within the target latency
+                             raises the limit by 1/limit (≈ +1 per limit creates)
+    multiplicative decrease  the sliding window shows congestion — its error
+                             rate above the maximum, or its p90 create latency
+                             above the target — and the limit halves (at most
+                             once per cooldown)
+
+Only creates finished since the last decrease count towards the next one, and
+the window needs a few samples first, so one slow or failed create is not a
+congestion signal. Only provider and timeout errors count as errors; a create
+that fails on the client side (bad arguments, auth) says nothing about load.
+
+Creates beyond the limit wait in the spawner, which holds the orchestrator's
+dispatch slot instead of turning into a failure and a retry. Coroutines
+(``admit_async``) wait on the event loop, not on a thread each. A create that
+waits longer than ``SANDBOX_ADMISSION_MAX_WAIT_S`` fails as before.
+
+The limit is shared by everything in one process, so it matters for the
+spawner daemon; a one-shot ``spawn_sandbox.py`` only ever has one create in
+flight. The current limit is reported on every ``create`` phase event
+(``createLimit``) and in ``snapshot()``, along with the sliding-window error
+rate and latency percentiles.
+
+Configuration (environment):
+    SANDBOX_ADMISSION              "0" disables admission control (default on)
+    SANDBOX_CREATE_LIMIT           initial concurrent-create limit (default 32)
+    SANDBOX_CREATE_LIMIT_MIN       floor of the limit (default 2)
+    SANDBOX_CREATE_LIMIT_MAX       ceiling of the limit (default 256)
+    SANDBOX_CREATE_TARGET_S        p90 create latency above which the limit backs off (default 30)
+    SANDBOX_CREATE_MAX_ERROR_RATE  window error rate above which the limit backs off (default 0.1)
+    SANDBOX_ADMISSION_MAX_WAIT_S   longest a create waits for admission (default 600)
+
+Usage:
+    from infra.admission import admission_controller
+
+    with admission_controller().admit():
+        sb = modal.Sandbox.create(...)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Iterator
+
+WINDOW_S = 60.0
+COOLDOWN_S = 5.0
+# Creates the window needs (since the last decrease) before it can signal congestion.
+MIN_WINDOW_SAMPLES = 5
+# Failures that say the provider is overloaded. Anything else (bad arguments,
+# auth, a missing image) is the caller's problem and does not move the limit.
+CONGESTION_ERRORS = frozenset({
+    "TimeoutError", "SandboxTimeoutError", "ConnectionError", "RemoteError",
+    "InternalFailure", "ResourceExhaustedError", "GRPCError", "StreamTerminatedError",
+})
+
+
+class AdmissionTimeout(RuntimeError):
+    """A create waited longer than the admission limit allows."""
+
+
+def admission_config_from_env() -> dict:
+    return {
+        "enabled": os.environ.get("SANDBOX_ADMISSION", "1") != "0",
+        "initial": float(os.environ.get("SANDBOX_CREATE_LIMIT", "32")),
+        "min_limit": float(os.environ.get("SANDBOX_CREATE_LIMIT_MIN", "2")),
+        "max_limit": float(os.environ.get("SANDBOX_CREATE_LIMIT_MAX", "256")),
+        "target_s": float(os.environ.get("SANDBOX_CREATE_TARGET_S", "30")),
+        "max_error_rate": float(os.environ.get("SANDBOX_CREATE_MAX_ERROR_RATE", "0.1")),
+        "max_wait_s": float(os.environ.get("SANDBOX_ADMISSION_MAX_WAIT_S", "600")),
+    }
+
+
+def is_congestion_error(error: BaseException) -> bool:
+    """A provider-side or timeout failure (builtin, modal or grpclib), as opposed to a client error."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    cls = type(error)
+    return cls.__module__.startswith(("modal", "grpclib")) and cls.__name__ in CONGESTION_ERRORS
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class AdmissionController:
+    """AIMD limit on concurrent sandbox creates, driven by create latency and errors."""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        initial: float = 32,
+        min_limit: float = 2,
+        max_limit: float = 256,
+        target_s: float = 30,
+        max_error_rate: float = 0.1,
+        max_wait_s: float = 600,
+    ):
+        self.enabled = enabled
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_s = target_s
+        self.max_error_rate = max_error_rate
+        self.max_wait_s = max_wait_s
+        self.limit = min(max_limit, max(min_limit, initial))
+        self.in_flight = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+        # (loop, future) of async waiters; release() wakes them thread-safely.
+        self._async_waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = set()
+        self._window: deque[tuple[float, float, bool]] = deque()
+        self._last_decrease = 0.0
+        self.stats = {"admitted": 0, "timedOut": 0, "decreases": 0, "clientErrors": 0}
+
+    # -- admission ------------------------------------------------------------
+
+    def acquire(self) -> None:
+        if not self.enabled:
+            return
+        deadline = time.monotonic() + self.max_wait_s
+        with self._cond:
+            self.waiting += 1
+            try:
+                while self.in_flight >= int(self.limit):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._timed_out()
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            self.stats["admitted"] += 1
+
+    async def acquire_async(self) -> None:
+        """
+        ``acquire`` for coroutines, without parking a thread: the waiter
+        sleeps on a future that ``release`` resolves and then re-checks the
+        limit. The slot is taken without an await in between, so a cancelled
+        waiter never holds one.
+        """
+        if not self.enabled:
+            return
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + self.max_wait_s
+        with self._cond:
+            self.waiting += 1
+        try:
+            while True:
+                with self._cond:
+                    if self.in_flight < int(self.limit):
+                        self.in_flight += 1
+                        self.stats["admitted"] += 1
+                        return
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._timed_out()
+                    waiter = (loop, loop.create_future())
+                    self._async_waiters.add(waiter)
+                try:
+                    await asyncio.wait_for(waiter[1], remaining)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    with self._cond:
+                        self._async_waiters.discard(waiter)
+        finally:
+            with self._cond:
+                self.waiting -= 1
+
+    def _timed_out(self) -> AdmissionTimeout:
+        self.stats["timedOut"] += 1
+        return AdmissionTimeout(
+            f"sandbox create not admitted within {self.max_wait_s:.0f}s "
+            f"(limit {int(self.limit)}, in flight {self.in_flight})"
+        )
+
+    def release(self, latency_s: float, ok: bool, congestion: bool = True) -> None:
+        """
+        Return a slot. A failed create feeds the window only if ``congestion``
+        (see ``is_congestion_error``); client errors just free the slot.
+        """
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._cond:
+            self.in_flight -= 1
+            if ok or congestion:
+                self._window.append((now, latency_s, ok))
+            else:
+                self.stats["clientErrors"] += 1
+            while self._window and now - self._window[0][0] > WINDOW_S:
+                self._window.popleft()
+            if self._congested():
+                if now - self._last_decrease >= COOLDOWN_S:
+                    # One halving per cooldown: a burst of failures from the
+                    # same outage is one congestion signal, not many.
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self._last_decrease = now
+                    self.stats["decreases"] += 1
+            elif ok and latency_s <= self.target_s:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, set()
+        for waiter_loop, future in waiters:
+            try:
+                waiter_loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                pass  # loop closed
+
+    def _congested(self) -> bool:
+        """Error rate or p90 latency of the creates since the last decrease is over its bound."""
+        recent = [(latency, ok) for t, latency, ok in self._window if t > self._last_decrease]
+        if len(recent) < MIN_WINDOW_SAMPLES:
+            return False
+        errors = sum(1 for _, ok in recent if not ok)
+        latencies = [latency for latency, ok in recent if ok]
+        if errors / len(recent) > self.max_error_rate:
+            return True
+        return bool(latencies) and _percentile(latencies, 0.9) > self.target_s
+
+    @contextmanager
+    def admit(self) -> Iterator[None]:
+        """Hold a create slot for the block; its duration and outcome feed the limit."""
+        self.acquire()
+        t0 = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            self.release(time.monotonic() - t0, False, is_congestion_error(e))
+            raise
+        self.release(time.monotonic() - t0, True)
+
+    @asynccontextmanager
+    async def admit_async(self) -> AsyncIterator[None]:
+        await self.acquire_async()
+        t0 = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            self.release(time.monotonic() - t0, False, is_congestion_error(e))
+            raise
+        self.release(time.monotonic() - t0, True)
+
+    # -- metrics --------------------------------------------------------------
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            window = list(self._window)
+            latencies = sorted(latency for _, latency, _ in window)
+            errors = sum(1 for _, _, ok in window if not ok)
+            return {
+                "limit": round(self.limit, 1),
+                "inFlight": self.in_flight,
+                "waiting": self.waiting,
+                "windowCreates": len(window),
+                "errorRate": round(errors / len(window), 3) if window else 0.0,
+                "p50LatencyS": round(_percentile(latencies, 0.5), 2) if latencies else None,
+                "p90LatencyS": round(_percentile(latencies, 0.9), 2) if latencies else None,
+                **self.stats,
+            }
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+@lru_cache(maxsize=1)
+def admission_controller() -> AdmissionController:
+    """The process-wide controller shared by every Modal create."""
+    return AdmissionController(**admission_config_from_env())
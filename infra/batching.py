@@ -0,0 +1,80 @@
+"""
+Task Batching
+=============
+
+For a task that touches a handful of lines, sandbox create, clone and
+worker-runner's bootstrap cost more than the edit itself. A batch payload
+carries K tasks that share one sandbox:
+
+    {"task": <first task>, "batch": [<first task>, <second task>, ...], ...}
+
+Everything else in the payload (system prompt, repo, LLM config) is shared.
+``run_batch`` creates and clones once and checks out the first task's
+branch; worker-runner then runs the tasks back to back, one agent session
+each, resetting the repo between tasks and branching every task from the
+same base SHA. Each result lands in ``/workspace/results/<taskId>.json``;
+the spawner pushes (or bundles) every branch and returns one handoff per
+task, in batch order.
+
+Tasks in a batch must be compatible: no conflict-fix tasks (they branch from
+another branch, not the shared base), distinct branches and non-overlapping
+scopes. Scope paths are normalized the way sparse checkout reads them
+(``infra.sparse_checkout.scope_path``: ``./a.ts`` is ``a.ts``), and a
+directory or glob overlaps every path under it (``src/`` overlaps
+``src/a.ts``). The orchestrator's ``TaskBatcher`` forms batches from
+predicted task duration (packages/orchestrator/src/task-batcher.ts);
+``check_batch`` is the spawner's guard.
+
+Usage:
+    from infra.batching import batch_tasks, check_batch
+
+    tasks = batch_tasks(payload)     # [payload["task"]] for an ordinary payload
+    check_batch(tasks)               # ValueError if the tasks cannot share a sandbox
+"""
+
+from __future__ import annotations
+
+from infra.sparse_checkout import scope_path
+
+RESULTS_DIR = "/workspace/results"
+SINGLE_RESULT = "/workspace/result.json"
+
+
+def is_batch(payload: dict) -> bool:
+    return len(payload.get("batch") or []) > 1
+
+
+def batch_tasks(payload: dict) -> list[dict]:
+    return list(payload.get("batch") or []) or [payload["task"]]
+
+
+def scope_paths_overlap(a: str, b: str) -> bool:
+    """Same path, or one is a directory (or the repo root) containing the other."""
+    a, b = scope_path(a), scope_path(b)
+    return a == b or not a or not b or b.startswith(a + "/") or a.startswith(b + "/")
+
+
+def check_batch(tasks: list[dict]) -> None:
+    branches: set[str] = set()
+    scoped: list[tuple[str, str]] = []  # (task id, scope path) of earlier tasks
+    for task in tasks:
+        if task.get("conflictSourceBranch"):
+            raise ValueError(f"conflict-fix task {task['id']} cannot be batched")
+        if task["branch"] in branches:
+            raise ValueError(f"branch {task['branch']} appears twice in the batch")
+        branches.add(task["branch"])
+        paths = [p for p in task.get("scope") or [] if p.strip()]
+        for path in paths:
+            for other_id, other in scoped:
+                if scope_paths_overlap(path, other):
+                    raise ValueError(f"tasks {other_id} and {task['id']} have overlapping scopes {other} and {path}")
+        scoped += [(task["id"], path) for path in paths]
+
+
+def batch_scope(tasks: list[dict]) -> dict:
+    """A task-shaped dict whose scope is every task's scope (for sparse patterns)."""
+    return {"scope": [path for task in tasks for path in task.get("scope") or []]}
+
+
+def result_path(task_id: str, batched: bool) -> str:
+    return f"{RESULTS_DIR}/{task_id}.json" if batched else SINGLE_RESULT
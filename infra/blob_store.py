@@ -0,0 +1,110 @@
+"""
+Content-addressed Payload Blobs
+===============================
+
+Large fields that are identical across tasks — above all the worker
+``systemPrompt`` — are written once to a shared blob store keyed by SHA-256
+and replaced in the task payload by a reference:
+
+    {"systemPrompt": "<12 KB>", ...}
+        → {"blobRefs": {"systemPrompt": "9f86d081884c7d65..."}, ...}
+
+worker-runner resolves ``blobRefs`` from ``/cache/blobs/<sha256>`` before it
+reads the payload, so each sandbox only receives what is unique to its task.
+
+Blobs live in the ``agentswarm-blobs`` Modal volume (mounted at /cache/blobs)
+or, on the local backend, in its cache directory. Uploads are remembered in a
+local stamp directory, so each distinct blob crosses the network once.
+
+A Modal volume shows its contents as of mount time, so blobs are uploaded
+before the sandbox that references them is created. Warm-pool and prefetched
+sandboxes were created before the upload and always get the payload inline.
+
+Enable with payload ``blobDedup: true`` or ``SANDBOX_BLOB_DEDUP=1``.
+
+Configuration (environment):
+    BLOB_CACHE_DIR   local stamp directory (default ~/.cache/agentswarm/blobs)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+BLOB_VOLUME_NAME = "agentswarm-blobs"
+BLOB_MOUNT = "/cache/blobs"
+# Fields worth shipping by reference; anything shorter goes inline.
+BLOB_FIELDS = ("systemPrompt",)
+BLOB_MIN_BYTES = 2048
+
+_upload_lock = threading.Lock()
+
+
+def blob_dedup_enabled(payload: dict) -> bool:
+    if "blobDedup" in payload:
+        return bool(payload["blobDedup"])
+    return os.environ.get("SANDBOX_BLOB_DEDUP", "0") == "1"
+
+
+@lru_cache(maxsize=1)
+def blob_volume():
+    """The blob ``modal.Volume`` (modal is imported lazily)."""
+    import modal
+
+    return modal.Volume.from_name(BLOB_VOLUME_NAME, create_if_missing=True)
+
+
+def _stamp_dir() -> Path:
+    return Path(os.environ.get("BLOB_CACHE_DIR", Path.home() / ".cache" / "agentswarm" / "blobs"))
+
+
+def blob_key(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def put_blob(data: bytes, backend) -> str:
+    """Store ``data`` where ``backend``'s sandboxes can read it; returns its key."""
+    key = blob_key(data)
+    if backend.name == "local":
+        path = backend.root / "cache" / "blobs" / key
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}")
+            tmp.write_bytes(data)
+            tmp.replace(path)
+        return key
+
+    stamp = _stamp_dir() / key
+    if stamp.exists():
+        return key
+    with _upload_lock:
+        if not stamp.exists():
+            stamp.parent.mkdir(parents=True, exist_ok=True)
+            local = stamp.with_suffix(".data")
+            local.write_bytes(data)
+            with blob_volume().batch_upload(force=True) as batch:
+                batch.put_file(str(local), f"/{key}")
+            local.unlink()
+            stamp.touch()
+    return key
+
+
+def externalize_blobs(payload: dict, backend) -> dict:
+    """Copy of ``payload`` with large ``BLOB_FIELDS`` replaced by ``blobRefs``."""
+    refs = {}
+    slim = dict(payload)
+    for field in BLOB_FIELDS:
+        value = payload.get(field)
+        if not isinstance(value, str):
+            continue
+        data = value.encode("utf-8")
+        if len(data) < BLOB_MIN_BYTES:
+            continue
+        refs[field] = put_blob(data, backend)
+        del slim[field]
+    if refs:
+        slim["blobRefs"] = refs
+    return slim
@@ -0,0 +1,141 @@
+"""
+Clone Acceleration — git bundle seeding
+=======================================
+
+Keeps a local bare mirror of the target repo's branches, periodically
+packs it into a ``git bundle`` and uploads that to a Modal volume. Sandboxes
+mount the volume, clone from the bundle on local disk and then ``git fetch``
+only the commits newer than the bundle's tip — so clone time and load on the
+git host stay flat as history grows over a long run.
+
+The bundle keeps full history, so worker-runner's ``git diff <startSha>``
+works exactly as with a regular clone.
+
+Configuration (environment):
+    SANDBOX_CLONE_MODE          "bundle" to enable (payload ``cloneMode`` overrides;
+                                "sparse" is infra/sparse_checkout.py)
+    CLONE_BUNDLE_REFRESH_S      min seconds between bundle rebuilds (default 300)
+    CLONE_CACHE_DIR             local mirror/bundle directory
+                                (default ~/.cache/agentswarm/git)
+
+Usage:
+    from infra.clone_cache import bundle_for
+
+    bundle_path = bundle_for(authed_url)   # path inside the sandbox, or None
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import os
+import re
+import subprocess
+import time
+from functools import lru_cache
+from pathlib import Path
+
+BUNDLE_VOLUME_NAME = "agentswarm-git-bundles"
+BUNDLE_MOUNT = "/cache/git"
+DEFAULT_REFRESH_S = 300
+
+
+@lru_cache(maxsize=1)
+def bundle_volume():
+    """The bundle ``modal.Volume`` (modal is imported lazily for the local backend)."""
+    import modal
+
+    return modal.Volume.from_name(BUNDLE_VOLUME_NAME, create_if_missing=True)
+
+
+def clone_mode(payload: dict) -> str:
+    return payload.get("cloneMode") or os.environ.get("SANDBOX_CLONE_MODE", "full")
+
+
+def public_url(authed_url: str) -> str:
+    """``authed_url`` with any embedded credentials removed."""
+    return re.sub(r"https://[^@/]+@", "https://", authed_url)
+
+
+def repo_key(authed_url: str) -> str:
+    """Stable cache key for a repo URL — credentials stripped so tokens never hit disk paths."""
+    return hashlib.sha256(public_url(authed_url).encode("utf-8")).hexdigest()[:16]
+
+
+def _cache_root() -> Path:
+    return Path(os.environ.get("CLONE_CACHE_DIR", Path.home() / ".cache" / "agentswarm" / "git"))
+
+
+def _git(*args: str, cwd: Path | None = None, timeout: int = 600) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True, timeout=timeout,
+    ).stdout.strip()
+
+
+def _sync_mirror(authed_url: str, mirror: Path) -> None:
+    if not mirror.exists():
+        _git("clone", "--bare", authed_url, str(mirror))
+        # Branches only — a GitHub --mirror would also drag in refs/pull/*.
+        _git("config", "remote.origin.fetch", "+refs/heads/*:refs/heads/*", cwd=mirror)
+    else:
+        _git("remote", "set-url", "origin", authed_url, cwd=mirror)
+    _git("fetch", "--prune", "origin", cwd=mirror)
+
+
+def sync_mirror(authed_url: str) -> Path:
+    """Fetch the local bare mirror of ``authed_url`` (cloning it on first use) and return its path."""
+    root = _cache_root() / repo_key(authed_url)
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / "lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        _sync_mirror(authed_url, root / "mirror.git")
+    return root / "mirror.git"
+
+
+def mirror_git(mirror: Path, *args: str) -> str:
+    return _git(*args, cwd=mirror)
+
+
+def bundle_for(authed_url: str) -> str | None:
+    """
+    Ensure an up-to-date bundle for ``authed_url`` exists in the volume and
+    return its path as seen from inside a sandbox. Rebuilds at most once per
+    ``CLONE_BUNDLE_REFRESH_S``; concurrent spawner processes serialize on a
+    file lock so only one of them fetches and uploads. Returns None if the
+    bundle cannot be produced (callers fall back to a regular clone).
+    """
+    import modal
+
+    key = repo_key(authed_url)
+    root = _cache_root() / key
+    root.mkdir(parents=True, exist_ok=True)
+    mirror = root / "mirror.git"
+    bundle = root / "repo.bundle"
+    stamp = root / "uploaded"
+    remote_path = f"/{key}/repo.bundle"
+    refresh_s = float(os.environ.get("CLONE_BUNDLE_REFRESH_S", DEFAULT_REFRESH_S))
+
+    def fresh() -> bool:
+        return stamp.exists() and time.time() - stamp.stat().st_mtime < refresh_s
+
+    if fresh():
+        return BUNDLE_MOUNT + remote_path
+
+    with open(root / "lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if fresh():  # another process rebuilt it while we waited
+            return BUNDLE_MOUNT + remote_path
+        try:
+            _sync_mirror(authed_url, mirror)
+            tip = _git("rev-parse", "HEAD", cwd=mirror)
+            previous_tip = stamp.read_text().strip() if stamp.exists() else ""
+            if tip != previous_tip or not bundle.exists():
+                tmp = root / "repo.bundle.tmp"
+                _git("bundle", "create", str(tmp), "HEAD", "--branches", "--tags", cwd=mirror)
+                tmp.replace(bundle)
+                with bundle_volume().batch_upload(force=True) as batch:
+                    batch.put_file(str(bundle), remote_path)
+            stamp.write_text(tip)
+        except (OSError, subprocess.SubprocessError, modal.exception.Error):
+            return BUNDLE_MOUNT + remote_path if stamp.exists() else None
+    return BUNDLE_MOUNT + remote_path
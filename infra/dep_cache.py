@@ -0,0 +1,116 @@
+"""
+Dependency Cache — lockfile-keyed node_modules
+==============================================
+
+Workers that run tests or ``npx tsc --noEmit`` otherwise install the target
+repo's dependencies from scratch in every sandbox. With the cache enabled,
+``run_task`` mounts a shared volume at ``/cache/deps`` and, after checkout,
+runs one script in the sandbox that:
+
+    1. hashes the repo's lockfile (pnpm-lock.yaml, package-lock.json or yarn.lock)
+    2. on a hit, extracts ``/cache/deps/<hash>/node_modules.tar`` into the repo
+    3. on a miss, installs against the shared package-manager store on the
+       volume, then tars every ``node_modules`` directory into the cache
+
+The key is the lockfile content, so a lockfile change is a new key and stale
+trees are never reused. The pnpm/npm/yarn stores are shared across keys, so
+even a miss mostly links from disk instead of downloading.
+
+On the local backend ``/cache`` is a directory on this machine, so the same
+script and layout apply without a volume. A Modal sandbox leased from the
+warm pool or a prefetch only has the volume if it was provisioned with the
+cache enabled; otherwise the step is skipped.
+
+Enable with payload ``depCache: true`` or ``SANDBOX_DEP_CACHE=1``.
+
+Usage:
+    from infra.dep_cache import install_deps
+
+    report = install_deps(sb)   # {"cache": "hit", "key": "3f2a...", "exit": 0}
+"""
+
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+
+DEPS_VOLUME_NAME = "agentswarm-deps"
+DEPS_MOUNT = "/cache/deps"
+DEPS_TIMEOUT = 600
+
+# Runs in the repo; prints one "deps: <hit|miss|none> [key]" line at the end.
+DEPS_SCRIPT = f"""
+set -e
+exec 2>&1
+cd /workspace/repo
+lock=""
+for f in pnpm-lock.yaml package-lock.json yarn.lock; do
+  if [ -f "$f" ]; then lock="$f"; break; fi
+done
+if [ -z "$lock" ]; then echo "deps: none"; exit 0; fi
+key=$(sha256sum "$lock" | cut -c1-16)
+dir={DEPS_MOUNT}/$key
+if [ -f "$dir/node_modules.tar" ]; then
+  tar -xf "$dir/node_modules.tar"
+  echo "deps: hit $key"
+  exit 0
+fi
+# The worker image sets NODE_ENV=production; workers need devDependencies.
+export NODE_ENV=development
+case "$lock" in
+  pnpm-lock.yaml) pnpm install --frozen-lockfile --prefer-offline --store-dir {DEPS_MOUNT}/pnpm-store ;;
+  package-lock.json) npm ci --prefer-offline --cache {DEPS_MOUNT}/npm-cache ;;
+  yarn.lock) npx --yes yarn install --frozen-lockfile --cache-folder {DEPS_MOUNT}/yarn-cache ;;
+esac
+mkdir -p "$dir"
+# Unique name: the volume is shared and fresh containers often have the same PIDs.
+tmp=$(mktemp -p "$dir" node_modules.tar.XXXXXXXX)
+find . -path ./.git -prune -o -type d -name node_modules -prune -print | tar -cf "$tmp" -T -
+mv "$tmp" "$dir/node_modules.tar"
+sync {DEPS_MOUNT} 2>/dev/null || true
+echo "deps: miss $key"
+"""
+
+
+def dep_cache_enabled(payload: dict) -> bool:
+    if "depCache" in payload:
+        return bool(payload["depCache"])
+    return os.environ.get("SANDBOX_DEP_CACHE", "0") == "1"
+
+
+@lru_cache(maxsize=1)
+def deps_volume():
+    """The shared dependency ``modal.Volume`` (modal is imported lazily)."""
+    import modal
+
+    return modal.Volume.from_name(DEPS_VOLUME_NAME, create_if_missing=True)
+
+
+def deps_argv() -> list[str]:
+    return ["bash", "-c", DEPS_SCRIPT]
+
+
+def install_deps(sb) -> dict:
+    """Restore or install the repo's dependencies through the cache. Never raises on install failure."""
+    proc = sb.exec(*deps_argv(), timeout=DEPS_TIMEOUT)
+    lines = list(proc.stdout)
+    proc.wait()
+    return parse_deps_output(lines, proc.returncode)
+
+
+async def install_deps_async(sb) -> dict:
+    proc = await sb.exec.aio(*deps_argv(), timeout=DEPS_TIMEOUT)
+    lines = [line async for line in proc.stdout]
+    await proc.wait.aio()
+    return parse_deps_output(lines, proc.returncode)
+
+
+def parse_deps_output(lines: list[str], returncode: int | None) -> dict:
+    report: dict = {"cache": "error", "exit": returncode}
+    for line in lines:
+        parts = line.split()
+        if parts[:1] == ["deps:"] and len(parts) >= 2:
+            report["cache"] = parts[1]
+            if len(parts) >= 3:
+                report["key"] = parts[2]
+    return report
@@ -0,0 +1,124 @@
+"""
+Filesystem Snapshots — fork retries from a set-up sandbox
+=========================================================
+
+A retried task, or the conflict-fix task spawned for the same branch, used
+to pay for a full provisioning cycle again: create, clone, checkout, deps.
+With snapshots enabled the spawner snapshots the sandbox filesystem once
+setup is done (repo cloned, dependencies installed, agent not yet started)
+and records it under the repo and the task's branch. The next task on that
+branch forks a sandbox from the snapshot and only has to fetch and re-branch
+from ``origin/main``, like a warm-pool lease.
+
+The backend does the snapshotting (``infra.sandbox_backend``): Modal via
+``Sandbox.snapshot_filesystem()``, whose image id is stored; the local
+backend via a copy-on-write copy of the workspace. The index is one small
+JSON file per key under ``SANDBOX_SNAPSHOT_DIR`` so one-shot spawner
+processes and the daemon share it. Entries older than the TTL are ignored
+and their snapshots dropped.
+
+Snapshots are taken for single-task payloads that were set up step by step
+(not from the warm pool, a fork, or the one-exec setup script, where there
+is no point between clone and agent start). They carry no credentials:
+task.json (git token, LLM key) is written after the snapshot, and on Modal
+origin is switched to the token-free URL while the image is taken, so a fork
+re-authenticates origin before it fetches.
+
+Configuration (environment):
+    SANDBOX_SNAPSHOT        "1" to enable (payload ``snapshot`` overrides)
+    SANDBOX_SNAPSHOT_TTL_S  seconds a snapshot stays forkable (default 3600)
+    SANDBOX_SNAPSHOT_DIR    index directory (default ~/.cache/agentswarm/snapshots)
+
+Usage:
+    from infra.fs_snapshot import snapshot_index, snapshot_key, snapshots_enabled
+
+    key = snapshot_key(authed_url, task)
+    ref = snapshot_index().get(backend, key)     # None when there is nothing to fork
+    snapshot_index().put(backend, key, backend.snapshot(sb))
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from infra.clone_cache import repo_key
+
+DEFAULT_TTL_S = 3600
+
+
+def snapshots_enabled(payload: dict) -> bool:
+    if "snapshot" in payload:
+        return bool(payload["snapshot"])
+    return os.environ.get("SANDBOX_SNAPSHOT", "0") == "1"
+
+
+def snapshot_key(authed_url: str, task: dict) -> str:
+    """Retries keep their branch and conflict-fix tasks reuse it, so key by repo + branch."""
+    return f"{repo_key(authed_url)}:{task['branch']}"
+
+
+class SnapshotIndex:
+    """Key → snapshot ref per backend, one JSON file per key."""
+
+    def __init__(self, root: Path, ttl_s: float):
+        self.root = root
+        self.ttl_s = ttl_s
+
+    def _path(self, backend_name: str, key: str) -> Path:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:24]
+        return self.root / backend_name / f"{digest}.json"
+
+    def get(self, backend, key: str) -> str | None:
+        path = self._path(backend.name, key)
+        try:
+            entry = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("createdAt", 0) > self.ttl_s:
+            self._drop(backend, path, entry)
+            return None
+        return entry.get("ref")
+
+    def put(self, backend, key: str, ref: str) -> None:
+        path = self._path(backend.name, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            previous = json.loads(path.read_text())
+        except (OSError, ValueError):
+            previous = None
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"key": key, "ref": ref, "createdAt": time.time()}))
+        os.replace(tmp, path)
+        if previous and previous.get("ref") != ref:
+            backend.drop_snapshot(previous["ref"])
+        self.prune(backend)
+
+    def prune(self, backend) -> int:
+        """Drop expired entries of ``backend``; returns how many were removed."""
+        removed = 0
+        for path in (self.root / backend.name).glob("*.json"):
+            try:
+                entry = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            if time.time() - entry.get("createdAt", 0) > self.ttl_s:
+                self._drop(backend, path, entry)
+                removed += 1
+        return removed
+
+    def _drop(self, backend, path: Path, entry: dict) -> None:
+        path.unlink(missing_ok=True)
+        if entry.get("ref"):
+            backend.drop_snapshot(entry["ref"])
+
+
+@lru_cache(maxsize=1)
+def snapshot_index() -> SnapshotIndex:
+    """Process-wide index configured from the environment."""
+    root = Path(os.environ.get("SANDBOX_SNAPSHOT_DIR", Path.home() / ".cache" / "agentswarm" / "snapshots"))
+    return SnapshotIndex(root, float(os.environ.get("SANDBOX_SNAPSHOT_TTL_S", DEFAULT_TTL_S)))
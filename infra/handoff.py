@@ -0,0 +1,78 @@
+"""
+Branch Handoff — push or bundle
+===============================
+
+By default ``run_task`` hands a worker's commits to the merge queue through
+the git host: the sandbox pushes ``<branch>`` to origin and the merge queue
+fetches it back. That is two remote round trips per task, and the remote
+accumulates a ref for every task.
+
+In bundle mode the sandbox instead writes a ``git bundle`` of the commits on
+the task branch that are not on ``origin/main``. ``run_task`` reads it out of
+the sandbox, stores it on this machine, and returns its path as
+``bundlePath`` in the handoff. The merge queue then fetches straight from the
+file into its local repo, so the remote is only touched when main is pushed.
+
+If the bundle cannot be created, ``run_task`` falls back to pushing. The
+bundle is streamed out in chunks (``infra.result_transport``), never held in
+memory whole.
+
+Configuration (environment):
+    HANDOFF_MODE         "push" (default) or "bundle"; payload ``handoffMode`` overrides
+    HANDOFF_BUNDLE_DIR   where bundles are stored (default ~/.cache/agentswarm/handoffs)
+
+Usage:
+    from infra.handoff import fetch_bundle, handoff_mode
+
+    if handoff_mode(payload) == "bundle":
+        result["bundlePath"] = fetch_bundle(sb, task_id, branch)
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from pathlib import Path
+
+from infra.result_transport import ContentWriter, copy_out
+
+HANDOFF_MODES = ("push", "bundle")
+HANDOFF_BUNDLE = "/workspace/handoff.bundle"
+BUNDLE_TIMEOUT = 120
+
+
+def handoff_mode(payload: dict) -> str:
+    mode = payload.get("handoffMode") or os.environ.get("HANDOFF_MODE", "push")
+    if mode not in HANDOFF_MODES:
+        raise ValueError(f"Invalid handoff mode: {mode}. Must be one of: {', '.join(HANDOFF_MODES)}")
+    return mode
+
+
+def bundle_dir() -> Path:
+    return Path(os.environ.get("HANDOFF_BUNDLE_DIR", Path.home() / ".cache" / "agentswarm" / "handoffs"))
+
+
+def bundle_argv(branch: str) -> list[str]:
+    """Bundle of ``branch`` minus ``origin/main``; the merge queue already has main."""
+    return ["git", "-C", "/workspace/repo", "bundle", "create", HANDOFF_BUNDLE, branch, "^origin/main"]
+
+
+def bundle_name(task_id: str, sha256: str) -> str:
+    safe_id = re.sub(r"[^\w.-]", "_", task_id)
+    return f"{safe_id}-{sha256[:12]}.bundle"
+
+
+def fetch_bundle(sb, task_id: str, branch: str) -> str | None:
+    """Bundle the task branch in the sandbox and store it locally. None if git refused."""
+    proc = sb.exec(*bundle_argv(branch), timeout=BUNDLE_TIMEOUT)
+    proc.wait()
+    if proc.returncode != 0:
+        return None
+    writer = ContentWriter(bundle_dir())
+    try:
+        copy_out(sb, HANDOFF_BUNDLE, writer)
+    except BaseException:
+        writer.abort()
+        raise
+    return str(writer.commit(bundle_name(task_id, writer.sha256())))
+
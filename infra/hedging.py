@@ -0,0 +1,205 @@
+"""
+Hedged Sandbox Provisioning
+===========================
+
+Create latency has a long tail: most sandboxes are ready in seconds, a few
+take tens of seconds, and a task stuck behind one of those simply waits.
+With hedging enabled, ``run_task`` makes its fresh create through the
+``Hedger``:
+
+    1. start provisioning the primary sandbox
+    2. if it is not ready after the hedge delay — the configured percentile of
+       recent provisioning latencies — start a second one
+    3. use whichever is ready first; the other is terminated once it finishes
+
+Hedges are capped by a budget: at most ``SANDBOX_HEDGE_BUDGET`` extra
+provisions per provision started, so a provider-wide slowdown does not double
+the load. Latencies are learned per process (the spawner daemon); until
+``MIN_SAMPLES`` are known, ``SANDBOX_HEDGE_AFTER_S`` (if set) is the delay.
+
+What is hedged is a fresh sandbox's create + clone, the slow tail of
+provisioning: each attempt creates with the task's own arguments (sizing,
+volumes) and clones the repo before it counts as ready. A warm-pool lease,
+snapshot fork or repo image is tried first and is not hedged. Every attempt
+runs on its own thread and is timed from when it starts there, so one
+provision's attempts never queue behind another's. Each ``create`` phase
+event carries ``hedged`` / ``hedgeWon``; ``snapshot()`` reports hedge rate
+and wins.
+
+Enable with payload ``hedge: true`` or ``SANDBOX_HEDGE=1``.
+
+Configuration (environment):
+    SANDBOX_HEDGE_PERCENTILE   latency percentile that triggers a hedge (default 0.9)
+    SANDBOX_HEDGE_BUDGET       max hedges per provision (default 0.1)
+    SANDBOX_HEDGE_AFTER_S      hedge delay before enough latencies are known (default: no hedging)
+
+Usage:
+    from infra.hedging import hedger
+
+    sb, info = hedger().provision(lambda: create_and_clone(backend, create_kwargs, clone))
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from functools import lru_cache
+from typing import Any, Callable
+
+MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+
+def hedging_enabled(payload: dict) -> bool:
+    if "hedge" in payload:
+        return bool(payload["hedge"])
+    return os.environ.get("SANDBOX_HEDGE", "0") == "1"
+
+
+def hedge_config_from_env() -> dict:
+    after = os.environ.get("SANDBOX_HEDGE_AFTER_S")
+    return {
+        "percentile": float(os.environ.get("SANDBOX_HEDGE_PERCENTILE", "0.9")),
+        "budget": float(os.environ.get("SANDBOX_HEDGE_BUDGET", "0.1")),
+        "fallback_delay": float(after) if after else None,
+    }
+
+
+class Hedger:
+    """Sandbox create with a budgeted second attempt when the first runs into the latency tail."""
+
+    def __init__(self, percentile: float = 0.9, budget: float = 0.1, fallback_delay: float | None = None):
+        self.percentile = percentile
+        self.budget = budget
+        self.fallback_delay = fallback_delay
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self._threads: set[threading.Thread] = set()
+        self.stats = {"provisions": 0, "hedged": 0, "hedgeWins": 0, "overBudget": 0}
+
+    def delay(self) -> float | None:
+        """Seconds to wait for the primary before hedging; None means never hedge."""
+        with self._lock:
+            if len(self._latencies) < MIN_SAMPLES:
+                return self.fallback_delay
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+
+    def provision(self, create: Callable[[], Any]) -> tuple[Any, dict]:
+        """
+        The sandbox of whichever ``create()`` call finished first, plus phase
+        attributes. Raises if every attempt failed.
+        """
+        with self._lock:
+            self.stats["provisions"] += 1
+        primary = self._start(create)
+        delay = self.delay()
+        attempts = [primary]
+        if delay is not None and not wait([primary], timeout=delay).done:
+            if self._take_budget():
+                attempts.append(self._start(create))
+
+        winner, sb, error = self._first_success(attempts)
+        for attempt in attempts:
+            if attempt is not winner:
+                attempt.add_done_callback(_terminate_result)
+        if sb is None:
+            raise error or RuntimeError("sandbox create failed")
+
+        hedge_won = winner is not primary
+        if hedge_won:
+            with self._lock:
+                self.stats["hedgeWins"] += 1
+        info = {"hedged": len(attempts) > 1, "hedgeWon": hedge_won}
+        if delay is not None:
+            info["hedgeDelayMs"] = int(delay * 1000)
+        return sb, info
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            provisions = self.stats["provisions"]
+            return {
+                **self.stats,
+                "hedgeRate": round(self.stats["hedged"] / provisions, 3) if provisions else 0.0,
+                "samples": len(self._latencies),
+            }
+
+    def shutdown(self, timeout: float | None = None) -> None:
+        """
+        Wait for attempts still in flight, so a losing sandbox that finishes
+        during shutdown is terminated (on its own thread) rather than leaked.
+        """
+        with self._lock:
+            threads = list(self._threads)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    # -- internals ----------------------------------------------------------
+
+    def _start(self, create: Callable[[], Any]) -> Future:
+        """
+        Run ``create`` on a thread of its own. A shared bounded pool would make
+        attempts wait for each other, and that wait would count as latency.
+        """
+        future: Future = Future()
+
+        def run() -> None:
+            t0 = time.monotonic()
+            try:
+                result = create()
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                # Every successful attempt is a latency sample, including losers,
+                # so the tail stays visible after hedging starts cutting it.
+                with self._lock:
+                    self._latencies.append(time.monotonic() - t0)
+                # Terminates a loser here if provision() already gave up on it.
+                future.set_result(result)
+            finally:
+                with self._lock:
+                    self._threads.discard(thread)
+
+        thread = threading.Thread(target=run, name="hedge")
+        with self._lock:
+            self._threads.add(thread)
+        thread.start()
+        return future
+
+    def _take_budget(self) -> bool:
+        with self._lock:
+            if self.stats["hedged"] + 1 > self.budget * self.stats["provisions"]:
+                self.stats["overBudget"] += 1
+                return False
+            self.stats["hedged"] += 1
+            return True
+
+    @staticmethod
+    def _first_success(attempts: list[Future]) -> tuple[Future | None, Any, BaseException | None]:
+        pending = set(attempts)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future, future.result(), None
+                error = future.exception()
+        return None, None, error
+
+
+def _terminate_result(future: Future) -> None:
+    if not future.cancelled() and future.exception() is None:
+        try:
+            future.result().terminate()
+        except Exception:
+            pass
+
+
+@lru_cache(maxsize=1)
+def hedger() -> Hedger:
+    """The process-wide hedger; latency history accumulates across tasks."""
+    return Hedger(**hedge_config_from_env())
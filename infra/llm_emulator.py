@@ -0,0 +1,400 @@
+"""
+LLM Emulator — an offline stand-in for the GLM-5 SGLang server
+==============================================================
+
+Load-testing the planner, worker-runner or ``LLMClient`` against
+``infra/deploy_glm5.py`` needs the 8×B200 deployment. This server speaks the
+same OpenAI-compatible API on a dev box, CPU only, and reproduces the
+deployed server's performance envelope rather than its output:
+
+  - time to first token: ``ttft_s`` plus the prompt's prefill time at
+    ``prefill_tps`` (prompt tokens are estimated at 4 characters each)
+  - decode at ``tokens_per_s`` per request, streamed as SSE chunks or
+    returned as one body after the same delay
+  - at most ``max_running`` requests decode at once (SGLang's
+    ``max-running-requests``, read from ``infra/config.yaml``); the rest wait
+    in a FIFO queue and their queue time counts toward TTFT
+  - cold start: for ``cold_start_s`` every request gets 502 (the Modal proxy
+    with no container listening), then 503 for ``warmup_s`` (SGLang loading
+    weights), as ``deploy_glm5._probe`` and ``LLMClient.waitForReady`` see it
+
+Responses come from a script (JSONL), else filler text of
+``completion_tokens`` tokens. A script line is either a response
+(``{"content": ..., "tool_calls": [...], "match": ...}``) or an entry of a
+recorded ``logs/llm-detail-*.ndjson`` trace (``{"messages": [...],
+"response": ...}``). A request whose last user message equals a line's
+``match`` (or a recorded entry's last user message) gets that line; every
+other request gets the unmatched lines round-robin.
+
+``/health``, ``/health_generate``, ``/v1/models`` and a Prometheus
+``/metrics`` (running / queued requests, generated tokens) are served like
+SGLang's.
+
+Configuration (environment; CLI flags override):
+    LLM_EMULATOR_PORT               listen port (default 8000, as SGLANG_PORT)
+    LLM_EMULATOR_TTFT_S             base time to first token (default 0.5)
+    LLM_EMULATOR_TOKENS_PER_S       decode speed per request (default 60)
+    LLM_EMULATOR_PREFILL_TPS        prefill speed, prompt tokens/s (default 20000)
+    LLM_EMULATOR_MAX_RUNNING        concurrent requests (default: max-running-requests in config.yaml)
+    LLM_EMULATOR_COLD_START_S       seconds of 502 after start (default 0)
+    LLM_EMULATOR_WARMUP_S           seconds of 503 after the cold start (default 0)
+    LLM_EMULATOR_COMPLETION_TOKENS  filler length when nothing is scripted (default 256)
+    LLM_EMULATOR_SCRIPT             JSONL script or llm-detail recording
+
+Usage:
+    python infra/llm_emulator.py --script logs/llm-detail-2026-01-01T00-00-00.ndjson
+    LLM_BASE_URL=http://localhost:8000 pnpm start
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+
+from aiohttp import web
+
+CONFIG_PATH = Path(__file__).parent / "config.yaml"
+SERVED_MODEL_NAME = "glm-5"
+CHARS_PER_TOKEN = 4
+DEFAULT_MAX_RUNNING = 24
+
+
+def sglang_config_value(key: str, path: Path = CONFIG_PATH) -> str | None:
+    """A top-level ``key: value`` from the SGLang config (flat YAML, no parser needed)."""
+    try:
+        lines = path.read_text().splitlines()
+    except OSError:
+        return None
+    for line in lines:
+        name, sep, value = line.partition(":")
+        if sep and name.strip() == key:
+            return value.split("#")[0].strip()
+    return None
+
+
+def emulator_config_from_env() -> dict:
+    env = os.environ.get
+    return {
+        "port": int(env("LLM_EMULATOR_PORT", 8000)),
+        "ttft_s": float(env("LLM_EMULATOR_TTFT_S", 0.5)),
+        "tokens_per_s": float(env("LLM_EMULATOR_TOKENS_PER_S", 60)),
+        "prefill_tps": float(env("LLM_EMULATOR_PREFILL_TPS", 20000)),
+        "max_running": int(
+            env("LLM_EMULATOR_MAX_RUNNING")
+            or sglang_config_value("max-running-requests")
+            or DEFAULT_MAX_RUNNING
+        ),
+        "cold_start_s": float(env("LLM_EMULATOR_COLD_START_S", 0)),
+        "warmup_s": float(env("LLM_EMULATOR_WARMUP_S", 0)),
+        "completion_tokens": int(env("LLM_EMULATOR_COMPLETION_TOKENS", 256)),
+        "script": env("LLM_EMULATOR_SCRIPT", ""),
+    }
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, -(-len(text) // CHARS_PER_TOKEN))
+
+
+def _message_text(message: dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        # Content parts (pi sends [{"type": "text", "text": ...}]).
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def _last_user_message(messages: list) -> str | None:
+    for message in reversed(messages):
+        if isinstance(message, dict) and message.get("role") == "user":
+            return _message_text(message)
+    return None
+
+
+class ResponseScript:
+    """Scripted or recorded responses: matched by last user message, else round-robin."""
+
+    def __init__(self, entries: list[dict]):
+        self.size = len(entries)
+        self.by_prompt: dict[str, dict] = {}
+        unmatched = []
+        for entry in entries:
+            if "response" in entry:
+                # llm-detail recording: the planner's LLMClient logs plain text.
+                response = entry["response"]
+                entry = {"content": response if isinstance(response, str) else json.dumps(response),
+                         "match": _last_user_message(entry.get("messages") or [])}
+            if entry.get("match"):
+                self.by_prompt.setdefault(entry["match"], entry)
+            else:
+                unmatched.append(entry)
+        self._cycle = itertools.cycle(unmatched or list(self.by_prompt.values())) if entries else None
+
+    @classmethod
+    def load(cls, path: str) -> ResponseScript:
+        entries = []
+        for line in Path(path).read_text().splitlines():
+            if line.strip():
+                entry = json.loads(line)
+                if entry.get("error") and "response" not in entry:
+                    continue  # recorded failures carry no response to replay
+                entries.append(entry)
+        return cls(entries)
+
+    def pick(self, messages: list) -> dict | None:
+        prompt = _last_user_message(messages)
+        if prompt is not None and prompt in self.by_prompt:
+            return self.by_prompt[prompt]
+        return next(self._cycle) if self._cycle else None
+
+
+def filler_text(tokens: int) -> str:
+    words = ("lor", "ips", "dol", "sit", "ame", "con", "adi", "eli")
+    # Three letters and a space: exactly one token at CHARS_PER_TOKEN.
+    return " ".join(words[i % len(words)] for i in range(tokens))
+
+
+def split_tokens(text: str) -> list[str]:
+    return [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)]
+
+
+def tool_call_arguments(call: dict) -> str:
+    """Scripts may give arguments as an object; the API sends them as a JSON string."""
+    arguments = call.get("function", {}).get("arguments", "")
+    return arguments if isinstance(arguments, str) else json.dumps(arguments)
+
+
+class Emulator:
+    """Admission, pacing and the OpenAI-compatible handlers."""
+
+    def __init__(self, ttft_s: float, tokens_per_s: float, prefill_tps: float, max_running: int,
+                 cold_start_s: float, warmup_s: float, completion_tokens: int,
+                 script: ResponseScript | None = None):
+        self.ttft_s = ttft_s
+        self.tokens_per_s = tokens_per_s
+        self.prefill_tps = prefill_tps
+        self.max_running = max_running
+        self.cold_start_s = cold_start_s
+        self.warmup_s = warmup_s
+        self.completion_tokens = completion_tokens
+        self.script = script
+        self.started = time.monotonic()
+        self.created = int(time.time())
+        self.slots = asyncio.Semaphore(max_running)
+        self.stats = {"running": 0, "queued": 0, "requests": 0, "rejected": 0,
+                      "promptTokens": 0, "completionTokens": 0}
+
+    # -- lifecycle ------------------------------------------------------------
+
+    def unavailable(self) -> int | None:
+        """502 during the cold start, 503 while warming up, None once ready."""
+        age = time.monotonic() - self.started
+        if age < self.cold_start_s:
+            return 502
+        if age < self.cold_start_s + self.warmup_s:
+            return 503
+        return None
+
+    def _not_ready(self, status: int) -> web.Response:
+        self.stats["rejected"] += 1
+        if status == 502:
+            return web.Response(status=502, text="Bad Gateway")
+        return web.json_response({"error": {"message": "Server is warming up", "code": 503}}, status=503)
+
+    # -- responses ------------------------------------------------------------
+
+    def _response_for(self, body: dict) -> tuple[str, list[dict], str]:
+        """(content, tool calls, finish reason), truncated to max_tokens."""
+        entry = self.script.pick(body.get("messages") or []) if self.script else None
+        if entry is None:
+            content, tool_calls = filler_text(self.completion_tokens), []
+        else:
+            content, tool_calls = entry.get("content") or "", entry.get("tool_calls") or []
+        finish = entry.get("finish_reason") if entry else None
+        finish = finish or ("tool_calls" if tool_calls else "stop")
+        max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+        if max_tokens and estimate_tokens(content) > max_tokens:
+            content, tool_calls, finish = content[: max_tokens * CHARS_PER_TOKEN], [], "length"
+        return content, tool_calls, finish
+
+    def _first_token_delay(self, prompt_tokens: int) -> float:
+        return self.ttft_s + prompt_tokens / self.prefill_tps
+
+    def _usage(self, prompt_tokens: int, completion_tokens: int) -> dict:
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    # -- handlers -------------------------------------------------------------
+
+    async def health(self, request: web.Request) -> web.Response:
+        status = self.unavailable()
+        return self._not_ready(status) if status else web.Response(text="")
+
+    async def models(self, request: web.Request) -> web.Response:
+        status = self.unavailable()
+        if status:
+            return self._not_ready(status)
+        return web.json_response({"object": "list", "data": [
+            {"id": SERVED_MODEL_NAME, "object": "model", "created": self.created, "owned_by": "sglang",
+             "max_model_len": 131072},
+        ]})
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        labels = f'{{model_name="{SERVED_MODEL_NAME}"}}'
+        lines = [
+            f"sglang:num_running_reqs{labels} {self.stats['running']}",
+            f"sglang:num_queue_reqs{labels} {self.stats['queued']}",
+            f"sglang:prompt_tokens_total{labels} {self.stats['promptTokens']}",
+            f"sglang:generation_tokens_total{labels} {self.stats['completionTokens']}",
+            f"sglang:num_requests_total{labels} {self.stats['requests']}",
+        ]
+        return web.Response(text="\n".join(lines) + "\n", content_type="text/plain")
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        status = self.unavailable()
+        if status:
+            return self._not_ready(status)
+        try:
+            body = await request.json()
+        except ValueError:
+            return web.json_response({"error": {"message": "Invalid JSON body", "code": 400}}, status=400)
+
+        arrival = time.monotonic()
+        prompt_tokens = estimate_tokens(json.dumps(body.get("messages") or []))
+        content, tool_calls, finish = self._response_for(body)
+        tokens = split_tokens(content)
+        completion_tokens = len(tokens) + sum(len(split_tokens(tool_call_arguments(call))) for call in tool_calls)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = body.get("model") or SERVED_MODEL_NAME
+
+        self.stats["queued"] += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.stats["queued"] -= 1
+        self.stats["running"] += 1
+        self.stats["requests"] += 1
+        self.stats["promptTokens"] += prompt_tokens
+        try:
+            # Queue time is part of TTFT, as on the real server.
+            queued_s = time.monotonic() - arrival
+            await asyncio.sleep(self._first_token_delay(prompt_tokens))
+            if body.get("stream"):
+                return await self._stream(request, body, completion_id, model, tokens, tool_calls,
+                                          finish, self._usage(prompt_tokens, completion_tokens), queued_s)
+            await asyncio.sleep(completion_tokens / self.tokens_per_s)
+            self.stats["completionTokens"] += completion_tokens
+            message: dict = {"role": "assistant", "content": content}
+            if tool_calls:
+                message["tool_calls"] = [
+                    {"id": call.get("id") or f"call_{uuid.uuid4().hex[:24]}", "type": "function",
+                     "function": {"name": call.get("function", {}).get("name", ""),
+                                  "arguments": tool_call_arguments(call)}}
+                    for call in tool_calls
+                ]
+            return web.json_response({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish}],
+                "usage": self._usage(prompt_tokens, completion_tokens),
+            }, headers={"X-Queue-Time-S": f"{queued_s:.3f}"})
+        finally:
+            self.stats["running"] -= 1
+            self.slots.release()
+
+    async def _stream(self, request: web.Request, body: dict, completion_id: str, model: str,
+                      tokens: list[str], tool_calls: list[dict], finish: str, usage: dict,
+                      queued_s: float) -> web.StreamResponse:
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Queue-Time-S": f"{queued_s:.3f}",
+        })
+        await response.prepare(request)
+        created = int(time.time())
+
+        async def send(delta: dict, finish_reason: str | None = None, **extra) -> None:
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}], **extra}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+
+        interval = 1 / self.tokens_per_s
+        next_at = time.monotonic()
+        await send({"role": "assistant", "content": ""})
+        for token in tokens:
+            await send({"content": token})
+            self.stats["completionTokens"] += 1
+            next_at += interval
+            await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+        for index, call in enumerate(tool_calls):
+            await send({"tool_calls": [{"index": index, "id": call.get("id") or f"call_{uuid.uuid4().hex[:24]}",
+                                        "type": "function",
+                                        "function": {"name": call.get("function", {}).get("name", ""),
+                                                     "arguments": ""}}]})
+            for piece in split_tokens(tool_call_arguments(call)):
+                await send({"tool_calls": [{"index": index, "function": {"arguments": piece}}]})
+                self.stats["completionTokens"] += 1
+                next_at += interval
+                await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+        await send({}, finish)
+        if (body.get("stream_options") or {}).get("include_usage"):
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [], "usage": usage}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_get("/health", self.health)
+        app.router.add_get("/health_generate", self.health)
+        app.router.add_get("/v1/models", self.models)
+        app.router.add_get("/metrics", self.metrics)
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        return app
+
+
+def main() -> None:
+    defaults = emulator_config_from_env()
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible stand-in for the GLM-5 SGLang server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=defaults["port"])
+    parser.add_argument("--ttft-s", type=float, default=defaults["ttft_s"])
+    parser.add_argument("--tokens-per-s", type=float, default=defaults["tokens_per_s"])
+    parser.add_argument("--prefill-tps", type=float, default=defaults["prefill_tps"])
+    parser.add_argument("--max-running", type=int, default=defaults["max_running"],
+                        help="Concurrent requests before queueing (SGLang max-running-requests)")
+    parser.add_argument("--cold-start-s", type=float, default=defaults["cold_start_s"])
+    parser.add_argument("--warmup-s", type=float, default=defaults["warmup_s"])
+    parser.add_argument("--completion-tokens", type=int, default=defaults["completion_tokens"])
+    parser.add_argument("--script", default=defaults["script"], help="JSONL responses or an llm-detail recording")
+    args = parser.parse_args()
+
+    script = ResponseScript.load(args.script) if args.script else None
+    print(
+        f"[llm-emulator] :{args.port} ttft {args.ttft_s}s, {args.tokens_per_s} tok/s, "
+        f"max running {args.max_running}, cold start {args.cold_start_s}s + warmup {args.warmup_s}s, "
+        f"{script.size if script else 0} scripted response(s)",
+        flush=True,
+    )
+
+    async def build() -> web.Application:
+        # The semaphore belongs to the loop web.run_app creates.
+        return Emulator(
+            args.ttft_s, args.tokens_per_s, args.prefill_tps, args.max_running,
+            args.cold_start_s, args.warmup_s, args.completion_tokens, script,
+        ).app()
+
+    web.run_app(build(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Worker Output Coalescing
+========================
+
+worker-runner logs a line for every few tool calls; forwarded one by one,
+those lines dominate the orchestrator's log volume at high worker counts.
+``OutputCoalescer`` sits between the sandbox's stdout/stderr and ``emit``:
+
+- every line is appended verbatim to a per-task side log
+  (``$WORKER_LOG_DIR/<taskId>.log``)
+- bursts are merged into at most one summary per window:
+
+      {"type": "progress", "taskId": "t-1", "phase": "agent", "toolCalls": 40,
+       "detail": "Tool calls: 40", "lines": 12, "suppressed": 0}
+
+- a worker phase change flushes immediately, and warnings/errors pass through
+  as plain ``[worker:ID] ...`` lines, capped per window (the excess is counted
+  in ``suppressed`` and still lands in the side log)
+
+Configuration (environment):
+    WORKER_OUTPUT_COALESCE        "0" forwards every line as before (default on)
+    WORKER_PROGRESS_WINDOW_S      min seconds between summaries per task (default 2)
+    WORKER_PASSTHROUGH_PER_WINDOW warning/error lines forwarded per window (default 5)
+    WORKER_LOG_DIR                side log directory (default logs/workers)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+DEFAULT_WINDOW_S = 2.0
+DEFAULT_PASSTHROUGH = 5
+
+# worker-runner log messages → coarse worker phase, checked in order.
+PHASE_PATTERNS: list[tuple[re.Pattern, str]] = [
+    (re.compile(r"^(Reading task payload|Resolved \d+ payload blob|Task:|Tracing enabled|"
+                r"Worker instructions|Model registered|Creating agent session)"), "setup"),
+    (re.compile(r"^(Running agent prompt|Tool calls:|Tool start:|Tool end:)"), "agent"),
+    (re.compile(r"^(Agent prompt completed|Safety-net|Skipping safety-net|Created \.gitignore|"
+                r"Appended artifact)"), "commit"),
+    (re.compile(r"^Running post-agent build check|^Post-agent build check"), "build_check"),
+    (re.compile(r"^(Extracting git diff|Result written|Done\.)"), "finalize"),
+]
+# worker-runner's log() prefix; PHASE_PATTERNS match the message after it.
+WORKER_PREFIX = re.compile(r"^\[worker\]\s*")
+PASSTHROUGH = re.compile(r"\b(WARNING|FATAL|ERROR|FAIL)\b|Traceback|Error:")
+TOOL_CALLS = re.compile(r"Tool calls:\s*(\d+)")
+
+
+def coalescing_enabled() -> bool:
+    return os.environ.get("WORKER_OUTPUT_COALESCE", "1") != "0"
+
+
+def worker_phase(line: str) -> str | None:
+    message = WORKER_PREFIX.sub("", line, count=1)
+    for pattern, phase in PHASE_PATTERNS:
+        if pattern.search(message):
+            return phase
+    return None
+
+
+class RawOutput:
+    """Pre-coalescing behaviour: every line forwarded as ``[worker:ID] ...``."""
+
+    def __init__(self, task_id: str, emit: Callable[[str], None]):
+        self._prefix = f"[worker:{task_id}] "
+        self._emit = emit
+
+    def line(self, text: str) -> None:
+        self._emit(self._prefix + text.rstrip("\n"))
+
+    def close(self) -> None:
+        pass
+
+
+class OutputCoalescer:
+    """Per-task window that folds worker lines into rate-limited progress events."""
+
+    def __init__(
+        self,
+        task_id: str,
+        emit: Callable[[str], None],
+        window_s: float | None = None,
+        passthrough_per_window: int | None = None,
+        log_dir: Path | None = None,
+    ):
+        self.task_id = task_id
+        self._emit = emit
+        self._prefix = f"[worker:{task_id}] "
+        self.window_s = window_s if window_s is not None else float(
+            os.environ.get("WORKER_PROGRESS_WINDOW_S", DEFAULT_WINDOW_S)
+        )
+        self.passthrough_per_window = passthrough_per_window if passthrough_per_window is not None else int(
+            os.environ.get("WORKER_PASSTHROUGH_PER_WINDOW", DEFAULT_PASSTHROUGH)
+        )
+        log_dir = log_dir or Path(os.environ.get("WORKER_LOG_DIR", "logs/workers"))
+        try:
+            log_dir.mkdir(parents=True, exist_ok=True)
+            safe_id = re.sub(r"[^\w.-]", "_", task_id)
+            self._side_log = open(log_dir / f"{safe_id}.log", "a", encoding="utf-8")
+        except OSError:
+            self._side_log = None
+
+        self._lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+        self._last_flush = 0.0
+        self._window_started = time.monotonic()
+        self._passed = 0
+        self._pending = 0
+        self._suppressed = 0
+        self.phase = "setup"
+        self.tool_calls = 0
+        self.detail = ""
+
+    def line(self, text: str) -> None:
+        text = text.rstrip("\n")
+        with self._lock:
+            if self._side_log is not None:
+                self._side_log.write(text + "\n")
+            now = time.monotonic()
+            if now - self._window_started >= self.window_s:
+                self._window_started = now
+                self._passed = 0
+
+            if PASSTHROUGH.search(text):
+                if self._passed < self.passthrough_per_window:
+                    self._passed += 1
+                    self._emit(self._prefix + text)
+                else:
+                    self._suppressed += 1
+
+            match = TOOL_CALLS.search(text)
+            if match:
+                self.tool_calls = int(match.group(1))
+            phase = worker_phase(text)
+            phase_changed = phase is not None and phase != self.phase
+            if phase is not None:
+                self.phase = phase
+            if text.strip():
+                self.detail = text[:200]
+            self._pending += 1
+
+            if phase_changed or now - self._last_flush >= self.window_s:
+                self._flush_locked(now)
+            elif self._timer is None:
+                # Trailing flush so the end of a burst is not held back.
+                self._timer = threading.Timer(self.window_s - (now - self._last_flush), self._flush_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._pending or self._suppressed:
+                self._flush_locked(time.monotonic())
+            if self._side_log is not None:
+                self._side_log.close()
+                self._side_log = None
+
+    def _flush_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+            if self._pending or self._suppressed:
+                self._flush_locked(time.monotonic())
+
+    def _flush_locked(self, now: float) -> None:
+        self._emit(json.dumps({
+            "type": "progress",
+            "taskId": self.task_id,
+            "phase": self.phase,
+            "toolCalls": self.tool_calls,
+            "detail": self.detail,
+            "lines": self._pending,
+            "suppressed": self._suppressed,
+        }))
+        self._last_flush = now
+        self._pending = 0
+        self._suppressed = 0
+
+
+def worker_output(task_id: str, emit: Callable[[str], None]) -> OutputCoalescer | RawOutput:
+    return OutputCoalescer(task_id, emit) if coalescing_enabled() else RawOutput(task_id, emit)
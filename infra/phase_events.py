@@ -0,0 +1,91 @@
+"""
+Sandbox Phase Events
+====================
+
+Machine-readable timing for every step of a sandbox task, emitted as NDJSON
+lines on the same channel as the ``[spawn] ...`` / ``[worker:ID] ...`` text:
+
+    {"type": "phase", "taskId": "t-1", "phase": "clone", "durationMs": 3120,
+     "atMs": 4410, "ok": true, "bytes": 18203344}
+
+``durationMs`` is the phase's own wall time and ``atMs`` the offset of its end
+from the start of the task, both from ``time.monotonic()``. ``bytes`` is set
+where the phase moves data: payload, agent output, a spilled result diff and
+a bundle push, plus clone in setup script mode, where the runner measures the
+fetched objects. The step-by-step clone reports no bytes.
+
+Phases, in order: create, clone, checkout, deps (dependency cache, when
+enabled), snapshot (filesystem snapshots, when enabled), payload, agent_start,
+agent_end, result, push, terminate. Setup script steps are reported as
+payload, clone and checkout, payload first. worker-pool.ts turns the events into tracer
+span events and "Sandbox phase" log records for the dashboard.
+
+Usage:
+    phases = PhaseRecorder(task_id, emit)
+    with phases.phase("clone") as info:
+        ...
+        info["bytes"] = pack_size
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+
+class PhaseRecorder:
+    """Times task phases and emits one ``{"type": "phase"}`` line per phase."""
+
+    def __init__(self, task_id: str, emit: Callable[[str], None]):
+        self.task_id = task_id
+        self.emit = emit
+        self.started = time.monotonic()
+        self.durations: dict[str, float] = {}
+
+    def record(self, phase: str, duration_s: float, ok: bool = True, **attrs) -> None:
+        self.durations[phase] = duration_s
+        event = {
+            "type": "phase",
+            "taskId": self.task_id,
+            "phase": phase,
+            "durationMs": int(duration_s * 1000),
+            "atMs": int((time.monotonic() - self.started) * 1000),
+            "ok": ok,
+        }
+        event.update({k: v for k, v in attrs.items() if v is not None})
+        self.emit(json.dumps(event))
+
+    @contextmanager
+    def phase(self, name: str, **attrs) -> Iterator[dict]:
+        """Time the block; the yielded dict collects extra attributes (e.g. ``bytes``)."""
+        info = dict(attrs)
+        t0 = time.monotonic()
+        ok = True
+        try:
+            yield info
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.record(name, time.monotonic() - t0, ok=ok, **info)
+
+    def from_setup_reports(self, reports: list[dict]) -> None:
+        """Re-emit single-exec setup script step reports as phases (fetch/rebase fold into checkout)."""
+        checkout_ms = 0
+        checkout_ok = True
+        saw_checkout = False
+        for report in reports:
+            step = report.get("step")
+            seconds = report.get("ms", 0) / 1000
+            ok = report.get("exit", 0) == 0
+            if step in ("payload", "clone"):
+                self.record(step, seconds, ok=ok, bytes=report.get("bytes"))
+            elif step in ("fetch", "checkout", "rebase"):
+                saw_checkout = True
+                checkout_ms += report.get("ms", 0)
+                # Conflict-mode rebase is allowed to stop on conflicts.
+                checkout_ok = checkout_ok and (ok or step == "rebase")
+        if saw_checkout:
+            self.record("checkout", checkout_ms / 1000, ok=checkout_ok)
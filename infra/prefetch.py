@@ -0,0 +1,206 @@
+"""
+Speculative Sandbox Prefetch
+============================
+
+While every dispatch slot is busy, the orchestrator tells the spawner daemon
+which tasks are queued next (``{"op": "prefetch", "payload": {...}}``). The
+daemon starts create + clone for them in the background, so when a slot frees
+up and the task is actually submitted, ``run_task`` picks up a sandbox that is
+already provisioned instead of paying for it on the critical path.
+
+The orchestrator keeps asking for the first ``SANDBOX_PREFETCH_DEPTH`` tasks
+waiting for a slot, re-sending the window whenever a task leaves it, so a
+request refused while the depth was full is retried; duplicates are ignored.
+
+A prefetched sandbox is keyed by task id and handed to ``run_task`` through
+the same lease/release interface as the warm pool (``ClaimedSandbox``). If the
+task arrives while its prefetch is still in flight, the claim waits for it —
+it started earlier than a fresh create would.
+
+Bounds (environment, read by ``prefetch_config_from_env``):
+    SANDBOX_PREFETCH_DEPTH    max prefetched sandboxes outstanding (0 disables)
+    SANDBOX_PREFETCH_BUDGET   max idle sandbox-seconds held by ready, unclaimed
+                              prefetches before new ones are refused (default 600)
+    SANDBOX_PREFETCH_TTL      seconds a ready prefetch waits before it is
+                              terminated (default 300)
+
+Usage:
+    prefetcher = Prefetcher(**prefetch_config_from_env())
+    prefetcher.prefetch(payload)                  # ahead of dispatch
+    result = run_task(payload, pool=prefetcher.claim(task_id))
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+
+from infra.sandbox_backend import backend_name
+from infra.sandbox_pool import FILL_CONCURRENCY, PooledSandbox, provision_sandbox, terminate_pooled
+from infra.spawn_sandbox import SANDBOX_TIMEOUT, authed_repo_url
+
+DEFAULT_BUDGET = 600
+DEFAULT_TTL = 300
+# A claim never waits longer than a fresh create + clone would reasonably take.
+CLAIM_WAIT_S = 180
+# Task ids remembered as requested, so a claim can tell a miss from a task never asked for.
+MAX_REQUESTED = 4096
+
+
+def prefetch_config_from_env() -> dict:
+    return {
+        "depth": int(os.environ.get("SANDBOX_PREFETCH_DEPTH", "0")),
+        "budget": float(os.environ.get("SANDBOX_PREFETCH_BUDGET", DEFAULT_BUDGET)),
+        "ttl": float(os.environ.get("SANDBOX_PREFETCH_TTL", DEFAULT_TTL)),
+    }
+
+
+@dataclass
+class _Prefetch:
+    future: Future
+    ready_at: float | None = None
+
+    def idle(self) -> float:
+        return time.monotonic() - self.ready_at if self.ready_at is not None else 0.0
+
+
+class ClaimedSandbox:
+    """Single-use lease source for run_task: yields an already provisioned sandbox once."""
+
+    def __init__(self, entry: PooledSandbox, label: str = "prefetch"):
+        self.label = label
+        self._entry: PooledSandbox | None = entry
+
+    def lease(self) -> PooledSandbox | None:
+        entry, self._entry = self._entry, None
+        return entry
+
+    def release(self, entry: PooledSandbox, recycle: bool = False) -> bool:
+        terminate_pooled(entry)
+        return False
+
+
+class Prefetcher:
+    """Background create + clone for queued tasks, bounded by depth, idle budget and TTL."""
+
+    def __init__(self, depth: int, budget: float = DEFAULT_BUDGET, ttl: float = DEFAULT_TTL):
+        self.depth = depth
+        self.budget = budget
+        self.ttl = ttl
+        self._entries: dict[str, _Prefetch] = {}
+        self._requested: dict[str, None] = {}  # insertion-ordered, capped at MAX_REQUESTED
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, min(depth, FILL_CONCURRENCY)), thread_name_prefix="prefetch",
+        )
+        self._thread: threading.Thread | None = None
+        self.stats = {"started": 0, "claimed": 0, "missed": 0, "expired": 0, "refused": 0, "failed": 0}
+
+    def prefetch(self, payload: dict) -> bool:
+        """Start provisioning for ``payload``'s task. Returns False if refused or already present."""
+        if self.depth <= 0 or self._stop.is_set() or backend_name(payload) != "modal":
+            return False
+        key = payload["task"]["id"]
+        authed_url = authed_repo_url(payload)
+        self._expire()
+        with self._lock:
+            self._requested.pop(key, None)
+            self._requested[key] = None
+            while len(self._requested) > MAX_REQUESTED:
+                del self._requested[next(iter(self._requested))]
+            if key in self._entries:
+                return False
+            idle = sum(e.idle() for e in self._entries.values())
+            if len(self._entries) >= self.depth or idle >= self.budget:
+                self.stats["refused"] += 1
+                return False
+            entry = _Prefetch(
+                # Unclaimed time counts against the sandbox timeout.
+                future=self._executor.submit(provision_sandbox, authed_url, int(self.ttl) + SANDBOX_TIMEOUT),
+            )
+            self._entries[key] = entry
+            self.stats["started"] += 1
+        entry.future.add_done_callback(lambda future: self._on_provisioned(key, entry, future))
+        self._ensure_reaper()
+        return True
+
+    def claim(self, task_id: str) -> ClaimedSandbox | None:
+        """
+        The task's prefetched sandbox as a lease source, waiting for one still
+        in flight. A task that was requested but has no prefetch (refused,
+        expired or failed) counts as a miss; one never requested does not.
+        """
+        with self._lock:
+            requested = task_id in self._requested
+            self._requested.pop(task_id, None)
+            entry = self._entries.pop(task_id, None)
+            if entry is None:
+                if requested:
+                    self.stats["missed"] += 1
+                return None
+        try:
+            sandbox = entry.future.result(timeout=CLAIM_WAIT_S)
+        except Exception:
+            # Nobody else holds the entry now: terminate it if it ever finishes.
+            _discard(entry)
+            with self._lock:
+                self.stats["failed"] += 1
+            return None
+        with self._lock:
+            self.stats["claimed"] += 1
+        return ClaimedSandbox(sandbox)
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            entries, self._entries = list(self._entries.values()), {}
+        for entry in entries:
+            _discard(entry)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"outstanding": len(self._entries), **self.stats}
+
+    # -- internals ----------------------------------------------------------
+
+    def _on_provisioned(self, key: str, entry: _Prefetch, future: Future) -> None:
+        entry.ready_at = time.monotonic()
+        if future.cancelled() or future.exception() is not None:
+            # Drop failures right away so they hold neither depth nor budget.
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+                    self.stats["failed"] += 1
+
+    def _ensure_reaper(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._reap, name="prefetch-reaper", daemon=True)
+        self._thread.start()
+
+    def _reap(self) -> None:
+        while not self._stop.wait(max(1.0, self.ttl / 4)):
+            self._expire()
+
+    def _expire(self) -> None:
+        with self._lock:
+            expired = [k for k, e in self._entries.items() if e.idle() >= self.ttl]
+            entries = [self._entries.pop(k) for k in expired]
+            self.stats["expired"] += len(entries)
+        for entry in entries:
+            _discard(entry)
+
+
+def _discard(entry: _Prefetch) -> None:
+    """Terminate a prefetched sandbox once (or if) provisioning finishes."""
+    def done(future: Future) -> None:
+        if not future.cancelled() and future.exception() is None:
+            terminate_pooled(future.result())
+
+    entry.future.add_done_callback(done)
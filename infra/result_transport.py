@@ -0,0 +1,183 @@
+"""
+Result Transport — chunked reads, compressed diffs by reference
+===============================================================
+
+A handoff carries the task's full ``git diff``. Read in one
+``sb.open(...).read()`` and printed as one stdout line, a large refactor's
+diff is copied whole several times in the spawner and again in
+worker-pool.ts. Instead:
+
+  - worker-runner writes a diff larger than 64 KiB gzipped next to the
+    result (``<result>.diff.gz``) and leaves ``diff`` empty, with
+    ``diffFile`` / ``diffBytes`` pointing at it
+  - the spawner streams that file out of the sandbox in ``RESULT_CHUNK_BYTES``
+    chunks into a content-addressed store on this machine
+    (``<sha256>.diff.gz``) and replaces ``diffFile`` with ``diffRef``
+    ``{path, sha256, bytes, compressedBytes}``; an inline diff over the
+    limit (e.g. from an older worker-runner) is compressed and spilled the
+    same way
+  - the handoff line therefore stays small; the orchestrator reads the diff
+    from ``diffRef.path`` only where it needs the text
+
+Artifacts (result JSON, handoff bundles) are copied in chunks, so spawner
+memory per task is bounded by the chunk size plus the small result JSON.
+Stored diffs older than ``RESULT_STORE_TTL_S`` are pruned on write.
+
+Configuration (environment):
+    RESULT_STORE_DIR        spilled diffs (default ~/.cache/agentswarm/results)
+    RESULT_DIFF_INLINE_MAX  largest diff kept inline, in bytes (default 65536)
+    RESULT_STORE_TTL_S      age after which spilled diffs are pruned (default 86400)
+
+Usage:
+    from infra.result_transport import read_result, spill_diff
+
+    result = spill_diff(sb, read_result(sb, "/workspace/result.json"))
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import BinaryIO
+
+RESULT_CHUNK_BYTES = 1 << 20
+DEFAULT_INLINE_MAX = 64 * 1024
+DEFAULT_STORE_TTL_S = 86400
+DIFF_SUFFIX = ".diff.gz"
+
+
+def result_store_dir() -> Path:
+    return Path(os.environ.get("RESULT_STORE_DIR", Path.home() / ".cache" / "agentswarm" / "results"))
+
+
+def inline_max() -> int:
+    return int(os.environ.get("RESULT_DIFF_INLINE_MAX", DEFAULT_INLINE_MAX))
+
+
+class ContentWriter:
+    """Hashes chunks while writing them to a temp file in ``directory``; ``commit`` names it."""
+
+    def __init__(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+        self.tmp = directory / f".{os.getpid()}-{time.monotonic_ns()}.tmp"
+        self.file: BinaryIO = open(self.tmp, "wb")
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self.file.write(chunk)
+        self.digest.update(chunk)
+        self.size += len(chunk)
+
+    def sha256(self) -> str:
+        return self.digest.hexdigest()
+
+    def commit(self, name: str) -> Path:
+        """Close and rename to ``name``; an existing file with that name is kept (and touched)."""
+        self.file.close()
+        path = self.directory / name
+        if path.exists():
+            self.tmp.unlink(missing_ok=True)
+            os.utime(path)
+        else:
+            os.replace(self.tmp, path)
+        return path.resolve()
+
+    def abort(self) -> None:
+        self.file.close()
+        self.tmp.unlink(missing_ok=True)
+
+
+def _binary(chunk: bytes | str) -> bytes:
+    return chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+
+
+def copy_out(sb, path: str, dest: BinaryIO) -> int:
+    """Stream sandbox file ``path`` into ``dest`` chunk by chunk; returns the byte count."""
+    total = 0
+    f = sb.open(path, "rb")
+    try:
+        while chunk := _binary(f.read(RESULT_CHUNK_BYTES)):
+            dest.write(chunk)
+            total += len(chunk)
+    finally:
+        f.close()
+    return total
+
+
+class _Chunks:
+    def __init__(self):
+        self.parts: list[bytes] = []
+
+    def write(self, chunk: bytes) -> None:
+        self.parts.append(chunk)
+
+
+def read_result(sb, path: str) -> dict:
+    """The result JSON at ``path``, read in chunks."""
+    chunks = _Chunks()
+    copy_out(sb, path, chunks)
+    return json.loads(b"".join(chunks.parts))
+
+
+def _diff_ref(path: Path, sha: str, size: int, compressed: int) -> dict:
+    return {"path": str(path), "sha256": sha, "bytes": size, "compressedBytes": compressed}
+
+
+def _spill_inline(result: dict) -> dict:
+    data = result["diff"].encode("utf-8")
+    writer = ContentWriter(result_store_dir())
+    writer.write(gzip.compress(data, compresslevel=6, mtime=0))
+    path = writer.commit(f"{writer.sha256()}{DIFF_SUFFIX}")
+    result["diff"] = ""
+    result["diffRef"] = _diff_ref(path, writer.sha256(), len(data), writer.size)
+    return result
+
+
+def _spill_needed(result: dict) -> bool:
+    return len(result.get("diff") or "") > inline_max()
+
+
+def spill_diff(sb, result: dict) -> dict:
+    """
+    Move the result's diff into the local store and reference it as
+    ``diffRef``: the gzipped ``diffFile`` worker-runner left in the sandbox,
+    or an inline diff over ``RESULT_DIFF_INLINE_MAX``. Small results pass
+    through unchanged.
+    """
+    diff_file = result.pop("diffFile", None)
+    if diff_file:
+        writer = ContentWriter(result_store_dir())
+        try:
+            copy_out(sb, diff_file, writer)
+        except BaseException:
+            writer.abort()
+            raise
+        path = writer.commit(f"{writer.sha256()}{DIFF_SUFFIX}")
+        result["diffRef"] = _diff_ref(path, writer.sha256(), result.pop("diffBytes", 0), writer.size)
+        prune_store()
+    elif _spill_needed(result):
+        _spill_inline(result)
+        prune_store()
+    return result
+
+
+def prune_store(max_age_s: float | None = None) -> int:
+    """Remove spilled diffs older than ``max_age_s``; returns how many were removed."""
+    if max_age_s is None:
+        max_age_s = float(os.environ.get("RESULT_STORE_TTL_S", DEFAULT_STORE_TTL_S))
+    cutoff = time.time() - max_age_s
+    removed = 0
+    for path in result_store_dir().glob(f"*{DIFF_SUFFIX}"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except OSError:
+            continue
+    return removed
@@ -0,0 +1,398 @@
+"""
+Sandbox Backends
+================
+
+``run_task`` drives a sandbox through a small surface: create, ``open`` for
+file I/O, ``exec`` with streamed stdout/stderr (and stdin), ``wait`` /
+``returncode`` and ``terminate``. Two backends provide it:
+
+    modal  — ``modal.Sandbox`` (default). ``import modal``, the App lookup and
+             the worker image are resolved lazily on first create, so the
+             local backend works on machines without Modal installed. Creates
+             pass through the admission controller (``infra.admission``).
+    local  — each sandbox is a directory on this machine and every exec a
+             subprocess. The repo is a ``git worktree`` of one shared local
+             clone per repo URL, so "clone" is a worktree add that shares the
+             object store instead of a network clone. Create is milliseconds.
+
+Both backends can snapshot a set-up sandbox and fork new sandboxes from it
+(``infra.fs_snapshot``): Modal snapshots the container filesystem into an
+image; the local backend keeps a copy-on-write copy of the workspace (without
+the worktree's git link) and forks by adding a fresh worktree and copying the
+snapshot's untracked files, e.g. ``node_modules``, over it.
+
+The local backend keeps the sandbox's absolute paths working by remapping
+``/workspace`` (per-sandbox directory), ``/cache`` (local cache root) and
+``/agent/worker-runner.js`` (the locally built packages/sandbox dist) in exec
+argv and ``open`` paths; worker-runner honours ``WORKSPACE_DIR`` and
+``SANDBOX_CACHE_DIR``.
+
+Configuration (environment):
+    SANDBOX_BACKEND           "modal" (default) or "local"; payload ``backend`` overrides
+    LOCAL_SANDBOX_ROOT        local backend state directory
+                              (default ~/.cache/agentswarm/local-sandboxes)
+    LOCAL_FETCH_INTERVAL_S    min seconds between fetches of a shared clone (default 10)
+
+Usage:
+    from infra.sandbox_backend import backend_for
+
+    backend = backend_for(payload)
+    sb = backend.create(timeout=2400)
+    proc = sb.exec("git", "status")
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from infra.admission import admission_controller
+from infra.clone_cache import repo_key
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BACKEND = "modal"
+DEFAULT_FETCH_INTERVAL_S = 10
+
+
+def backend_name(payload: dict) -> str:
+    return payload.get("backend") or os.environ.get("SANDBOX_BACKEND", DEFAULT_BACKEND)
+
+
+# ---------------------------------------------------------------------------
+# Modal
+# ---------------------------------------------------------------------------
+def resource_kwargs(cpu: float | None, memory: int | None) -> dict:
+    """``Sandbox.create`` cpu/memory kwargs; None leaves Modal's default."""
+    kwargs: dict = {}
+    if cpu is not None:
+        kwargs["cpu"] = cpu
+    if memory is not None:
+        kwargs["memory"] = memory
+    return kwargs
+
+
+class ModalBackend:
+    """``modal.Sandbox`` with the agentswarm App and worker image, resolved on first use."""
+
+    name = "modal"
+    # Sandboxes start empty: run_task clones, the warm pool and bundles apply.
+    shared_clone = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._app = None
+        self._image = None
+        # Layer keys to record once an image build is known to have succeeded.
+        self._unrecorded_build: dict | None = None
+
+    def resources(self) -> tuple:
+        """(App, worker Image) — imports modal and builds the image definition once."""
+        with self._lock:
+            if self._app is None:
+                import modal
+
+                from infra.sandbox_image import build_cache_report, create_worker_image, describe_report
+
+                self._app = modal.App.lookup("agentswarm", create_if_missing=True)
+                self._image = create_worker_image()
+                # stderr: stdout carries the spawner's NDJSON.
+                self._unrecorded_build = build_cache_report()
+                print(f"[image] {describe_report(self._unrecorded_build)}", file=sys.stderr, flush=True)
+            return self._app, self._image
+
+    def mark_image_built(self) -> None:
+        """After the first successful create on the worker image: its layers exist in Modal now."""
+        from infra.sandbox_image import record_build
+
+        with self._lock:
+            report, self._unrecorded_build = self._unrecorded_build, None
+        if report is not None:
+            record_build(report)
+
+    def create(
+        self,
+        timeout: int,
+        volumes: dict | None = None,
+        cpu: float | None = None,
+        memory: int | None = None,
+        image=None,
+    ):
+        import modal
+
+        app, worker_image = self.resources()
+        with admission_controller().admit():
+            sb = modal.Sandbox.create(
+                app=app,
+                image=image or worker_image,
+                timeout=timeout,
+                workdir="/workspace",
+                volumes=volumes or {},
+                **resource_kwargs(cpu, memory),
+            )
+        if image is None:
+            self.mark_image_built()
+        return sb
+
+    def snapshot(self, sb) -> str:
+        """Snapshot the sandbox filesystem; returns the snapshot image id."""
+        return sb.snapshot_filesystem().object_id
+
+    def fork(self, ref: str, authed_url: str, timeout: int, volumes: dict | None = None, **resources):
+        """New sandbox whose filesystem starts as snapshot ``ref`` (repo already cloned)."""
+        import modal
+
+        return self.create(timeout, volumes, image=modal.Image.from_id(ref), **resources)
+
+    def drop_snapshot(self, ref: str) -> None:
+        # Snapshot images are garbage-collected by Modal.
+        pass
+
+    def prepare_clone(self, authed_url: str, repo_dir: str) -> tuple[list[str], int | None] | None:
+        """Backend-specific clone command, or None for the regular ``git clone``."""
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Local
+# ---------------------------------------------------------------------------
+class _LocalStdin:
+    """Bytes-or-str writer with the write / write_eof / drain shape of Modal's stdin."""
+
+    def __init__(self, pipe):
+        self._pipe = pipe
+
+    def write(self, data: bytes | str) -> None:
+        self._pipe.write(data.encode("utf-8") if isinstance(data, str) else data)
+
+    def write_eof(self) -> None:
+        self._pipe.close()
+
+    def drain(self) -> None:
+        if not self._pipe.closed:
+            self._pipe.flush()
+
+
+class LocalProcess:
+    """A subprocess shaped like a Modal ``ContainerProcess``."""
+
+    def __init__(self, argv: list[str], cwd: Path, env: dict, timeout: int | None):
+        self._proc = subprocess.Popen(
+            argv,
+            cwd=cwd,
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+        )
+        self.stdin = _LocalStdin(self._proc.stdin)
+        self.stdout = io.TextIOWrapper(self._proc.stdout, encoding="utf-8", errors="replace")
+        self.stderr = io.TextIOWrapper(self._proc.stderr, encoding="utf-8", errors="replace")
+        self._timer = None
+        if timeout:
+            self._timer = threading.Timer(timeout, self.kill)
+            self._timer.daemon = True
+            self._timer.start()
+
+    @property
+    def returncode(self) -> int | None:
+        return self._proc.returncode
+
+    def wait(self) -> int:
+        code = self._proc.wait()
+        if self._timer is not None:
+            self._timer.cancel()
+        return code
+
+    def communicate(self) -> int:
+        """Wait while draining both pipes; the output stays readable from ``stdout`` / ``stderr``."""
+        out, err = self._proc.communicate()
+        self.stdout = io.StringIO(out.decode("utf-8", errors="replace"))
+        self.stderr = io.StringIO(err.decode("utf-8", errors="replace"))
+        return self.wait()
+
+    def kill(self) -> None:
+        try:
+            os.killpg(self._proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+class LocalSandbox:
+    """One task's directory tree plus the processes exec'd in it."""
+
+    def __init__(self, backend: "LocalBackend", root: Path, timeout: int):
+        self.backend = backend
+        self.root = root
+        self.workspace = root / "workspace"
+        self.workspace.mkdir(parents=True)
+        self._procs: list[LocalProcess] = []
+        self._lock = threading.Lock()
+        self._deadline = threading.Timer(timeout, self.terminate)
+        self._deadline.daemon = True
+        self._deadline.start()
+        self._mapping = {
+            "/agent/worker-runner.js": str(REPO_ROOT / "packages" / "sandbox" / "dist" / "worker-runner.js"),
+            "/workspace": str(self.workspace),
+            "/cache": str(backend.root / "cache"),
+        }
+        self._pattern = re.compile(
+            r"(?<![\w./-])(" + "|".join(re.escape(k) for k in self._mapping) + r")(?=[/\s'\";:]|$)"
+        )
+
+    def remap(self, text: str) -> str:
+        """Rewrite sandbox-absolute paths to this sandbox's local directories."""
+        return self._pattern.sub(lambda m: self._mapping[m.group(1)], text)
+
+    def open(self, path: str, mode: str = "r"):
+        return open(self.remap(path), mode)
+
+    def exec(self, *argv: str, timeout: int | None = None, workdir: str | None = None) -> LocalProcess:
+        args = [self.remap(a) for a in argv]
+        cwd = Path(self.remap(workdir)) if workdir else self.workspace
+        env = {**os.environ, "WORKSPACE_DIR": str(self.workspace), "SANDBOX_CACHE_DIR": self._mapping["/cache"]}
+        if args[:1] == ["git"] and "fetch" in args:
+            # Worktrees share refs with the shared clone; concurrent fetches
+            # would race on ref locks, so serialize them per repo.
+            with self.backend.repo_lock_for(args):
+                proc = LocalProcess(args, cwd, env, timeout)
+                # Not wait(): a fetch that fills a pipe would block with the lock held.
+                proc.communicate()
+        else:
+            proc = LocalProcess(args, cwd, env, timeout)
+        with self._lock:
+            self._procs.append(proc)
+        return proc
+
+    def terminate(self) -> None:
+        self._deadline.cancel()
+        with self._lock:
+            procs, self._procs = self._procs, []
+        for proc in procs:
+            proc.kill()
+        repo = self.workspace / "repo"
+        if (repo / ".git").is_file():
+            subprocess.run(
+                ["git", "-C", str(repo), "worktree", "remove", "--force", str(repo)],
+                capture_output=True, timeout=60,
+            )
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+class LocalBackend:
+    """Subprocess sandboxes on this machine; repos are worktrees of one shared clone per URL."""
+
+    name = "local"
+    # The worktree is detached at origin/main of a shared clone whose branch
+    # refs outlive the task, so branch with ``checkout -B`` like a pooled sandbox.
+    shared_clone = True
+
+    def __init__(self, root: Path | None = None):
+        self.root = (root or Path(
+            os.environ.get("LOCAL_SANDBOX_ROOT", Path.home() / ".cache" / "agentswarm" / "local-sandboxes")
+        )).resolve()
+        self.fetch_interval = float(os.environ.get("LOCAL_FETCH_INTERVAL_S", DEFAULT_FETCH_INTERVAL_S))
+        self._lock = threading.Lock()
+        self._repo_locks: dict[str, threading.Lock] = {}
+        self._fetched_at: dict[str, float] = {}
+
+    def create(
+        self, timeout: int, volumes: dict | None = None, cpu: float | None = None, memory: int | None = None,
+    ) -> LocalSandbox:
+        # cpu/memory requests do not apply to local subprocesses.
+        root = self.root / "sandboxes" / uuid.uuid4().hex[:12]
+        return LocalSandbox(self, root, timeout)
+
+    def snapshot(self, sb: LocalSandbox) -> str:
+        """Copy-on-write copy of the workspace, minus the worktree's link to the shared clone."""
+        dest = self.root / "snapshots" / uuid.uuid4().hex[:12]
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        subprocess.run(["cp", "-a", "--reflink=auto", str(sb.workspace), str(dest)], check=True, timeout=600)
+        (dest / "repo" / ".git").unlink(missing_ok=True)
+        (dest / "task.json").unlink(missing_ok=True)  # carries the task's credentials
+        return str(dest)
+
+    def fork(self, ref: str, authed_url: str, timeout: int, volumes: dict | None = None, **resources) -> LocalSandbox:
+        """Fresh worktree plus the snapshot's files; tracked files come from the new worktree."""
+        sb = self.create(timeout)
+        argv, clone_timeout = self.prepare_clone(authed_url, str(sb.workspace / "repo"))
+        subprocess.run(argv, check=True, capture_output=True, timeout=clone_timeout)
+        # -n: never overwrite what the worktree checked out.
+        subprocess.run(
+            ["cp", "-a", "-n", "--reflink=auto", f"{ref}/.", str(sb.workspace)],
+            check=True, capture_output=True, timeout=600,
+        )
+        return sb
+
+    def drop_snapshot(self, ref: str) -> None:
+        shutil.rmtree(ref, ignore_errors=True)
+
+    def prepare_clone(self, authed_url: str, repo_dir: str) -> tuple[list[str], int | None]:
+        """Clone/fetch the shared repo on the host, then add a worktree for the sandbox."""
+        shared = self._shared_clone(authed_url)
+        return ["git", "-C", str(shared), "worktree", "add", "--detach", repo_dir, "origin/main"], 120
+
+    def repo_lock_for(self, argv: list[str]) -> threading.Lock:
+        """Lock of the shared clone a ``git -C <repo> ...`` command touches."""
+        repo = argv[2] if argv[1:2] == ["-C"] else os.getcwd()
+        common = subprocess.run(
+            ["git", "-C", repo, "rev-parse", "--path-format=absolute", "--git-common-dir"],
+            capture_output=True, text=True,
+        ).stdout.strip()
+        return self._repo_lock(common or repo)
+
+    def _repo_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._repo_locks.setdefault(key, threading.Lock())
+
+    def _shared_clone(self, authed_url: str) -> Path:
+        shared = self.root / "repos" / repo_key(authed_url)
+        with self._repo_lock(str(shared / ".git")):
+            if not (shared / ".git").exists():
+                shared.parent.mkdir(parents=True, exist_ok=True)
+                _run_git(["git", "clone", "--no-checkout", authed_url, str(shared)], timeout=600)
+                self._fetched_at[str(shared)] = time.monotonic()
+            elif time.monotonic() - self._fetched_at.get(str(shared), 0) > self.fetch_interval:
+                _run_git(["git", "-C", str(shared), "remote", "set-url", "origin", authed_url], timeout=60)
+                _run_git(["git", "-C", str(shared), "fetch", "--prune", "origin"], timeout=300)
+                subprocess.run(["git", "-C", str(shared), "worktree", "prune"], capture_output=True)
+                self._fetched_at[str(shared)] = time.monotonic()
+        return shared
+
+
+def _run_git(argv: list[str], timeout: int) -> None:
+    """Run a host-side git command with its output captured (daemon stdout carries frames)."""
+    proc = subprocess.run(argv, capture_output=True, text=True, timeout=timeout)
+    if proc.returncode != 0:
+        step = argv[3] if argv[1] == "-C" else argv[1]
+        raise RuntimeError(f"git {step} failed (exit {proc.returncode}): {proc.stderr.strip()}")
+
+
+# ---------------------------------------------------------------------------
+# Selection
+# ---------------------------------------------------------------------------
+BACKENDS = {"modal": ModalBackend, "local": LocalBackend}
+_instances: dict[str, object] = {}
+_instances_lock = threading.Lock()
+
+
+def get_backend(name: str) -> ModalBackend | LocalBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Invalid sandbox backend: {name}. Must be one of: {', '.join(BACKENDS)}")
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = BACKENDS[name]()
+        return _instances[name]
+
+
+def backend_for(payload: dict) -> ModalBackend | LocalBackend:
+    return get_backend(backend_name(payload))
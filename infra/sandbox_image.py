@@ -11,17 +11,149 @@ Each sandbox gets a copy of this image with:
 - The @agentswarm/sandbox package (the agent itself)
 - Pi coding agent SDK (@mariozechner/pi-coding-agent)
 
+The image is a list of build steps, one Modal layer each, ordered by how
+often they change: system packages and the Pi SDK's global npm install
+first, then our own compiled dist (core, then sandbox) as the top layers.
+Modal caches a layer until its definition or anything below it changes, so
+rebuilding packages/*/dist only re-copies a few files instead of re-running
+the npm install.
+
+Each layer has a key chained from the layer below and its own definition;
+copied dist layers also hash their file contents (``dist_fingerprint``).
+``build_cache_report`` compares the keys with the ones recorded after earlier
+successful builds and predicts the first layer Modal will rebuild; it does
+not query Modal's build cache.
+
+Configuration (environment):
+    IMAGE_LAYER_CACHE   recorded layer keys (default ~/.cache/agentswarm/image-layers.json)
+
 Usage:
     from infra.sandbox_image import create_agent_image
     image = create_agent_image()
     sandbox = modal.Sandbox.create(image=image, ...)
+
+    # Which layers a worker image rebuild would reuse
+    python infra/sandbox_image.py --report
 """
 
-import modal
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+import threading
+from dataclasses import dataclass, field
 from pathlib import Path
 
+import modal
+
 # Root of the agentswarm repo
 REPO_ROOT = Path(__file__).parent.parent
+PI_AGENT_VERSION = "0.52.12"
+# Recorded layer keys kept for the cache report (Modal keeps old layers too).
+MAX_RECORDED_KEYS = 500
+
+
+@dataclass(frozen=True)
+class Step:
+    """One image layer: ``getattr(image, method)(*args, **kwargs)``."""
+
+    name: str
+    method: str
+    args: tuple
+    kwargs: dict = field(default_factory=dict)
+    # Local path whose contents the layer copies (hashed into its key).
+    source: Path | None = None
+
+
+BASE_STEPS: list[Step] = [
+    # System packages
+    Step("apt", "apt_install", (
+        "git",
+        "curl",
+        "wget",
+        "jq",
+        "tree",
+        "build-essential",
+        "ca-certificates",
+        "gnupg",
+    )),
+    # Install Node.js 22 via NodeSource
+    Step("nodejs", "run_commands", (
+        "curl -fsSL https://deb.nodesource.com/setup_22.x | bash -",
+        "apt-get install -y nodejs",
+        "node --version",
+        "npm --version",
+    )),
+    # Install ripgrep (not in default debian repos)
+    Step("ripgrep", "run_commands", (
+        "curl -LO https://github.com/BurntSushi/ripgrep/releases/download/14.1.1/ripgrep_14.1.1-1_amd64.deb",
+        "dpkg -i ripgrep_14.1.1-1_amd64.deb",
+        "rm ripgrep_14.1.1-1_amd64.deb",
+    )),
+    # Install pnpm
+    Step("pnpm", "run_commands", (
+        "npm install -g pnpm@9",
+        "pnpm --version",
+    )),
+    # Git configuration for agent commits
+    Step("git-config", "run_commands", (
+        'git config --global user.name "andrewcai8"',
+        'git config --global user.email "andrewca78@gmail.com"',
+        'git config --global init.defaultBranch main',
+    )),
+    # Set working directory
+    Step("workdir", "workdir", ("/workspace",)),
+    # Environment variables
+    Step("env", "env", ({
+        "NODE_ENV": "production",
+        "PNPM_HOME": "/root/.local/share/pnpm",
+        "PATH": "/root/.local/share/pnpm:/usr/local/bin:/usr/bin:/bin",
+    },)),
+]
+
+
+def _package_steps(package: str) -> list[Step]:
+    dist = REPO_ROOT / "packages" / package / "dist"
+    pkg = REPO_ROOT / "packages" / package / "package.json"
+    return [
+        Step(f"{package}-package.json", "add_local_file",
+             (str(pkg), f"/agent/packages/{package}/package.json"), {"copy": True}, pkg),
+        Step(f"{package}-dist", "add_local_dir",
+             (str(dist), f"/agent/packages/{package}/dist"), {"copy": True}, dist),
+    ]
+
+
+def worker_steps() -> list[Step]:
+    """Layers on top of the agent image, least frequently changing first."""
+    return [
+        # Install Pi coding agent SDK globally
+        Step("pi-coding-agent", "run_commands", (f"npm install -g @mariozechner/pi-coding-agent@{PI_AGENT_VERSION}",)),
+        # Link @agentswarm/core so sandbox can resolve it
+        # (both packages are pre-built JS with zero runtime deps — no npm install needed).
+        # The targets are copied in by the layers above this one; dangling until then.
+        Step("links", "run_commands", (
+            "mkdir -p /agent/node_modules/@agentswarm",
+            "ln -s /agent/packages/core /agent/node_modules/@agentswarm/core",
+            # Link Pi SDK so worker-runner.js can resolve it
+            "ln -s $(npm root -g)/@mariozechner /agent/node_modules/@mariozechner",
+            "ln -s /agent/packages/sandbox/dist/worker-runner.js /agent/worker-runner.js",
+        )),
+        # Our own code last: core changes less often than the sandbox package
+        *_package_steps("core"),
+        *_package_steps("sandbox"),
+    ]
+
+
+def _apply(image: modal.Image, steps: list[Step]) -> modal.Image:
+    for step in steps:
+        image = getattr(image, step.method)(*step.args, **step.kwargs)
+    return image
+
+
+def _root_image() -> modal.Image:
+    return modal.Image.debian_slim(python_version="3.12")
 
 
 def create_agent_image() -> modal.Image:
@@ -33,59 +165,11 @@ def create_agent_image() -> modal.Image:
     - Node.js 22.x LTS via NodeSource
     - Git, curl, wget, ripgrep, jq, tree, build-essential
     - pnpm package manager
-    - The compiled @agentswarm/sandbox package
     
     Returns:
         modal.Image: Ready-to-use image for Sandbox.create()
     """
-    image = (
-        modal.Image.debian_slim(python_version="3.12")
-        # System packages
-        .apt_install(
-            "git",
-            "curl",
-            "wget",
-            "jq",
-            "tree",
-            "build-essential",
-            "ca-certificates",
-            "gnupg",
-        )
-        # Install Node.js 22 via NodeSource
-        .run_commands(
-            "curl -fsSL https://deb.nodesource.com/setup_22.x | bash -",
-            "apt-get install -y nodejs",
-            "node --version",
-            "npm --version",
-        )
-        # Install ripgrep (not in default debian repos)
-        .run_commands(
-            "curl -LO https://github.com/BurntSushi/ripgrep/releases/download/14.1.1/ripgrep_14.1.1-1_amd64.deb",
-            "dpkg -i ripgrep_14.1.1-1_amd64.deb",
-            "rm ripgrep_14.1.1-1_amd64.deb",
-        )
-        # Install pnpm
-        .run_commands(
-            "npm install -g pnpm@9",
-            "pnpm --version",
-        )
-        # Git configuration for agent commits
-        .run_commands(
-            'git config --global user.name "andrewcai8"',
-            'git config --global user.email "andrewca78@gmail.com"',
-            'git config --global init.defaultBranch main',
-        )
-        # Set working directory
-        .workdir("/workspace")
-        # Environment variables
-        .env({
-            "NODE_ENV": "production",
-            "PNPM_HOME": "/root/.local/share/pnpm",
-            "PATH": "/root/.local/share/pnpm:/usr/local/bin:/usr/bin:/bin",
-        })
-    )
-    
-    return image
+    return _apply(_root_image(), BASE_STEPS)
 
 
 def create_worker_image() -> modal.Image:
@@ -94,37 +178,127 @@ def create_worker_image() -> modal.Image:
     and the Pi coding agent SDK.
     
     Call this after packages/sandbox has been built locally.
-    Copies the compiled sandbox agent code into the image.
+    Copies the compiled sandbox agent code into the image as its top layers.
     """
-    base = create_agent_image()
-    
-    sandbox_dist = REPO_ROOT / "packages" / "sandbox" / "dist"
-    sandbox_pkg = REPO_ROOT / "packages" / "sandbox" / "package.json"
-    core_dist = REPO_ROOT / "packages" / "core" / "dist"
-    core_pkg = REPO_ROOT / "packages" / "core" / "package.json"
-    
-    image = (
-        base
-        # Copy core package
-        .add_local_dir(str(core_dist), "/agent/packages/core/dist", copy=True)
-        .add_local_file(str(core_pkg), "/agent/packages/core/package.json", copy=True)
-        # Copy sandbox package
-        .add_local_dir(str(sandbox_dist), "/agent/packages/sandbox/dist", copy=True)
-        .add_local_file(str(sandbox_pkg), "/agent/packages/sandbox/package.json", copy=True)
-        # Install Pi coding agent SDK globally
-        .run_commands("npm install -g @mariozechner/pi-coding-agent@0.52.12")
-        # Link @agentswarm/core so sandbox can resolve it
-        # (both packages are pre-built JS with zero runtime deps — no npm install needed)
-        .run_commands(
-            "mkdir -p /agent/node_modules/@agentswarm",
-            "ln -s /agent/packages/core /agent/node_modules/@agentswarm/core",
-            # Link Pi SDK so worker-runner.js can resolve it
-            "ln -s $(npm root -g)/@mariozechner /agent/node_modules/@mariozechner",
-            "ln -s /agent/packages/sandbox/dist/worker-runner.js /agent/worker-runner.js",
-        )
+    return _apply(create_agent_image(), worker_steps())
+
+
+# ---------------------------------------------------------------------------
+# Fingerprints and the build cache report
+# ---------------------------------------------------------------------------
+def _files(path: Path) -> list[Path]:
+    if path.is_file():
+        return [path]
+    return sorted(p for p in path.rglob("*") if p.is_file())
+
+
+def content_hash(path: Path) -> str:
+    """sha256 over the relative paths and contents of the files under ``path``."""
+    digest = hashlib.sha256()
+    for file in _files(path):
+        digest.update(str(file.relative_to(path.parent)).encode("utf-8") + b"\0")
+        digest.update(file.read_bytes())
+    return digest.hexdigest()
+
+
+def dist_fingerprint() -> str:
+    """Fingerprint of every local input the worker image copies in."""
+    digest = hashlib.sha256()
+    for step in worker_steps():
+        if step.source is not None:
+            digest.update(content_hash(step.source).encode("ascii"))
+    return digest.hexdigest()[:16]
+
+
+def layer_keys() -> list[tuple[str, str]]:
+    """(layer name, key) for every worker image layer, bottom to top."""
+    key = hashlib.sha256(b"debian_slim:3.12").hexdigest()
+    keys = []
+    for step in BASE_STEPS + worker_steps():
+        spec = json.dumps([step.method, step.args, step.kwargs], sort_keys=True, default=str)
+        content = content_hash(step.source) if step.source is not None else ""
+        key = hashlib.sha256(f"{key}\0{spec}\0{content}".encode("utf-8")).hexdigest()
+        keys.append((step.name, key[:16]))
+    return keys
+
+
+def _sources_stamp() -> tuple:
+    """(path, size, mtime) of every file the worker image copies in; cheap next to hashing them."""
+    stamp = []
+    for step in worker_steps():
+        if step.source is not None:
+            for file in _files(step.source):
+                st = file.stat()
+                stamp.append((str(file), st.st_size, st.st_mtime_ns))
+    return tuple(stamp)
+
+
+_image_key: tuple[tuple, str] | None = None
+_image_key_lock = threading.Lock()
+
+
+def worker_image_key() -> str:
+    """
+    Key of the worker image's top layer, i.e. of the whole image, for the
+    dist currently on disk. Recomputed when a dist file changes, so a
+    long-running daemon follows ``packages/*/dist`` rebuilds.
+    """
+    global _image_key
+    stamp = _sources_stamp()
+    with _image_key_lock:
+        if _image_key is None or _image_key[0] != stamp:
+            _image_key = (stamp, layer_keys()[-1][1])
+        return _image_key[1]
+
+
+def _layer_cache_path() -> Path:
+    return Path(os.environ.get("IMAGE_LAYER_CACHE", Path.home() / ".cache" / "agentswarm" / "image-layers.json"))
+
+
+def _recorded_keys() -> list[str]:
+    try:
+        return json.loads(_layer_cache_path().read_text()).get("keys", [])
+    except (OSError, ValueError):
+        return []
+
+
+def build_cache_report() -> dict:
+    """
+    Which worker image layers a build is expected to take from cache: a
+    layer counts as cached when its key was recorded after an earlier build
+    succeeded (``record_build``). A prediction from local records, not
+    Modal's cache. ``rebuildFrom`` is the first layer that is not (None
+    when the whole image is expected to be cached).
+    """
+    known = set(_recorded_keys())
+    layers = [{"name": name, "key": key, "cached": key in known} for name, key in layer_keys()]
+    rebuild = next((layer["name"] for layer in layers if not layer["cached"]), None)
+    return {
+        "fingerprint": dist_fingerprint(),
+        "layers": layers,
+        "rebuildFrom": rebuild,
+        "rebuildLayers": sum(not layer["cached"] for layer in layers),
+    }
+
+
+def record_build(report: dict) -> None:
+    """Remember ``report``'s layer keys as built (most recent last, capped); call once the image built."""
+    keys = [k for k in _recorded_keys() if k not in {layer["key"] for layer in report["layers"]}]
+    keys += [layer["key"] for layer in report["layers"]]
+    path = _layer_cache_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps({"fingerprint": report["fingerprint"], "keys": keys[-MAX_RECORDED_KEYS:]}))
+    os.replace(tmp, path)
+
+
+def describe_report(report: dict) -> str:
+    if report["rebuildFrom"] is None:
+        return f"worker image dist {report['fingerprint']}: all {len(report['layers'])} layers expected cached"
+    return (
+        f"worker image dist {report['fingerprint']}: {report['rebuildLayers']}/{len(report['layers'])} "
+        f"layers expected to build, from {report['rebuildFrom']}"
     )
-    
-    return image
 
 
 # Standalone: test image build
@@ -170,3 +344,7 @@ def main():
         detail = info.get("version", info.get("error", "unknown"))
         print(f"  {status} {tool}: {detail}")
     print("==================================\n")
+
+
+if __name__ == "__main__" and "--report" in sys.argv:
+    print(json.dumps(build_cache_report(), indent=2))
@@ -0,0 +1,267 @@
+"""
+Warm Sandbox Pool
+=================
+
+Keeps N idle Modal sandboxes with the target repo already cloned and
+fast-forwarded to the current ``main``, so ``run_task`` can lease one instead
+of paying for ``Sandbox.create`` + a full ``git clone`` on the critical path.
+
+Only useful inside a long-lived process (the spawner daemon); a one-shot
+``spawn_sandbox.py`` invocation never builds a pool.
+
+Lifecycle of a pooled sandbox:
+    create → clone → idle ─┬─ refresh (main advanced: fetch + reset --hard)
+                           ├─ expire  (older than max_age: terminate + replace)
+                           └─ lease → run_task → release ─┬─ recycle (clean + idle)
+                                                          └─ terminate
+
+Configuration (environment, read by ``pool_config_from_env``):
+    SANDBOX_POOL_SIZE              idle sandboxes to keep (0 disables the pool)
+    SANDBOX_POOL_MAX_AGE           seconds before an idle sandbox is replaced
+    SANDBOX_POOL_REFRESH_INTERVAL  seconds between ``git ls-remote`` checks of main
+    SANDBOX_POOL_RECYCLE           "1" to reset and reuse sandboxes after a task
+
+Usage:
+    from infra.sandbox_pool import SandboxPool, pool_config_from_env
+
+    pool = SandboxPool(authed_url, **pool_config_from_env())
+    pool.start()
+    result = run_task(payload, pool=pool)
+    pool.shutdown()
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from infra.clone_cache import bundle_for
+from infra.spawn_sandbox import REPO_DIR, SANDBOX_TIMEOUT, clone_repo, create_sandbox, sandbox_volumes
+
+DEFAULT_MAX_AGE = 900
+DEFAULT_REFRESH_INTERVAL = 30
+# Concurrent creates while (re)filling — keeps a cold start from stampeding Modal.
+FILL_CONCURRENCY = 4
+
+
+def pool_config_from_env() -> dict:
+    return {
+        "size": int(os.environ.get("SANDBOX_POOL_SIZE", "0")),
+        "max_age": float(os.environ.get("SANDBOX_POOL_MAX_AGE", DEFAULT_MAX_AGE)),
+        "refresh_interval": float(
+            os.environ.get("SANDBOX_POOL_REFRESH_INTERVAL", DEFAULT_REFRESH_INTERVAL)
+        ),
+        "recycle": os.environ.get("SANDBOX_POOL_RECYCLE", "0") == "1",
+    }
+
+
+def remote_main_sha(authed_url: str, branch: str = "main") -> str | None:
+    """Current tip of ``branch`` on the remote, via a local ``git ls-remote``."""
+    try:
+        out = subprocess.run(
+            ["git", "ls-remote", authed_url, f"refs/heads/{branch}"],
+            capture_output=True, text=True, timeout=30,
+        ).stdout.strip()
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return out.split()[0] if out else None
+
+
+@dataclass
+class PooledSandbox:
+    sandbox: object
+    created_at: float = field(default_factory=time.monotonic)
+    main_sha: str | None = None
+    # Volume mount paths the sandbox was created with (see sandbox_volumes).
+    mounts: frozenset[str] = frozenset()
+
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+
+class SandboxPool:
+    """Thread-safe pool of pre-cloned idle sandboxes for one repo URL."""
+
+    label = "warm pool"
+
+    def __init__(
+        self,
+        authed_url: str,
+        size: int,
+        max_age: float = DEFAULT_MAX_AGE,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+        recycle: bool = False,
+    ):
+        self.authed_url = authed_url
+        self.size = size
+        self.max_age = max_age
+        self.refresh_interval = refresh_interval
+        self.recycle = recycle
+
+        self._idle: list[PooledSandbox] = []
+        self._filling = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=FILL_CONCURRENCY, thread_name_prefix="pool-fill")
+        self._thread: threading.Thread | None = None
+        self._main_sha: str | None = None
+
+        self.stats = {"leased": 0, "misses": 0, "created": 0, "recycled": 0, "expired": 0, "refreshed": 0}
+
+    # -- public API ---------------------------------------------------------
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._main_sha = remote_main_sha(self.authed_url)
+        self._thread = threading.Thread(target=self._maintain, name="pool-maintain", daemon=True)
+        self._thread.start()
+
+    def lease(self) -> PooledSandbox | None:
+        """Take an idle sandbox, or None if the pool is empty (caller creates fresh)."""
+        with self._lock:
+            entry = self._idle.pop() if self._idle else None
+            if entry is None:
+                self.stats["misses"] += 1
+            else:
+                self.stats["leased"] += 1
+        self._schedule_fill()
+        return entry
+
+    def release(self, entry: PooledSandbox, recycle: bool = False) -> bool:
+        """
+        Return a leased sandbox. It is reset and put back only when both the
+        caller (task finished cleanly) and the pool config allow recycling and
+        it is still young enough; otherwise it is terminated. Returns True if kept.
+        """
+        if recycle and self.recycle and not self._stop.is_set() and entry.age() < self.max_age:
+            try:
+                self._reset(entry)
+                with self._lock:
+                    if len(self._idle) < self.size:
+                        self._idle.append(entry)
+                        self.stats["recycled"] += 1
+                        return True
+            except Exception:
+                pass
+        terminate_pooled(entry)
+        return False
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            terminate_pooled(entry)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"idle": len(self._idle), "filling": self._filling, "mainSha": self._main_sha, **self.stats}
+
+    # -- internals ----------------------------------------------------------
+
+    def _maintain(self) -> None:
+        self._schedule_fill()
+        while not self._stop.wait(self.refresh_interval):
+            self._expire()
+            sha = remote_main_sha(self.authed_url)
+            if sha and sha != self._main_sha:
+                self._main_sha = sha
+                self._refresh_all(sha)
+            self._schedule_fill()
+
+    def _schedule_fill(self) -> None:
+        with self._lock:
+            missing = self.size - len(self._idle) - self._filling
+            if missing <= 0 or self._stop.is_set():
+                return
+            self._filling += missing
+        for _ in range(missing):
+            self._executor.submit(self._fill_one)
+
+    def _fill_one(self) -> None:
+        entry = None
+        try:
+            # Idle time counts against the sandbox timeout, so give pooled
+            # sandboxes headroom for max_age on top of a full task.
+            entry = provision_sandbox(self.authed_url, int(self.max_age) + SANDBOX_TIMEOUT)
+            entry.main_sha = self._main_sha
+            with self._lock:
+                if not self._stop.is_set():
+                    self._idle.append(entry)
+                    self.stats["created"] += 1
+                    entry = None
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._filling -= 1
+            if entry is not None:
+                terminate_pooled(entry)
+
+    def _expire(self) -> None:
+        with self._lock:
+            expired = [e for e in self._idle if e.age() >= self.max_age]
+            self._idle = [e for e in self._idle if e.age() < self.max_age]
+            self.stats["expired"] += len(expired)
+        for entry in expired:
+            terminate_pooled(entry)
+
+    def _refresh_all(self, sha: str) -> None:
+        """Fast-forward every idle sandbox to the new main; drop any that fail."""
+        with self._lock:
+            stale, self._idle = self._idle, []
+        fresh: list[PooledSandbox] = []
+        for entry in stale:
+            try:
+                self._reset(entry)
+                entry.main_sha = sha
+                fresh.append(entry)
+            except Exception:
+                terminate_pooled(entry)
+        with self._lock:
+            self._idle.extend(fresh)
+            self.stats["refreshed"] += len(fresh)
+
+    @staticmethod
+    def _reset(entry: PooledSandbox) -> None:
+        """Clean checkout of origin/main with no task leftovers."""
+        proc = entry.sandbox.exec(
+            "bash", "-c",
+            "rm -rf /workspace/task.json /workspace/result.json /workspace/result.json.diff.gz /workspace/results /workspace/AGENTS.md && "
+            f"cd {REPO_DIR} && "
+            "git fetch origin && "
+            "git checkout --detach --force origin/main && "
+            "git reset --hard origin/main && "
+            "git clean -fdx && "
+            "git for-each-ref --format='%(refname:short)' refs/heads | xargs -r git branch -D",
+            timeout=120,
+        )
+        proc.wait()
+        if proc.returncode != 0:
+            raise RuntimeError(f"pool reset failed (exit {proc.returncode})")
+
+
+def provision_sandbox(authed_url: str, timeout: int) -> PooledSandbox:
+    """Create a sandbox and clone the repo into it (bundle-seeded when enabled). Raises on failure."""
+    bundle_path = bundle_for(authed_url) if os.environ.get("SANDBOX_CLONE_MODE") == "bundle" else None
+    # Env-level settings only: a provisioned sandbox serves any payload.
+    volumes = sandbox_volumes({}, bundle_path)
+    sb = create_sandbox(timeout=timeout, volumes=volumes)
+    entry = PooledSandbox(sandbox=sb, mounts=frozenset(volumes or {}))
+    if clone_repo(sb, authed_url, bundle_path) != 0:
+        terminate_pooled(entry)
+        raise RuntimeError("sandbox clone failed")
+    return entry
+
+
+def terminate_pooled(entry: PooledSandbox) -> None:
+    try:
+        entry.sandbox.terminate()
+    except Exception:
+        pass
@@ -0,0 +1,163 @@
+"""
+Single-exec Sandbox Setup
+=========================
+
+Collapses task setup — writing task.json, clone, fetch, checkout/rebase —
+into one ``sb.exec`` round trip. The payload is streamed over the process's
+stdin and a small Python runner inside the sandbox executes the steps,
+printing one NDJSON report per step:
+
+    {"step": "clone", "exit": 0, "ms": 3120, "bytes": 18203344}
+    {"step": "checkout", "exit": 0, "ms": 41}
+    {"step": "done", "ok": true, "ms": 3190}
+
+A failing step stops the script (except steps marked ``allowFail``, e.g.
+the conflict-mode rebase that is expected to stop on conflicts) and its
+report carries the tail of the command's output.
+
+Enable with payload ``setupMode: "script"`` or ``SANDBOX_SETUP_MODE=script``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+
+# Same shape as infra.spawn_sandbox.Command: (argv, timeout).
+Command = tuple[list[str], int | None]
+
+SETUP_TIMEOUT = 300
+# Measured after the clone step so its report carries the fetched object bytes.
+CLONE_OBJECTS_DIR = "/workspace/repo/.git/objects"
+
+# Executed with the image's python3. argv[1] = JSON step list, stdin = payload.
+RUNNER = r"""
+import json, os, subprocess, sys, time
+
+steps = json.loads(sys.argv[1])
+t_start = time.monotonic()
+
+t0 = time.monotonic()
+data = sys.stdin.buffer.read()
+with open("/workspace/task.json", "wb") as f:
+    f.write(data)
+print(json.dumps({"step": "payload", "exit": 0, "ms": int((time.monotonic() - t0) * 1000), "bytes": len(data)}), flush=True)
+
+ok = True
+for step in steps:
+    t0 = time.monotonic()
+    try:
+        proc = subprocess.run(step["argv"], capture_output=True, text=True, timeout=step.get("timeout"))
+        code, output = proc.returncode, proc.stdout + proc.stderr
+    except subprocess.TimeoutExpired as e:
+        code, output = 124, f"timed out after {e.timeout}s"
+    report = {"step": step["name"], "exit": code, "ms": int((time.monotonic() - t0) * 1000)}
+    if code != 0:
+        report["tail"] = output[-500:]
+    elif step.get("measure"):
+        report["bytes"] = sum(
+            os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(step["measure"]) for f in fs
+        )
+    print(json.dumps(report), flush=True)
+    if code != 0 and not step.get("allowFail"):
+        ok = False
+        break
+
+print(json.dumps({"step": "done", "ok": ok, "ms": int((time.monotonic() - t_start) * 1000)}), flush=True)
+sys.exit(0 if ok else 1)
+"""
+
+
+def setup_mode(payload: dict) -> str:
+    return payload.get("setupMode") or os.environ.get("SANDBOX_SETUP_MODE", "exec")
+
+
+def step_name(command: Command) -> str:
+    argv, _ = command
+    if argv[:2] == ["git", "-C"] and len(argv) > 3 and argv[3] != "worktree":
+        return argv[3]
+    # git clone, bundle clone script, or the local backend's worktree add.
+    return "clone"
+
+
+def build_steps(commands: list[Command]) -> list[dict]:
+    steps = []
+    for command in commands:
+        argv, timeout = command
+        name = step_name(command)
+        steps.append({
+            "name": name,
+            "argv": argv,
+            "timeout": timeout,
+            # Conflict-mode rebase stops on conflicts by design.
+            "allowFail": name == "rebase",
+            "measure": CLONE_OBJECTS_DIR if name == "clone" else None,
+        })
+    return steps
+
+
+def runner_argv(commands: list[Command]) -> list[str]:
+    return ["python3", "-c", RUNNER, json.dumps(build_steps(commands))]
+
+
+def run_setup_script(sb, payload: dict, commands: list[Command]) -> list[dict]:
+    """Run every setup step in one exec, payload over stdin. Returns step reports."""
+    proc = sb.exec(*runner_argv(commands), timeout=SETUP_TIMEOUT)
+    proc.stdin.write(json.dumps(payload).encode("utf-8"))
+    proc.stdin.write_eof()
+    proc.stdin.drain()
+    lines = list(proc.stdout)
+    proc.wait()
+    return parse_reports(lines)
+
+
+async def run_setup_script_async(sb, payload: dict, commands: list[Command]) -> list[dict]:
+    proc = await sb.exec.aio(*runner_argv(commands), timeout=SETUP_TIMEOUT)
+    proc.stdin.write(json.dumps(payload).encode("utf-8"))
+    proc.stdin.write_eof()
+    await proc.stdin.drain.aio()
+    lines = [line async for line in proc.stdout]
+    await proc.wait.aio()
+    return parse_reports(lines)
+
+
+def check_reports(reports: list[dict]) -> str:
+    """Per-step timing summary; raises if a required step failed."""
+    ok, summary = summarize(reports)
+    if not ok:
+        failed = failed_step(reports)
+        if failed:
+            raise RuntimeError(
+                f"setup step {failed['step']} failed (exit {failed['exit']}): {failed.get('tail', '').strip()}"
+            )
+        raise RuntimeError(f"setup script did not complete ({summary})")
+    return summary
+
+
+def parse_reports(lines: list[str]) -> list[dict]:
+    reports = []
+    for line in lines:
+        line = line.strip()
+        if not line.startswith("{"):
+            continue
+        try:
+            reports.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return reports
+
+
+def summarize(reports: list[dict]) -> tuple[bool, str]:
+    """(ok, human-readable per-step timing summary) from the runner's reports."""
+    done = next((r for r in reports if r.get("step") == "done"), None)
+    ok = bool(done and done.get("ok"))
+    parts = [f"{r['step']} {r['ms'] / 1000:.1f}s" for r in reports if r.get("step") != "done"]
+    total = f"total {done['ms'] / 1000:.1f}s" if done else "incomplete"
+    return ok, ", ".join(parts) + f"; {total}"
+
+
+def failed_step(reports: list[dict]) -> dict | None:
+    return next(
+        (r for r in reports if r.get("exit", 0) != 0 and r.get("step") not in ("done", "rebase")),
+        None,
+    )
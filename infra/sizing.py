@@ -0,0 +1,333 @@
+"""
+Sandbox Right-sizing
+====================
+
+Every sandbox used to get the same shape: ``timeout=2400`` and no CPU or
+memory request. With sizing enabled, ``run_task`` asks for resources learned
+from earlier runs of the same *task class*:
+
+    class = <kind>-<scope size>
+        kind        conflict (conflict-fix task), test (description or
+                    acceptance mentions tests/specs/benchmarks), build
+                    (build/compile/typecheck/tsc/refactor), else edit
+        scope size  s (≤ 2 paths), m (≤ 8), l (more)
+
+After each agent run the sandbox's cgroup counters (peak memory, CPU time)
+are read and one line is appended to a JSONL history file together with the
+agent's duration and exit code and, from the handoff, the number of files
+changed and tokens used. Once a class has ``SANDBOX_SIZING_MIN_SAMPLES`` runs,
+new sandboxes of that class get:
+
+    cpu      p90 of average cores used × 1.5, in 0.5 steps (≥ 1)
+    memory   p90 of peak memory × 1.3, in 512 MB steps (≥ 1024 MB); doubled
+             while a recent run of the class was OOM-killed (exit 137)
+    timeout  p95 of agent time × 1.5 + setup margin, within [1200, 2400] s
+
+A run whose agent used no tokens never got going (bad config, early crash):
+its time and CPU say nothing about the work, so cpu and timeout skip it. The
+class's p90 files changed and tokens used are reported with the sizing.
+
+The history is parsed once per process and then read incrementally as lines
+are appended. When it grows past ``SANDBOX_SIZING_HISTORY_MAX_BYTES`` it is
+rewritten with only the most recent runs of each class.
+
+Until then (and for warm-pool or prefetched sandboxes, which exist before the
+task is known) the defaults apply. Small edits end up in lean containers and
+test-heavy classes get more cores, so more workers fit in the same quota.
+
+Enable with payload ``sizing: true`` or ``SANDBOX_SIZING=1``.
+
+Configuration (environment):
+    SANDBOX_SIZING_HISTORY            JSONL history (default ~/.cache/agentswarm/sizing.jsonl)
+    SANDBOX_SIZING_MIN_SAMPLES        runs of a class before it is sized (default 5)
+    SANDBOX_SIZING_HISTORY_MAX_BYTES  history size that triggers a trim (default 4 MiB)
+    SANDBOX_CPU_MAX                   upper bound for cpu (default 8)
+    SANDBOX_MEMORY_MAX_MB             upper bound for memory (default 16384)
+
+Usage:
+    from infra.sizing import size_for
+
+    sizing = size_for(task)     # Sizing(cls="edit-s", cpu=1.0, memory_mb=2048, timeout=1200)
+    sb = backend.create(timeout=sizing.timeout, cpu=sizing.cpu, memory=sizing.memory_mb)
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+
+MAX_TIMEOUT = 2400
+MIN_TIMEOUT = 1200
+# Sandbox lifetime beyond the agent exec: create, clone, deps, result, push.
+SETUP_MARGIN_S = 600
+DEFAULT_MIN_SAMPLES = 5
+# Most recent runs per class that sizing looks at.
+CLASS_WINDOW = 50
+DEFAULT_HISTORY_MAX_BYTES = 4 * 1024 * 1024
+OOM_EXIT = 137
+
+_TEST = re.compile(r"\b(tests?|specs?|benchmarks?|e2e|coverage)\b", re.IGNORECASE)
+_BUILD = re.compile(r"\b(build|compile|typecheck|tsc|refactor|migrat\w*)\b", re.IGNORECASE)
+
+# Prints "stats: <peak memory bytes> <cpu usec>"; cgroup v2 first, then v1.
+STATS_SCRIPT = r"""
+m=$(cat /sys/fs/cgroup/memory.peak 2>/dev/null || cat /sys/fs/cgroup/memory/memory.max_usage_in_bytes 2>/dev/null)
+c=$(awk '/^usage_usec/ {print $2}' /sys/fs/cgroup/cpu.stat 2>/dev/null)
+if [ -z "$c" ] && [ -f /sys/fs/cgroup/cpuacct/cpuacct.usage ]; then
+  c=$(( $(cat /sys/fs/cgroup/cpuacct/cpuacct.usage) / 1000 ))
+fi
+echo "stats: ${m:--} ${c:--}"
+"""
+
+_history_lock = threading.Lock()
+
+
+@dataclass
+class Sizing:
+    cls: str
+    cpu: float | None = None
+    memory_mb: int | None = None
+    timeout: int = MAX_TIMEOUT
+    samples: int = 0
+    # p90 of the class's handoffs, for the phase event and logs.
+    files_changed: int | None = None
+    tokens_used: int | None = None
+
+    @property
+    def agent_timeout(self) -> int:
+        return self.timeout - SETUP_MARGIN_S
+
+    def describe(self) -> str:
+        if not self.samples:
+            return f"class {self.cls}, defaults"
+        cpu = f"{self.cpu:g}" if self.cpu else "default"
+        memory = f"{self.memory_mb}MB" if self.memory_mb else "default"
+        described = f"class {self.cls}, cpu {cpu}, memory {memory}, timeout {self.timeout}s ({self.samples} runs"
+        if self.tokens_used is not None:
+            described += f", p90 {self.files_changed} files / {self.tokens_used} tokens"
+        return described + ")"
+
+
+def sizing_enabled(payload: dict) -> bool:
+    if "sizing" in payload:
+        return bool(payload["sizing"])
+    return os.environ.get("SANDBOX_SIZING", "0") == "1"
+
+
+def history_path() -> Path:
+    return Path(os.environ.get("SANDBOX_SIZING_HISTORY", Path.home() / ".cache" / "agentswarm" / "sizing.jsonl"))
+
+
+def task_class(task: dict) -> str:
+    text = f"{task.get('description', '')} {task.get('acceptance', '')}"
+    if task.get("conflictSourceBranch"):
+        kind = "conflict"
+    elif _TEST.search(text):
+        kind = "test"
+    elif _BUILD.search(text):
+        kind = "build"
+    else:
+        kind = "edit"
+    scope = len(task.get("scope") or [])
+    size = "s" if scope <= 2 else "m" if scope <= 8 else "l"
+    return f"{kind}-{size}"
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _round_up(value: float, step: float) -> float:
+    return math.ceil(value / step) * step
+
+
+@dataclass
+class _History:
+    """Parsed history of one file, extended from ``offset`` as lines are appended."""
+
+    path: Path
+    inode: int = -1
+    offset: int = 0
+    by_class: dict[str, deque] = field(default_factory=dict)
+
+    def refresh(self) -> None:
+        try:
+            st = self.path.stat()
+        except OSError:
+            self.inode, self.offset, self.by_class = -1, 0, {}
+            return
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            # New, rotated or trimmed file: parse it from the start.
+            self.inode, self.offset, self.by_class = st.st_ino, 0, {}
+        if st.st_size == self.offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # an append still in progress; read it next time
+                self.offset += len(line)
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(record, dict) and "class" in record:
+                    self.by_class.setdefault(record["class"], deque(maxlen=CLASS_WINDOW)).append(record)
+
+
+_history: _History | None = None
+
+
+def load_history(cls: str) -> list[dict]:
+    """The most recent ``CLASS_WINDOW`` records of ``cls`` (parsed once per process)."""
+    global _history
+    path = history_path()
+    with _history_lock:
+        if _history is None or _history.path != path:
+            _history = _History(path)
+        _history.refresh()
+        return list(_history.by_class.get(cls, ()))
+
+
+def _trim_history(path: Path) -> None:
+    """
+    Rewrite the history with the last ``CLASS_WINDOW`` runs of each class.
+    Called with ``_history_lock`` held; a line another process appends
+    during the rewrite is lost, which only costs one sample.
+    """
+    by_class: dict[str, deque] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict) and "class" in record:
+                by_class.setdefault(record["class"], deque(maxlen=CLASS_WINDOW)).append((record.get("at", 0), line))
+    kept = sorted(entry for entries in by_class.values() for entry in entries)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text("".join(line for _, line in kept), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def handoff_features(handoff: dict) -> dict:
+    """What a handoff tells sizing about the run: files changed and tokens used."""
+    return {
+        "filesChanged": len(handoff.get("filesChanged") or []),
+        "tokensUsed": (handoff.get("metrics") or {}).get("tokensUsed", 0),
+    }
+
+
+def size_for(task: dict) -> Sizing:
+    cls = task_class(task)
+    records = load_history(cls)
+    if len(records) < int(os.environ.get("SANDBOX_SIZING_MIN_SAMPLES", DEFAULT_MIN_SAMPLES)):
+        return Sizing(cls)
+
+    cpu_max = float(os.environ.get("SANDBOX_CPU_MAX", "8"))
+    memory_max = int(os.environ.get("SANDBOX_MEMORY_MAX_MB", "16384"))
+    sizing = Sizing(cls, samples=len(records))
+
+    # Runs that spent no tokens never did the work; older records lack the field.
+    worked = [r for r in records if r.get("tokensUsed", 1)]
+
+    cores = [r["avgCores"] for r in worked if r.get("avgCores")]
+    if cores:
+        sizing.cpu = min(cpu_max, max(1.0, _round_up(_percentile(cores, 0.9) * 1.5, 0.5)))
+
+    peaks = [r["peakMemMb"] for r in records if r.get("peakMemMb")]
+    if peaks:
+        memory = max(1024, int(_round_up(_percentile(peaks, 0.9) * 1.3, 512)))
+        oom = [r for r in records[-10:] if r.get("exitCode") == OOM_EXIT and r.get("memoryMb")]
+        if oom:
+            memory = max(memory, oom[-1]["memoryMb"] * 2)
+        sizing.memory_mb = min(memory_max, memory)
+
+    agent_s = [r["agentMs"] / 1000 for r in worked if r.get("agentMs")]
+    if agent_s:
+        timeout = _percentile(agent_s, 0.95) * 1.5 + SETUP_MARGIN_S
+        sizing.timeout = int(min(MAX_TIMEOUT, max(MIN_TIMEOUT, timeout)))
+
+    handed_off = [r for r in records if "tokensUsed" in r]
+    if handed_off:
+        sizing.tokens_used = int(_percentile([r["tokensUsed"] for r in handed_off], 0.9))
+        sizing.files_changed = int(_percentile([r.get("filesChanged", 0) for r in handed_off], 0.9))
+    return sizing
+
+
+def stats_argv() -> list[str]:
+    return ["bash", "-c", STATS_SCRIPT]
+
+
+def parse_stats(lines: list[str], elapsed_s: float) -> dict:
+    """{"peakMemMb", "avgCores"} from STATS_SCRIPT output; missing counters are omitted."""
+    for line in lines:
+        parts = line.split()
+        if parts[:1] != ["stats:"] or len(parts) != 3:
+            continue
+        stats = {}
+        if parts[1].isdigit():
+            stats["peakMemMb"] = int(parts[1]) // (1024 * 1024)
+        if parts[2].isdigit() and elapsed_s > 0:
+            stats["avgCores"] = round(int(parts[2]) / 1e6 / elapsed_s, 2)
+        return stats
+    return {}
+
+
+def sandbox_stats(sb, elapsed_s: float) -> dict:
+    """Peak memory and average CPU of the sandbox so far. Never raises."""
+    try:
+        proc = sb.exec(*stats_argv(), timeout=30)
+        lines = list(proc.stdout)
+        proc.wait()
+        return parse_stats(lines, elapsed_s)
+    except Exception:
+        return {}
+
+
+async def sandbox_stats_async(sb, elapsed_s: float) -> dict:
+    try:
+        proc = await sb.exec.aio(*stats_argv(), timeout=30)
+        lines = [line async for line in proc.stdout]
+        await proc.wait.aio()
+        return parse_stats(lines, elapsed_s)
+    except Exception:
+        return {}
+
+
+def record_run(sizing: Sizing, task_id: str, agent_ms: int, exit_code: int | None, stats: dict) -> None:
+    """
+    Append one run (``stats``: sandbox counters plus ``handoff_features``) to
+    the history, a single O_APPEND write that is safe across spawner
+    processes, and trim the file once it is over its size cap.
+    """
+    record = {
+        "class": sizing.cls,
+        "taskId": task_id,
+        "at": int(time.time()),
+        "agentMs": agent_ms,
+        "exitCode": exit_code,
+        "cpu": sizing.cpu,
+        "memoryMb": sizing.memory_mb,
+        "timeout": sizing.timeout,
+        **stats,
+    }
+    path = history_path()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with _history_lock:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+                size = f.tell()
+            if size > int(os.environ.get("SANDBOX_SIZING_HISTORY_MAX_BYTES", DEFAULT_HISTORY_MAX_BYTES)):
+                _trim_history(path)
+    except OSError:
+        pass
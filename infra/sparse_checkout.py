@@ -0,0 +1,95 @@
+"""
+Task-scoped Sparse Checkout
+===========================
+
+For large target repos a full clone + checkout costs the same no matter how
+small the task is. With ``SANDBOX_CLONE_MODE=sparse`` a fresh sandbox instead
+does a blobless partial clone (``--filter=blob:none``: all commits and trees,
+no file contents) and checks out only:
+
+    - files at the repo root (manifests, lockfile, tsconfig, ...)
+    - the directories of every path in the task's ``scope``
+    - ``SPARSE_ALWAYS_INCLUDE`` patterns anywhere in the tree
+      (workspace ``package.json`` files for dependency installs, tsconfigs)
+
+Blobs are fetched on demand by git, so history, ``git diff <startSha>`` and
+rebases keep working, and the worker can widen the checkout with
+``git sparse-checkout add <dir>``. worker-runner detects the sparse checkout,
+tells the agent so, and skips its whole-repo build check.
+
+Only fresh remote clones go sparse. Warm-pool leases, bundle-seeded clones and
+the local backend's worktrees keep their full checkout, as do tasks without
+a scope.
+
+Configuration (environment):
+    SANDBOX_CLONE_MODE      "sparse" to enable (payload ``cloneMode`` overrides)
+    SPARSE_ALWAYS_INCLUDE   comma-separated gitignore-style patterns checked out
+                            for every task (default "**/package.json,**/tsconfig*.json")
+
+Usage:
+    from infra.sparse_checkout import sparse_patterns
+
+    patterns = sparse_patterns(task)   # None → clone everything
+"""
+
+from __future__ import annotations
+
+import os
+import posixpath
+import re
+import shlex
+
+DEFAULT_ALWAYS_INCLUDE = "**/package.json,**/tsconfig*.json"
+_GLOB = re.compile(r"[*?\[]")
+
+
+def always_include() -> list[str]:
+    raw = os.environ.get("SPARSE_ALWAYS_INCLUDE", DEFAULT_ALWAYS_INCLUDE)
+    return [p.strip() for p in raw.split(",") if p.strip()]
+
+
+def scope_path(path: str) -> str:
+    """
+    Repo-relative form of one scope entry: no ``./``, no slashes at either
+    end, and a glob cut back to the directory it starts in ("" is the repo root).
+    """
+    path = path.strip()
+    match = _GLOB.search(path)
+    if match:
+        # "src/**/*.ts" → "src"
+        prefix = path[:match.start()]
+        path = prefix.rsplit("/", 1)[0] if "/" in prefix else ""
+    return "/".join(part for part in path.split("/") if part not in ("", "."))
+
+
+def scope_directory(path: str) -> str:
+    """Directory to check out for one scope entry ("" for the repo root)."""
+    if _GLOB.search(path) or path.strip().endswith("/"):
+        return scope_path(path)
+    return posixpath.dirname(scope_path(path))
+
+
+def sparse_patterns(task: dict) -> list[str] | None:
+    """Non-cone sparse-checkout patterns for ``task``, or None if it has no scope."""
+    scope = [p for p in task.get("scope") or [] if p and p.strip()]
+    if not scope:
+        return None
+    # Root files only, not root directories.
+    patterns = ["/*", "!/*/"]
+    for directory in sorted({scope_directory(p) for p in scope}):
+        if directory:
+            patterns.append(f"/{directory}/")
+    patterns += always_include()
+    return patterns
+
+
+def sparse_clone_script(authed_url: str, repo_dir: str, patterns: list[str]) -> str:
+    """Bash: blobless clone without checkout, set the sparse patterns, check out HEAD."""
+    url = shlex.quote(authed_url)
+    repo = shlex.quote(repo_dir)
+    lines = " ".join(shlex.quote(p) for p in patterns)
+    return (
+        f"git clone --filter=blob:none --no-checkout {url} {repo} && "
+        f"printf '%s\\n' {lines} | git -C {repo} sparse-checkout set --no-cone --stdin && "
+        f"git -C {repo} checkout -q"
+    )
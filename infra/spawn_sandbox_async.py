@@ -0,0 +1,370 @@
+"""
+Async Sandbox Spawner
+=====================
+
+asyncio-native counterpart of ``infra.spawn_sandbox.run_task`` built on
+Modal's ``.aio`` APIs. One event loop drives any number of sandboxes: no
+per-sandbox stderr thread, no per-task Python process, and stdout/stderr of
+every worker are multiplexed as coroutines. Memory and file descriptors
+scale with the number of in-flight tasks, not processes or threads.
+
+Both spawners share the lifecycle helpers of ``infra.spawn_sandbox``
+(sandbox plan, setup steps, snapshot guard, handoff collection, teardown),
+so this one emits exactly the same ``[spawn] ...`` lines, worker output
+and phase events and handles batch payloads the same way; worker-pool.ts
+needs no changes to consume it.
+
+Usage:
+    # Single task, same CLI contract as spawn_sandbox.py (stdin, @file or JSON)
+    echo '<payload json>' | python -u infra/spawn_sandbox_async.py
+
+    # Many tasks from one loop
+    from infra.spawn_sandbox_async import run_many
+    handoffs = asyncio.run(run_many(payloads, concurrency=200))
+
+The spawner daemon uses this path with ``--async``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from infra.admission import admission_controller
+from infra.batching import batch_tasks, check_batch
+from infra.dep_cache import install_deps_async
+from infra.hedging import hedger, hedging_enabled
+from infra.output_coalescer import worker_output
+from infra.phase_events import PhaseRecorder
+from infra.setup_script import check_reports, run_setup_script_async, setup_mode
+from infra.sandbox_backend import backend_name, resource_kwargs
+from infra.sizing import handoff_features, record_run, sandbox_stats_async
+from infra.stall_detector import StallDetector, capture_diagnostics_async, stall_config_from_env, stall_message
+from infra.spawn_sandbox import (
+    AGENT_TIMEOUT,
+    Command,
+    Emit,
+    SandboxPlan,
+    agent_start_message,
+    announce_sandbox,
+    checkout_message,
+    clone_step,
+    collect_handoffs,
+    create_and_clone,
+    deps_message,
+    deps_wanted,
+    emit_stdout,
+    failure_handoff,
+    finish_create,
+    fork_failed_message,
+    load_cli_payload,
+    plan_sandbox,
+    run_batch,
+    setup_steps,
+    snapshot_wanted,
+    stalled_handoffs,
+    take_snapshot,
+    teardown_sandbox,
+)
+
+if TYPE_CHECKING:
+    import modal
+
+    from infra.sandbox_pool import SandboxPool
+
+DEFAULT_CONCURRENCY = 200
+# Background terminate/release jobs (see run_batch_async's finally).
+_teardowns: set[asyncio.Task] = set()
+
+
+async def _run_command(sb: modal.Sandbox, command: Command) -> int:
+    argv, timeout = command
+    proc = await (sb.exec.aio(*argv, timeout=timeout) if timeout else sb.exec.aio(*argv))
+    try:
+        await proc.wait.aio()
+    except Exception:
+        return -1
+    return proc.returncode
+
+
+async def _pump(stream, line: Callable[[str], None]) -> int:
+    """Feed every line to ``line``; returns the number of bytes seen."""
+    total = 0
+    async for text in stream:
+        total += len(text)
+        line(text)
+    return total
+
+
+async def _create_planned(plan: SandboxPlan, payload: dict, task_id: str, emit: Emit, info: dict) -> modal.Sandbox:
+    """``create_planned`` on Modal's ``.aio`` API: same order, admission waits on the loop."""
+    import modal
+
+    backend = plan.backend
+    app, worker_image = await asyncio.to_thread(backend.resources)
+    kwargs = plan.create_kwargs
+
+    async def create(image: modal.Image) -> modal.Sandbox:
+        async with admission_controller().admit_async():
+            return await modal.Sandbox.create.aio(
+                app=app,
+                image=image,
+                timeout=kwargs["timeout"],
+                workdir="/workspace",
+                volumes=kwargs["volumes"] or {},
+                **resource_kwargs(kwargs["cpu"], kwargs["memory"]),
+            )
+
+    for source, ref in plan.fork_sources():
+        try:
+            sb = await create(modal.Image.from_id(ref))
+            plan.source = source
+            return sb
+        except Exception as e:
+            emit(fork_failed_message(source, task_id, e))
+    if hedging_enabled(payload):
+        # The hedger races blocking create + clone attempts on its own threads.
+        clone, _ = clone_step(payload, plan)
+        sb, hedge_info = await asyncio.to_thread(
+            hedger().provision, lambda: create_and_clone(backend, kwargs, clone),
+        )
+        plan.cloned_in_create = True
+        info.update(hedge_info)
+        return sb
+    sb = await create(worker_image)
+    await asyncio.to_thread(backend.mark_image_built)
+    return sb
+
+
+async def run_task_async(
+    payload: dict,
+    emit: Emit = emit_stdout,
+    pool: "SandboxPool | None" = None,
+) -> dict:
+    """
+    Run a single coding task in an ephemeral Modal sandbox without blocking
+    the event loop. Same payload, output lines and return value as
+    ``infra.spawn_sandbox.run_task``.
+    """
+    return (await run_batch_async(payload, emit, pool))[0]
+
+
+async def run_batch_async(
+    payload: dict,
+    emit: Emit = emit_stdout,
+    pool: "SandboxPool | None" = None,
+) -> list[dict]:
+    """
+    ``infra.spawn_sandbox.run_batch`` on one event loop: the lifecycle steps
+    are the sync spawner's helpers, the sandbox I/O on the critical path
+    (create, setup, agent streams) is ``.aio``. Blocking lookups (pool lease,
+    snapshot index, bundles, result and handoff reads) run in threads.
+
+    Non-Modal backends have no ``.aio`` API and run the sync path in a thread.
+    """
+    if backend_name(payload) != "modal":
+        return await asyncio.to_thread(run_batch, payload, emit, pool)
+
+    tasks = batch_tasks(payload)
+    task = tasks[0]
+    task_id = task["id"]
+    phases = PhaseRecorder(task_id, emit)
+    sb = None
+    plan = None
+    recycle = False
+
+    try:
+        if len(tasks) > 1:
+            check_batch(tasks)
+
+        with phases.phase("create") as info:
+            # A lease can block on the pool lock or on a prefetch still provisioning.
+            plan = await asyncio.to_thread(plan_sandbox, payload, tasks, pool, info)
+            if plan.lease is not None:
+                sb = plan.lease.sandbox
+            else:
+                sb = await _create_planned(plan, payload, task_id, emit, info)
+                finish_create(plan, info)
+        announce_sandbox(plan, pool, task_id, phases, emit)
+        # What the sandbox receives: large shared fields may be blob refs.
+        sandbox_payload = plan.sandbox_payload or payload
+
+        steps = setup_steps(payload, tasks, plan)
+        if setup_mode(payload) == "script":
+            commands = ([steps.clone] if steps.clone else []) + steps.checkout
+            reports = await run_setup_script_async(sb, sandbox_payload, commands)
+            phases.from_setup_reports(reports)
+            summary = check_reports(reports)
+            emit(f"[spawn] setup script for task {task_id}: {summary}")
+            if steps.clone:
+                emit(f"[spawn] repo cloned for task {task_id} from {steps.source} (setup script)")
+        else:
+            if steps.clone:
+                with phases.phase("clone", source=steps.source):
+                    await _run_command(sb, steps.clone)
+                emit(f"[spawn] repo cloned for task {task_id} from {steps.source} ({phases.durations['clone']:.1f}s)")
+
+            with phases.phase("checkout"):
+                for command in steps.checkout:
+                    await _run_command(sb, command)
+        emit(checkout_message(task))
+
+        if deps_wanted(payload, plan, task_id, emit):
+            with phases.phase("deps") as info:
+                deps = await install_deps_async(sb)
+                info.update(cache=deps["cache"], key=deps.get("key"))
+            emit(deps_message(task_id, deps, phases))
+
+        if snapshot_wanted(payload, plan):
+            await asyncio.to_thread(take_snapshot, sb, plan, payload, task, phases, emit)
+
+        if setup_mode(payload) != "script":
+            # Written after the snapshot: the image must not hold the payload's keys.
+            data = json.dumps(sandbox_payload)
+            with phases.phase("payload", bytes=len(data.encode("utf-8"))):
+                f = await sb.open.aio("/workspace/task.json", "w")
+                await f.write.aio(data)
+                await f.close.aio()
+
+        emit(agent_start_message(tasks))
+        sizing = plan.sizing
+        with phases.phase("agent_start"):
+            agent_timeout = sizing.agent_timeout if sizing else AGENT_TIMEOUT
+            process = await sb.exec.aio("node", "/agent/worker-runner.js", timeout=agent_timeout)
+        output = worker_output(task_id, emit)
+        stall = StallDetector(**stall_config_from_env())
+        diagnostics: list[str] = []
+
+        def on_line(line: str) -> None:
+            stall.observe(line)
+            output.line(line)
+
+        async def on_stall(found: dict) -> None:
+            emit(f"[spawn] {stall_message(found)} for task {task_id}, terminating")
+            diagnostics.append(await capture_diagnostics_async(sb))
+            try:
+                await sb.terminate.aio()
+            except Exception:
+                pass
+
+        with phases.phase("agent_end") as info:
+            watcher = asyncio.create_task(stall.watch_async(on_stall))
+            output_bytes = [0, 0]
+            try:
+                output_bytes = await asyncio.gather(
+                    _pump(process.stdout, on_line),
+                    _pump(process.stderr, on_line),
+                )
+                await process.wait.aio()
+            except Exception:
+                if stall.stall is None:
+                    raise
+            finally:
+                if stall.stall is None:
+                    watcher.cancel()
+                else:
+                    # Let diagnostics + terminate finish before the handoff.
+                    await asyncio.gather(watcher, return_exceptions=True)
+                output.close()
+            info["bytes"] = sum(output_bytes)
+            info["exitCode"] = process.returncode
+            if stall.stall is not None:
+                info["stalled"] = stall.stall["phase"]
+
+        if stall.stall is not None:
+            return stalled_handoffs(tasks, stall.stall, diagnostics)
+
+        if sizing is not None:
+            stats = await sandbox_stats_async(sb, time.monotonic() - phases.started)
+
+        # Result reads, diff spills and bundles are file work on this machine.
+        handoffs = await asyncio.to_thread(collect_handoffs, sb, payload, tasks, phases, emit)
+        if sizing is not None:
+            stats.update(handoff_features(handoffs[0]))
+            await asyncio.to_thread(
+                record_run, sizing, task_id, int(phases.durations["agent_end"] * 1000), process.returncode, stats,
+            )
+        recycle = True
+        return handoffs
+
+    except Exception as e:
+        emit(f"[spawn] task {task_id} failed: {e}")
+        return [failure_handoff(t["id"], str(e)) for t in tasks]
+
+    finally:
+        # As in the sync spawner: the handoff does not wait for terminate.
+        job = asyncio.create_task(
+            asyncio.to_thread(teardown_sandbox, sb, plan, pool, recycle, task_id, phases, emit),
+        )
+        _teardowns.add(job)
+        job.add_done_callback(_teardowns.discard)
+
+
+async def drain_teardowns() -> None:
+    """Wait for the background teardowns started by run_batch_async on this loop."""
+    while pending := [job for job in _teardowns if not job.done()]:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+class ConcurrencyLimitedRunner:
+    """Bounds how many run_batch_async calls are in flight on one event loop."""
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, pool: "SandboxPool | None" = None):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._pool = pool
+        self.in_flight = 0
+
+    async def run(
+        self,
+        payload: dict,
+        emit: Emit = emit_stdout,
+        pool: "SandboxPool | None" = None,
+    ) -> dict:
+        return (await self.run_batch(payload, emit, pool))[0]
+
+    async def run_batch(
+        self,
+        payload: dict,
+        emit: Emit = emit_stdout,
+        pool: "SandboxPool | None" = None,
+    ) -> list[dict]:
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                return await run_batch_async(payload, emit, pool or self._pool)
+            finally:
+                self.in_flight -= 1
+
+
+async def run_many(
+    payloads: list[dict],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    emit_for: Callable[[dict], Emit] | None = None,
+) -> list[dict]:
+    """Run every payload on one loop, at most ``concurrency`` at a time. Handoffs in input order."""
+    runner = ConcurrencyLimitedRunner(concurrency)
+    jobs: list[Awaitable[dict]] = [
+        runner.run(p, emit_for(p) if emit_for else emit_stdout) for p in payloads
+    ]
+    handoffs = await asyncio.gather(*jobs)
+    await drain_teardowns()
+    return handoffs
+
+
+# ---------------------------------------------------------------------------
+# CLI entry point
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    async def main() -> None:
+        for result in await run_batch_async(payload):
+            print(json.dumps(result), flush=True)
+        await drain_teardowns()
+
+    payload = load_cli_payload(sys.argv[1:])
+    asyncio.run(main())
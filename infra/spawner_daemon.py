@@ -0,0 +1,361 @@
+"""
+Sandbox Spawner Daemon
+======================
+
+Long-lived process that keeps the Python interpreter, ``import modal``,
+the ``agentswarm`` App lookup and the worker image warm, and runs many
+``run_task`` calls concurrently. Replaces one ``spawn_sandbox.py`` process
+per task with a single process per orchestrator.
+
+Protocol — NDJSON, one object per line, in both directions:
+
+    request   → {"id": "<requestId>", "payload": {...run_task payload...}}
+    line      ← {"id": "<requestId>", "line": "[spawn] sandbox created ..."}
+    handoff   ← {"id": "<requestId>", "handoff": {...Handoff...}}
+    handoffs  ← {"id": "<requestId>", "handoffs": [...]}   (batch payloads)
+    ready     ← {"ready": true}                      (once, at startup)
+    prefetch  → {"op": "prefetch", "payload": {...}}  (no reply)
+
+A payload with a ``batch`` of tasks (see ``infra/batching.py``) runs them in
+one sandbox and is answered with a single ``handoffs`` frame, one handoff per
+task in batch order.
+
+Every ``line`` is exactly what ``spawn_sandbox.py`` would have printed to
+stdout for that task, so the orchestrator can reuse the same line handling.
+
+With ``SANDBOX_BACKEND=local`` no Modal resources are touched and every
+sandbox is a local subprocess (see ``infra/sandbox_backend.py``).
+
+Set ``SANDBOX_PREFETCH_DEPTH`` > 0 to provision sandboxes for queued tasks
+before they are submitted (see ``infra/prefetch.py``).
+
+Set ``SANDBOX_POOL_SIZE`` > 0 to keep a warm pool of pre-cloned sandboxes
+per repo URL (see ``infra/sandbox_pool.py``).
+
+With ``SANDBOX_REPO_IMAGE=1`` the daemon keeps a repo image per repo URL
+rebuilt in the background as main advances (see ``infra/repo_image.py``).
+
+With ``--async`` (or ``SPAWNER_ASYNC=1``) stdio requests are driven by
+``run_batch_async`` on a single event loop instead of a thread per task.
+
+Usage:
+    # stdin/stdout framing (how the orchestrator's WorkerPool runs it)
+    python -u infra/spawner_daemon.py
+
+    # Unix socket — each connection may submit any number of requests
+    python -u infra/spawner_daemon.py --socket /tmp/agentswarm-spawner.sock
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import socketserver
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, TextIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from infra.admission import admission_controller
+from infra.batching import batch_tasks, is_batch
+from infra.hedging import hedger, hedging_enabled
+from infra.prefetch import ClaimedSandbox, Prefetcher, prefetch_config_from_env
+from infra.repo_image import repo_image_builder, repo_image_enabled
+from infra.sandbox_pool import SandboxPool, pool_config_from_env
+from infra.sandbox_backend import backend_name, get_backend
+from infra.spawn_sandbox import authed_repo_url, failure_handoff, run_batch, run_task, wait_for_teardowns
+
+DEFAULT_MAX_CONCURRENCY = 256
+
+
+class FramedWriter:
+    """Serializes NDJSON frames from many task threads onto one stream."""
+
+    def __init__(self, stream: TextIO):
+        self._stream = stream
+        self._lock = threading.Lock()
+
+    def write(self, frame: dict) -> None:
+        data = json.dumps(frame) + "\n"
+        with self._lock:
+            try:
+                self._stream.write(data)
+                self._stream.flush()
+            except (OSError, ValueError):
+                # Peer went away (closed, reset) — nothing left to report to.
+                pass
+
+
+class PoolRegistry:
+    """
+    Where run_task leases come from: a sandbox prefetched for the task, else
+    one warm pool per authed repo URL (created on first use when enabled).
+    """
+
+    def __init__(self):
+        self._config = pool_config_from_env()
+        self._pools: dict[str, SandboxPool] = {}
+        self._lock = threading.Lock()
+        self.prefetcher = Prefetcher(**prefetch_config_from_env())
+
+    def prefetch(self, payload: dict) -> None:
+        try:
+            self.prefetcher.prefetch(payload)
+        except (KeyError, TypeError) as e:
+            _log_stderr(f"[daemon] ignoring malformed prefetch: {e}")
+
+    def get(self, payload: dict) -> SandboxPool | ClaimedSandbox | None:
+        if repo_image_enabled(payload) and backend_name(payload) == "modal":
+            repo_image_builder().watch(authed_repo_url(payload))
+        claimed = self.prefetcher.claim(payload["task"]["id"]) if self.prefetcher.depth > 0 else None
+        if claimed is not None:
+            return claimed
+        if self._config["size"] <= 0 or backend_name(payload) != "modal":
+            return None
+        url = authed_repo_url(payload)
+        with self._lock:
+            pool = self._pools.get(url)
+            if pool is None:
+                pool = SandboxPool(url, **self._config)
+                pool.start()
+                self._pools[url] = pool
+                _log_stderr(f"[daemon] warm pool started (size={self._config['size']})")
+            return pool
+
+    def shutdown(self) -> None:
+        # Sandboxes still terminating (or returning to a pool) after their handoff.
+        wait_for_teardowns()
+        _log_stderr(f"[daemon] create admission stats: {admission_controller().snapshot()}")
+        if hedging_enabled({}):
+            _log_stderr(f"[daemon] hedged create stats: {hedger().snapshot()}")
+            hedger().shutdown()
+        if self.prefetcher.depth > 0:
+            _log_stderr(f"[daemon] prefetch stats: {self.prefetcher.snapshot()}")
+        if repo_image_enabled({}):
+            _log_stderr(f"[daemon] repo image stats: {repo_image_builder().snapshot()}")
+            repo_image_builder().shutdown()
+        self.prefetcher.shutdown()
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            _log_stderr(f"[daemon] warm pool stats: {pool.snapshot()}")
+            pool.shutdown()
+
+
+def _run_request(request_id: str, payload: dict, writer: FramedWriter, pools: PoolRegistry) -> None:
+    def emit(line: str) -> None:
+        writer.write({"id": request_id, "line": line})
+
+    try:
+        if is_batch(payload):
+            writer.write({"id": request_id, "handoffs": run_batch(payload, emit, pool=pools.get(payload))})
+            return
+        handoff = run_task(payload, emit, pool=pools.get(payload))
+    except Exception as e:  # run_task already returns failure stubs; belt and braces
+        task_id = payload.get("task", {}).get("id", "unknown")
+        emit(f"[spawn] task {task_id} failed in daemon: {e}")
+        if is_batch(payload):
+            writer.write({"id": request_id, "handoffs": [failure_handoff(t["id"], str(e)) for t in batch_tasks(payload)]})
+            return
+        handoff = failure_handoff(task_id, str(e))
+    writer.write({"id": request_id, "handoff": handoff})
+
+
+def serve_stream(
+    reader: TextIO,
+    writer: FramedWriter,
+    executor: ThreadPoolExecutor,
+    pools: PoolRegistry,
+    log: Callable[[str], None],
+) -> set[Future]:
+    """
+    Read framed requests from ``reader`` until EOF, dispatching each to the
+    executor. Returns the requests still running at EOF.
+    """
+    in_flight: set[Future] = set()
+    for raw in reader:
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            request = json.loads(raw)
+            if request.get("op") == "prefetch":
+                pools.prefetch(request["payload"])
+                continue
+            request_id = str(request["id"])
+            payload = request["payload"]
+        except (json.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+            log(f"[daemon] ignoring malformed request: {e}")
+            continue
+        future = executor.submit(_run_request, request_id, payload, writer, pools)
+        in_flight.add(future)
+        future.add_done_callback(in_flight.discard)
+    return in_flight
+
+
+def _log_stderr(msg: str) -> None:
+    print(msg, file=sys.stderr, flush=True)
+
+
+def serve_stdio(max_concurrency: int) -> None:
+    writer = FramedWriter(sys.stdout)
+    pools = PoolRegistry()
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="spawn") as executor:
+        writer.write({"ready": True})
+        _log_stderr(f"[daemon] ready on stdio (maxConcurrency={max_concurrency})")
+        serve_stream(sys.stdin, writer, executor, pools, _log_stderr)
+        # stdin closed: let in-flight tasks finish and report before exiting.
+        _log_stderr("[daemon] stdin closed, draining in-flight tasks")
+    pools.shutdown()
+
+
+async def _serve_stdio_async(max_concurrency: int) -> None:
+    from infra.spawn_sandbox_async import ConcurrencyLimitedRunner, drain_teardowns
+
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=64 * 1024 * 1024)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    writer = FramedWriter(sys.stdout)
+    pools = PoolRegistry()
+    runner = ConcurrencyLimitedRunner(max_concurrency)
+    in_flight: set[asyncio.Task] = set()
+
+    async def handle(request_id: str, payload: dict) -> None:
+        def emit(line: str) -> None:
+            writer.write({"id": request_id, "line": line})
+
+        try:
+            # Pool creation does a blocking ls-remote on first use, and a
+            # claim may wait for a prefetch that is still provisioning.
+            pool = await asyncio.to_thread(pools.get, payload)
+            handoffs = await runner.run_batch(payload, emit, pool)
+        except Exception as e:
+            task_id = payload.get("task", {}).get("id", "unknown")
+            emit(f"[spawn] task {task_id} failed in daemon: {e}")
+            handoffs = [failure_handoff(t["id"], str(e)) for t in batch_tasks(payload)]
+        if is_batch(payload):
+            writer.write({"id": request_id, "handoffs": handoffs})
+        else:
+            writer.write({"id": request_id, "handoff": handoffs[0]})
+
+    writer.write({"ready": True})
+    _log_stderr(f"[daemon] ready on stdio, async (maxConcurrency={max_concurrency})")
+    while raw := await reader.readline():
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            request = json.loads(raw)
+            if request.get("op") == "prefetch":
+                pools.prefetch(request["payload"])
+                continue
+            request_id = str(request["id"])
+            payload = request["payload"]
+        except (json.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+            _log_stderr(f"[daemon] ignoring malformed request: {e}")
+            continue
+        job = asyncio.create_task(handle(request_id, payload))
+        in_flight.add(job)
+        job.add_done_callback(in_flight.discard)
+
+    _log_stderr("[daemon] stdin closed, draining in-flight tasks")
+    if in_flight:
+        await asyncio.gather(*in_flight, return_exceptions=True)
+    await drain_teardowns()
+    pools.shutdown()
+
+
+def serve_stdio_async(max_concurrency: int) -> None:
+    asyncio.run(_serve_stdio_async(max_concurrency))
+
+
+def serve_socket(path: str, max_concurrency: int) -> None:
+    executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="spawn")
+    pools = PoolRegistry()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            reader = _LineReader(self.rfile)
+            writer = FramedWriter(_TextWriter(self.wfile))
+            writer.write({"ready": True})
+            in_flight = serve_stream(reader, writer, executor, pools, _log_stderr)
+            # The client half-closed: its tasks still report on this connection.
+            wait(list(in_flight))
+
+    if os.path.exists(path):
+        os.unlink(path)
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+        _log_stderr(f"[daemon] listening on {path} (maxConcurrency={max_concurrency})")
+        try:
+            server.serve_forever()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            pools.shutdown()
+            os.unlink(path)
+
+
+class _LineReader:
+    """Iterate decoded lines from a binary socket file."""
+
+    def __init__(self, rfile):
+        self._rfile = rfile
+
+    def __iter__(self):
+        for raw in self._rfile:
+            yield raw.decode("utf-8", errors="replace")
+
+
+class _TextWriter:
+    """Minimal text adapter over a binary socket file for FramedWriter."""
+
+    def __init__(self, wfile):
+        self._wfile = wfile
+
+    def write(self, data: str) -> None:
+        self._wfile.write(data.encode("utf-8"))
+
+    def flush(self) -> None:
+        self._wfile.flush()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Long-lived sandbox spawner")
+    parser.add_argument(
+        "--socket",
+        default=os.environ.get("SPAWNER_SOCKET", ""),
+        help="Listen on this Unix socket instead of stdin/stdout",
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=int(os.environ.get("SPAWNER_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+        help="Maximum tasks run_task may drive at once",
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        default=os.environ.get("SPAWNER_ASYNC", "0") == "1",
+        help="Drive all sandboxes from one asyncio loop (stdio only)",
+    )
+    args = parser.parse_args()
+
+    if backend_name({}) == "modal":
+        # Pay for import modal, the App lookup and the image definition once,
+        # before announcing ready.
+        get_backend("modal").resources()
+
+    if args.socket:
+        serve_socket(args.socket, args.max_concurrency)
+    elif args.use_async:
+        serve_stdio_async(args.max_concurrency)
+    else:
+        serve_stdio(args.max_concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Worker Stall Detection
+======================
+
+A hung worker used to be caught only by the 1800 s exec timeout or by the
+orchestrator's ``workerTimeout`` SIGKILL, holding its dispatch slot for half
+an hour. ``StallDetector`` watches every line the worker prints — log lines,
+``Tool start:`` / ``Tool end:`` events — and declares a stall when the worker
+has been silent for longer than the window of the phase it is in:
+
+    setup          2 × WORKER_STALL_S   (npm/git work before the agent starts)
+    agent          1 ×                  (tool calls and model turns)
+    tool_build     3 ×                  (a tool running tsc, tests, a build
+                                         or an install — legitimately quiet)
+    build_check    3 ×                  (worker-runner's post-agent tsc)
+    commit, finalize 1 ×
+
+On a stall ``run_task`` captures diagnostics (the sandbox's process list and
+the worker's last lines), terminates the sandbox and returns a failed handoff
+with ``failureKind: "stalled"`` so the slot is reused and the planner retries.
+
+Configuration (environment):
+    WORKER_STALL_S          base silence window in seconds (default 600; 0 disables)
+    WORKER_STALL_WINDOWS    per-phase overrides in seconds, e.g. "agent=300,tool_build=1200"
+
+Usage:
+    detector = StallDetector(**stall_config_from_env())
+    detector.observe(line)               # for every worker line
+    stall = detector.check()             # None, or {"phase", "silentS", ...}
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+from infra.output_coalescer import WORKER_PREFIX, worker_phase
+
+DEFAULT_STALL_S = 600
+PHASE_FACTORS = {"setup": 2.0, "agent": 1.0, "tool_build": 3.0, "build_check": 3.0, "commit": 1.0, "finalize": 1.0}
+CHECK_INTERVAL_S = 5.0
+TAIL_LINES = 20
+
+TOOL_START = re.compile(r"^Tool start:\s*(.*)")
+TOOL_END = re.compile(r"^Tool end:")
+# Tool invocations that may run quietly for minutes.
+BUILD_COMMAND = re.compile(r"\b(tsc|test|tests|jest|vitest|mocha|build|install|pnpm|npm|yarn|npx|cargo|make)\b")
+
+# Best-effort snapshot of what the sandbox is doing; never waits long.
+DIAGNOSTICS_ARGV = ["bash", "-c", "ps -eo pid,etime,pcpu,rss,args --sort=-pcpu | head -15"]
+
+
+def stall_config_from_env() -> dict:
+    base = float(os.environ.get("WORKER_STALL_S", DEFAULT_STALL_S))
+    windows = {phase: base * factor for phase, factor in PHASE_FACTORS.items()}
+    for item in os.environ.get("WORKER_STALL_WINDOWS", "").split(","):
+        phase, _, seconds = item.partition("=")
+        if phase.strip() and seconds.strip():
+            windows[phase.strip()] = float(seconds)
+    return {"base_s": base, "windows": windows}
+
+
+class StallDetector:
+    """Silence tracker for one worker; ``check()`` reports a stall once."""
+
+    def __init__(self, base_s: float = DEFAULT_STALL_S, windows: dict[str, float] | None = None):
+        self.enabled = base_s > 0
+        self.base_s = base_s
+        self.windows = windows or {}
+        self.phase = "setup"
+        self.stall: dict | None = None
+        self._tool_phase: str | None = None
+        self._last = time.monotonic()
+        self._tail: deque[str] = deque(maxlen=TAIL_LINES)
+        self._lock = threading.Lock()
+
+    def observe(self, line: str) -> None:
+        message = WORKER_PREFIX.sub("", line.rstrip("\n"), count=1)
+        with self._lock:
+            self._last = time.monotonic()
+            self._tail.append(message)
+            start = TOOL_START.match(message)
+            if start:
+                self._tool_phase = "tool_build" if BUILD_COMMAND.search(start.group(1)) else None
+            elif TOOL_END.match(message):
+                self._tool_phase = None
+            phase = worker_phase(message)
+            if phase is not None:
+                self.phase = phase
+
+    def window(self) -> float:
+        phase = self._tool_phase or self.phase
+        return self.windows.get(phase, self.base_s)
+
+    def check(self) -> dict | None:
+        """The stall, the first time the current silence exceeds its window."""
+        if not self.enabled or self.stall is not None:
+            return None
+        with self._lock:
+            silent = time.monotonic() - self._last
+            window = self.window()
+            if silent < window:
+                return None
+            self.stall = {
+                "phase": self._tool_phase or self.phase,
+                "silentS": int(silent),
+                "windowS": int(window),
+                "tail": list(self._tail),
+            }
+            return self.stall
+
+    def watch(self, on_stall: Callable[[dict], None]) -> threading.Event:
+        """Poll ``check()`` on a daemon thread; set the returned event to stop."""
+        stop = threading.Event()
+
+        def run() -> None:
+            while self.enabled and not stop.wait(CHECK_INTERVAL_S):
+                stall = self.check()
+                if stall is not None:
+                    on_stall(stall)
+                    return
+
+        threading.Thread(target=run, name="stall-watch", daemon=True).start()
+        return stop
+
+    async def watch_async(self, on_stall: Callable[[dict], Awaitable[None]]) -> None:
+        """``watch`` for an event loop; run as a task and cancel it when the worker exits."""
+        while self.enabled:
+            await asyncio.sleep(CHECK_INTERVAL_S)
+            stall = self.check()
+            if stall is not None:
+                await on_stall(stall)
+                return
+
+
+def stall_message(stall: dict) -> str:
+    return f"Worker stalled: no output for {stall['silentS']}s during {stall['phase']} (window {stall['windowS']}s)"
+
+
+def stall_concerns(stall: dict, diagnostics: str) -> list[str]:
+    concerns = [stall_message(stall)]
+    if stall["tail"]:
+        concerns.append("Last worker output:\n" + "\n".join(stall["tail"][-10:]))
+    if diagnostics:
+        concerns.append("Sandbox processes at stall:\n" + diagnostics)
+    return concerns
+
+
+def capture_diagnostics(sb) -> str:
+    try:
+        proc = sb.exec(*DIAGNOSTICS_ARGV, timeout=15)
+        out = "".join(proc.stdout)
+        proc.wait()
+        return out.strip()
+    except Exception:
+        return ""
+
+
+async def capture_diagnostics_async(sb) -> str:
+    try:
+        proc = await sb.exec.aio(*DIAGNOSTICS_ARGV, timeout=15)
+        out = "".join([line async for line in proc.stdout])
+        await proc.wait.aio()
+        return out.strip()
+    except Exception:
+        return ""
@@ -0,0 +1,125 @@
+"""Admission backs off on windowed congestion only; async waiters use no threads and survive cancellation."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import unittest
+
+from infra.admission import AdmissionController, AdmissionTimeout, is_congestion_error
+
+
+class AimdTest(unittest.TestCase):
+    def controller(self) -> AdmissionController:
+        return AdmissionController(initial=16, min_limit=2, max_limit=64, target_s=30, max_error_rate=0.1)
+
+    def finish(self, controller: AdmissionController, latency_s: float, ok: bool = True, congestion: bool = True) -> None:
+        controller.acquire()
+        controller.release(latency_s, ok, congestion)
+
+    def test_one_outlier_does_not_halve_the_limit(self):
+        controller = self.controller()
+        for _ in range(20):
+            self.finish(controller, 1.0)
+        self.finish(controller, 120.0)
+        self.finish(controller, 1.0, ok=False)
+        self.assertGreater(controller.limit, 16)
+        self.assertEqual(controller.stats["decreases"], 0)
+
+    def test_windowed_error_rate_halves_the_limit_once(self):
+        controller = self.controller()
+        for _ in range(5):
+            self.finish(controller, 1.0, ok=False)
+        self.assertEqual(controller.limit, 8)
+        for _ in range(5):
+            self.finish(controller, 1.0, ok=False)
+        # Still inside the cooldown: one outage, one halving.
+        self.assertEqual(controller.limit, 8)
+        self.assertEqual(controller.stats["decreases"], 1)
+
+    def test_slow_p90_halves_the_limit(self):
+        controller = self.controller()
+        for latency in (1, 1, 1, 40, 40):
+            self.finish(controller, latency)
+        self.assertLess(controller.limit, 16)
+
+    def test_client_errors_are_not_congestion(self):
+        controller = self.controller()
+        for _ in range(10):
+            with self.assertRaises(ValueError), controller.admit():
+                raise ValueError("bad cpu request")
+        self.assertEqual(controller.limit, 16)
+        self.assertEqual(controller.in_flight, 0)
+        self.assertEqual(controller.stats["clientErrors"], 10)
+        self.assertTrue(is_congestion_error(TimeoutError()))
+        self.assertFalse(is_congestion_error(ValueError()))
+
+
+class AsyncAdmissionTest(unittest.TestCase):
+    def test_waiters_use_no_threads_and_are_admitted_in_turn(self):
+        async def scenario() -> list[int]:
+            controller = AdmissionController(initial=2, min_limit=2, max_limit=2)
+            threads = threading.active_count()
+            order: list[int] = []
+
+            async def create(i: int) -> None:
+                async with controller.admit_async():
+                    order.append(i)
+                    await asyncio.sleep(0.01)
+
+            jobs = [asyncio.create_task(create(i)) for i in range(20)]
+            await asyncio.sleep(0)
+            self.assertEqual(controller.snapshot()["waiting"], 18)
+            self.assertEqual(threading.active_count(), threads)
+            await asyncio.gather(*jobs)
+            self.assertEqual(controller.in_flight, 0)
+            return order
+
+        self.assertEqual(sorted(asyncio.run(scenario())), list(range(20)))
+
+    def test_cancelled_waiter_does_not_take_a_slot(self):
+        async def scenario() -> None:
+            controller = AdmissionController(initial=2, min_limit=2, max_limit=2)
+            controller.acquire()
+            controller.acquire()
+            waiter = asyncio.create_task(controller.acquire_async())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            controller.release(0.1, True)
+            controller.release(0.1, True)
+            self.assertEqual(controller.in_flight, 0)
+            self.assertEqual(controller.waiting, 0)
+            await asyncio.wait_for(controller.acquire_async(), 1)
+            await asyncio.wait_for(controller.acquire_async(), 1)
+            self.assertEqual(controller.in_flight, 2)
+
+        asyncio.run(scenario())
+
+    def test_release_from_a_thread_wakes_an_async_waiter(self):
+        async def scenario() -> None:
+            controller = AdmissionController(initial=2, min_limit=2, max_limit=2)
+            controller.acquire()
+            controller.acquire()
+            waiter = asyncio.create_task(controller.acquire_async())
+            await asyncio.sleep(0)
+            threading.Thread(target=controller.release, args=(0.1, True)).start()
+            await asyncio.wait_for(waiter, 1)
+            self.assertEqual(controller.in_flight, 2)
+
+        asyncio.run(scenario())
+
+    def test_async_wait_times_out(self):
+        async def scenario() -> None:
+            controller = AdmissionController(initial=2, min_limit=2, max_limit=2, max_wait_s=0.05)
+            controller.acquire()
+            controller.acquire()
+            with self.assertRaises(AdmissionTimeout):
+                await controller.acquire_async()
+            self.assertEqual(controller.stats["timedOut"], 1)
+
+        asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
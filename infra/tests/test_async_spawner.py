@@ -0,0 +1,86 @@
+"""The async spawner leases off the event loop and runs batch payloads like the sync one."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import unittest
+
+from infra import spawn_sandbox_async
+from infra.sandbox_pool import PooledSandbox
+
+
+class _Aio:
+    def __init__(self, fn):
+        self.aio = fn
+
+
+class FakeSandbox:
+    def __init__(self):
+        self.terminated = False
+
+        async def open_aio(path: str, mode: str = "r"):
+            # Stop the task right after the create phase.
+            raise RuntimeError("stop after create")
+
+        self.open = _Aio(open_aio)
+
+    def terminate(self) -> None:
+        self.terminated = True
+
+
+class RecordingPool:
+    label = "warm pool"
+
+    def __init__(self):
+        self.entry = PooledSandbox(sandbox=FakeSandbox())
+        self.lease_threads: list[int] = []
+        self.released: list[bool] = []
+
+    def lease(self) -> PooledSandbox:
+        self.lease_threads.append(threading.get_ident())
+        return self.entry
+
+    def release(self, entry: PooledSandbox, recycle: bool = False) -> bool:
+        self.released.append(recycle)
+        return False
+
+
+def payload(**extra) -> dict:
+    tasks = [
+        {"id": "t-1", "branch": "worker/t-1", "scope": ["a.ts"]},
+        {"id": "t-2", "branch": "worker/t-2", "scope": ["b.ts"]},
+    ]
+    return {"task": tasks[0], "batch": tasks, "repoUrl": "https://github.com/org/repo.git", "backend": "modal", **extra}
+
+
+class AsyncSpawnerTest(unittest.TestCase):
+    def run_batch(self, pool: RecordingPool) -> tuple[list[dict], list[str], int]:
+        events: list[str] = []
+
+        async def scenario() -> tuple[list[dict], int]:
+            handoffs = await spawn_sandbox_async.run_batch_async(payload(), events.append, pool)
+            await spawn_sandbox_async.drain_teardowns()
+            return handoffs, threading.get_ident()
+
+        handoffs, loop_thread = asyncio.run(scenario())
+        return handoffs, events, loop_thread
+
+    def test_lease_runs_off_the_event_loop(self):
+        pool = RecordingPool()
+        _, events, loop_thread = self.run_batch(pool)
+        self.assertEqual(len(pool.lease_threads), 1)
+        self.assertNotEqual(pool.lease_threads[0], loop_thread)
+        self.assertEqual(pool.released, [False])
+        create = next(json.loads(e) for e in events if e.startswith("{") and json.loads(e)["phase"] == "create")
+        self.assertEqual(create["source"], "warm pool")
+
+    def test_batch_returns_one_handoff_per_task(self):
+        handoffs, _, _ = self.run_batch(RecordingPool())
+        self.assertEqual([h["taskId"] for h in handoffs], ["t-1", "t-2"])
+        self.assertTrue(all(h["status"] == "failed" for h in handoffs))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+"""Batched tasks must have distinct branches and non-overlapping scopes."""
+
+from __future__ import annotations
+
+import unittest
+
+from infra.batching import check_batch
+
+
+def task(task_id: str, scope: list[str], **extra) -> dict:
+    return {"id": task_id, "branch": f"worker/{task_id}", "scope": scope, **extra}
+
+
+class CheckBatchTest(unittest.TestCase):
+    def test_disjoint_scopes_batch(self):
+        check_batch([task("a", ["src/a.ts"]), task("b", ["src/ab.ts"]), task("c", ["src2/"])])
+
+    def test_paths_are_normalized(self):
+        with self.assertRaises(ValueError):
+            check_batch([task("a", ["./a.ts"]), task("b", ["a.ts"])])
+
+    def test_directory_overlaps_the_paths_under_it(self):
+        for left, right in [("src/", "src/a.ts"), ("src/a.ts", "src"), ("src/**/*.ts", "src/x/y.ts"), ("*.md", "a.ts")]:
+            with self.subTest(left=left, right=right), self.assertRaises(ValueError):
+                check_batch([task("a", [left]), task("b", [right])])
+
+    def test_blank_scope_entries_are_ignored(self):
+        check_batch([task("a", [" "]), task("b", ["a.ts"])])
+
+    def test_conflict_tasks_and_repeated_branches_are_refused(self):
+        with self.assertRaises(ValueError):
+            check_batch([task("a", ["a.ts"], conflictSourceBranch="worker/old"), task("b", ["b.ts"])])
+        with self.assertRaises(ValueError):
+            check_batch([task("a", ["a.ts"]), task("b", ["b.ts"], branch="worker/a")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+"""Hedged creates clone inside each attempt, keep the task's create arguments and come after snapshot forks."""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+import unittest
+from unittest import mock
+
+from infra import spawn_sandbox
+from infra.hedging import Hedger
+from infra.sizing import Sizing
+
+SIZING = Sizing("medium", cpu=2.0, memory_mb=4096, timeout=1800, samples=25)
+
+
+class FakeProcess:
+    returncode = 0
+
+    def wait(self) -> int:
+        return 0
+
+
+class FakeSandbox:
+    def __init__(self):
+        self.terminated = False
+        self.execs: list[tuple[str, ...]] = []
+
+    def exec(self, *argv: str, timeout: int | None = None) -> FakeProcess:
+        self.execs.append(argv)
+        return FakeProcess()
+
+    def open(self, path: str, mode: str = "r"):
+        # Stop run_task right after the create phase.
+        raise RuntimeError("stop after create")
+
+    def terminate(self) -> None:
+        self.terminated = True
+
+
+class FakeBackend:
+    name = "modal"
+    shared_clone = False
+
+    def __init__(self):
+        self.creates: list[dict] = []
+        self.forks: list[tuple[str, dict]] = []
+        self.sandboxes: list[FakeSandbox] = []
+
+    def create(self, **kwargs) -> FakeSandbox:
+        self.creates.append(kwargs)
+        self.sandboxes.append(FakeSandbox())
+        return self.sandboxes[-1]
+
+    def prepare_clone(self, authed_url: str, repo_dir: str) -> None:
+        return None
+
+    def fork(self, ref: str, authed_url: str, **kwargs) -> FakeSandbox:
+        self.forks.append((ref, kwargs))
+        return FakeSandbox()
+
+
+class SnapshotStub:
+    def __init__(self, ref: str | None):
+        self.ref = ref
+
+    def get(self, backend, key: str) -> str | None:
+        return self.ref
+
+
+def run(snapshot_ref: str | None) -> tuple[FakeBackend, Hedger, dict]:
+    backend = FakeBackend()
+    hedger = Hedger()
+    events: list[str] = []
+    payload = {
+        "task": {"id": "t-1", "branch": "worker/t-1", "description": "x"},
+        "repoUrl": "https://github.com/org/repo.git",
+        "hedge": True,
+        "sizing": True,
+        "snapshot": True,
+    }
+    with mock.patch.object(spawn_sandbox, "backend_for", return_value=backend), \
+            mock.patch.object(spawn_sandbox, "size_for", return_value=SIZING), \
+            mock.patch.object(spawn_sandbox, "snapshot_index", return_value=SnapshotStub(snapshot_ref)), \
+            mock.patch.object(spawn_sandbox, "hedger", return_value=hedger):
+        spawn_sandbox.run_task(payload, emit=events.append)
+        spawn_sandbox.wait_for_teardowns()
+    hedger.shutdown()
+    create = next(json.loads(e) for e in events if e.startswith("{") and json.loads(e)["phase"] == "create")
+    return backend, hedger, create
+
+
+class HedgedCreateTest(unittest.TestCase):
+    def test_hedged_create_uses_task_sizing(self):
+        backend, hedger, create = run(snapshot_ref=None)
+        self.assertEqual(
+            backend.creates, [{"timeout": 1800, "volumes": None, "cpu": 2.0, "memory": 4096}],
+        )
+        self.assertEqual(hedger.stats["provisions"], 1)
+        self.assertEqual(create["source"], "fresh")
+        self.assertFalse(create["hedged"])
+
+    def test_hedged_attempt_clones_before_it_counts_as_ready(self):
+        backend, hedger, _ = run(snapshot_ref=None)
+        (sb,) = backend.sandboxes
+        clone = ("git", "clone", "https://github.com/org/repo.git", "/workspace/repo")
+        # Cloned inside the hedged attempt, and not again during setup.
+        self.assertEqual(sb.execs[0], clone)
+        self.assertEqual(sb.execs.count(clone), 1)
+        self.assertEqual(len(hedger._latencies), 1)
+
+    def test_snapshot_fork_wins_over_hedging(self):
+        backend, hedger, create = run(snapshot_ref="im-snapshot")
+        self.assertEqual(
+            backend.forks, [("im-snapshot", {"timeout": 1800, "volumes": None, "cpu": 2.0, "memory": 4096})],
+        )
+        self.assertEqual(backend.creates, [])
+        self.assertEqual(hedger.stats["provisions"], 0)
+        self.assertEqual(create["source"], "snapshot")
+
+
+class HedgerTest(unittest.TestCase):
+    def test_concurrent_provisions_do_not_queue_behind_each_other(self):
+        hedger = Hedger()
+        threads = [
+            threading.Thread(target=hedger.provision, args=(lambda: time.sleep(0.2) or FakeSandbox(),))
+            for _ in range(80)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(hedger._latencies), 80)
+        # Timed inside each attempt: no sample includes waiting for a worker.
+        self.assertLess(max(hedger._latencies), 0.35)
+
+    def test_slow_primary_is_hedged_and_the_loser_terminated(self):
+        hedger = Hedger(budget=1.0, fallback_delay=0.05)
+        slow, fast = FakeSandbox(), FakeSandbox()
+        attempts = iter([(0.5, slow), (0.0, fast)])
+
+        def create() -> FakeSandbox:
+            delay, sb = next(attempts)
+            time.sleep(delay)
+            return sb
+
+        sb, info = hedger.provision(create)
+        self.assertIs(sb, fast)
+        self.assertEqual(info["hedged"], True)
+        self.assertEqual(info["hedgeWon"], True)
+        self.assertFalse(slow.terminated)
+        # Shutdown waits for the losing attempt, which terminates its sandbox.
+        hedger.shutdown()
+        self.assertTrue(slow.terminated)
+        self.assertEqual(hedger._threads, set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+"""Leases get only the cache steps their volumes allow; blob refs go only to freshly created sandboxes."""
+
+from __future__ import annotations
+
+import json
+import unittest
+from unittest import mock
+
+from infra import spawn_sandbox
+from infra.blob_store import BLOB_MOUNT
+from infra.dep_cache import DEPS_MOUNT
+from infra.sandbox_pool import PooledSandbox
+
+
+class FakeProcess:
+    returncode = 0
+    stdout: list[str] = []
+
+    def wait(self) -> int:
+        return 0
+
+
+class FakeFile:
+    def __init__(self, files: dict, path: str):
+        self.files = files
+        self.path = path
+
+    def write(self, data: str) -> None:
+        self.files[self.path] = self.files.get(self.path, "") + data
+
+    def close(self) -> None:
+        pass
+
+
+class FakeSandbox:
+    def __init__(self):
+        self.files: dict[str, str] = {}
+        self.execs: list[tuple[str, ...]] = []
+
+    def open(self, path: str, mode: str = "r") -> FakeFile:
+        return FakeFile(self.files, path)
+
+    def exec(self, *argv: str, timeout: int | None = None) -> FakeProcess:
+        if argv[0] == "node":
+            # Stop the task before the agent starts.
+            raise RuntimeError("stop before agent")
+        self.execs.append(argv)
+        return FakeProcess()
+
+    def terminate(self) -> None:
+        pass
+
+
+class OnePool:
+    label = "warm pool"
+
+    def __init__(self, mounts: frozenset[str]):
+        self.entry = PooledSandbox(sandbox=FakeSandbox(), mounts=mounts)
+
+    def lease(self) -> PooledSandbox:
+        return self.entry
+
+    def release(self, entry: PooledSandbox, recycle: bool = False) -> bool:
+        return False
+
+
+def run(pool: OnePool, **extra) -> list[str]:
+    events: list[str] = []
+    payload = {
+        "task": {"id": "t-1", "branch": "worker/t-1"},
+        "repoUrl": "https://github.com/org/repo.git",
+        "backend": "modal",
+        **extra,
+    }
+    spawn_sandbox.run_task(payload, emit=events.append, pool=pool)
+    spawn_sandbox.wait_for_teardowns()
+    return events
+
+
+def phases(events: list[str]) -> list[str]:
+    return [json.loads(e)["phase"] for e in events if e.startswith("{")]
+
+
+class LeasedDepCacheTest(unittest.TestCase):
+    def test_lease_without_the_deps_volume_skips_the_cache(self):
+        pool = OnePool(mounts=frozenset())
+        with mock.patch.object(spawn_sandbox, "install_deps") as install:
+            events = run(pool, depCache=True)
+        install.assert_not_called()
+        self.assertNotIn("deps", phases(events))
+        self.assertTrue(any("dependency cache not mounted" in e for e in events))
+
+    def test_lease_with_the_deps_volume_uses_the_cache(self):
+        pool = OnePool(mounts=frozenset({DEPS_MOUNT}))
+        with mock.patch.object(spawn_sandbox, "install_deps", return_value={"cache": "hit", "key": "k"}) as install:
+            events = run(pool, depCache=True)
+        install.assert_called_once_with(pool.entry.sandbox)
+        self.assertIn("deps", phases(events))
+
+
+class LeasedBlobDedupTest(unittest.TestCase):
+    PROMPT = "x" * 4096
+
+    def test_lease_gets_the_payload_inline_even_with_the_blob_volume(self):
+        # The lease mounted the volume before any upload for this task, so refs could not resolve.
+        pool = OnePool(mounts=frozenset({BLOB_MOUNT}))
+        with mock.patch.object(spawn_sandbox, "externalize_blobs") as externalize:
+            run(pool, blobDedup=True, systemPrompt=self.PROMPT)
+        externalize.assert_not_called()
+        task = json.loads(pool.entry.sandbox.files["/workspace/task.json"])
+        self.assertEqual(task["systemPrompt"], self.PROMPT)
+        self.assertNotIn("blobRefs", task)
+
+
+class FakeBackend:
+    name = "modal"
+    shared_clone = False
+
+    def __init__(self, calls: list[str]):
+        self.calls = calls
+        self.sandboxes: list[FakeSandbox] = []
+
+    def create(self, **kwargs) -> FakeSandbox:
+        self.calls.append("create")
+        self.sandboxes.append(FakeSandbox())
+        return self.sandboxes[-1]
+
+    def prepare_clone(self, authed_url: str, repo_dir: str) -> None:
+        return None
+
+
+class CreatedBlobDedupTest(unittest.TestCase):
+    def test_blobs_are_uploaded_before_the_sandbox_is_created(self):
+        calls: list[str] = []
+        backend = FakeBackend(calls)
+
+        def externalize(payload, backend):
+            calls.append("upload")
+            return {**payload, "systemPrompt": None, "blobRefs": {"systemPrompt": "abc"}}
+
+        with mock.patch.object(spawn_sandbox, "backend_for", return_value=backend), \
+                mock.patch.object(spawn_sandbox, "blob_volume"), \
+                mock.patch.object(spawn_sandbox, "externalize_blobs", side_effect=externalize):
+            run(None, blobDedup=True, systemPrompt="x" * 4096)
+        self.assertEqual(calls, ["upload", "create"])
+        task = json.loads(backend.sandboxes[0].files["/workspace/task.json"])
+        self.assertEqual(task["blobRefs"], {"systemPrompt": "abc"})
+
+
+if __name__ == "__main__":
+    unittest.main()
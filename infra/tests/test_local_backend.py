@@ -0,0 +1,37 @@
+"""A failed refresh of the local backend's shared clone reports git's stderr."""
+
+from __future__ import annotations
+
+import shutil
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+from infra.sandbox_backend import LocalBackend
+
+
+def git(*argv: str, cwd: Path) -> None:
+    subprocess.run(["git", *argv], cwd=cwd, check=True, capture_output=True)
+
+
+class SharedCloneTest(unittest.TestCase):
+    def setUp(self):
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        self.origin = tmp / "origin"
+        self.origin.mkdir()
+        git("init", "-q", "-b", "main", cwd=self.origin)
+        git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "--allow-empty", "-m", "init", cwd=self.origin)
+        self.backend = LocalBackend(root=tmp / "sandboxes")
+        self.backend.fetch_interval = 0
+
+    def test_failed_fetch_raises_with_git_stderr(self):
+        self.backend._shared_clone(str(self.origin))
+        shutil.rmtree(self.origin)
+        with self.assertRaisesRegex(RuntimeError, r"git fetch failed .*origin"):
+            self.backend._shared_clone(str(self.origin))
+
+
+if __name__ == "__main__":
+    unittest.main()
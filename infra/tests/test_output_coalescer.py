@@ -0,0 +1,69 @@
+"""Worker output is folded into rate-limited progress events and always flushed."""
+
+from __future__ import annotations
+
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from infra.output_coalescer import OutputCoalescer
+
+
+class CoalescerTest(unittest.TestCase):
+    def setUp(self):
+        self.log_dir = Path(tempfile.mkdtemp())
+        self.lines: list[str] = []
+
+    def coalescer(self, window_s: float = 60, passthrough: int = 5) -> OutputCoalescer:
+        return OutputCoalescer("t-1", self.lines.append, window_s, passthrough, self.log_dir)
+
+    def progress(self) -> list[dict]:
+        return [json.loads(line) for line in self.lines if line.startswith("{")]
+
+    def test_burst_is_one_summary_per_window_plus_the_final_flush(self):
+        output = self.coalescer()
+        output.line("[worker] Running agent prompt\n")
+        for n in range(1, 21):
+            output.line(f"[worker] Tool calls: {n}\n")
+        self.assertEqual(len(self.progress()), 1)
+        output.close()
+
+        first, last = self.progress()
+        self.assertEqual(first["lines"], 1)
+        self.assertEqual(last["lines"], 20)
+        self.assertEqual(last["toolCalls"], 20)
+        self.assertEqual(last["phase"], "agent")
+        self.assertEqual(len((self.log_dir / "t-1.log").read_text().splitlines()), 21)
+
+    def test_phase_change_flushes_immediately(self):
+        output = self.coalescer()
+        output.line("[worker] Running agent prompt\n")
+        output.line("[worker] Tool calls: 3\n")
+        output.line("[worker] Agent prompt completed\n")
+        self.assertEqual([p["phase"] for p in self.progress()], ["agent", "commit"])
+        output.close()
+
+    def test_warnings_pass_through_up_to_the_cap(self):
+        output = self.coalescer(passthrough=2)
+        for n in range(4):
+            output.line(f"WARNING: retry {n}\n")
+        output.close()
+
+        forwarded = [line for line in self.lines if line.startswith("[worker:t-1] ")]
+        self.assertEqual(forwarded, ["[worker:t-1] WARNING: retry 0", "[worker:t-1] WARNING: retry 1"])
+        self.assertEqual(sum(p["suppressed"] for p in self.progress()), 2)
+
+    def test_trailing_flush_after_the_window(self):
+        output = self.coalescer(window_s=0.05)
+        output.line("[worker] Tool calls: 1\n")
+        output.line("[worker] Tool calls: 2\n")
+        time.sleep(0.2)
+        self.assertEqual(self.progress()[-1]["toolCalls"], 2)
+        output.close()
+        self.assertEqual(len(self.progress()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
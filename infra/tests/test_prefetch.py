@@ -0,0 +1,65 @@
+"""Prefetch misses count only requested tasks, and a claim that gives up never leaks the sandbox."""
+
+from __future__ import annotations
+
+import unittest
+from concurrent.futures import Future
+from unittest import mock
+
+from infra import prefetch
+from infra.prefetch import Prefetcher
+from infra.sandbox_pool import PooledSandbox
+
+
+def payload(task_id: str) -> dict:
+    return {"task": {"id": task_id}, "repoUrl": "https://github.com/org/repo", "gitToken": "", "backend": "modal"}
+
+
+class PrefetchMissTest(unittest.TestCase):
+    def setUp(self):
+        self.prefetcher = Prefetcher(depth=1)
+        # Provisioning never finishes, so the first prefetch holds the depth.
+        self.prefetcher._executor = mock.Mock(submit=mock.Mock(side_effect=lambda *a: Future()))
+        self.addCleanup(self.prefetcher._stop.set)
+
+    def test_unrequested_task_is_not_a_miss(self):
+        self.assertIsNone(self.prefetcher.claim("never-asked"))
+        self.assertEqual(self.prefetcher.stats["missed"], 0)
+
+    def test_refused_task_is_a_miss_once(self):
+        self.assertTrue(self.prefetcher.prefetch(payload("a")))
+        self.assertFalse(self.prefetcher.prefetch(payload("b")))
+        self.assertEqual(self.prefetcher.stats["refused"], 1)
+
+        self.assertIsNone(self.prefetcher.claim("b"))
+        self.assertIsNone(self.prefetcher.claim("b"))
+        self.assertEqual(self.prefetcher.stats["missed"], 1)
+
+    def test_duplicate_request_is_ignored(self):
+        self.assertTrue(self.prefetcher.prefetch(payload("a")))
+        self.assertFalse(self.prefetcher.prefetch(payload("a")))
+        self.assertEqual(self.prefetcher.stats["started"], 1)
+        self.assertEqual(self.prefetcher.stats["refused"], 0)
+
+
+class SlowPrefetchTest(unittest.TestCase):
+    def setUp(self):
+        self.prefetcher = Prefetcher(depth=1)
+        self.future: Future = Future()
+        self.prefetcher._executor = mock.Mock(submit=mock.Mock(return_value=self.future))
+        self.addCleanup(self.prefetcher._stop.set)
+
+    def test_timed_out_claim_terminates_the_sandbox_when_it_arrives(self):
+        self.assertTrue(self.prefetcher.prefetch(payload("a")))
+        with mock.patch.object(prefetch, "CLAIM_WAIT_S", 0.01):
+            self.assertIsNone(self.prefetcher.claim("a"))
+        self.assertEqual(self.prefetcher.stats["failed"], 1)
+        self.assertEqual(self.prefetcher.snapshot()["outstanding"], 0)
+
+        sandbox = mock.Mock()
+        self.future.set_result(PooledSandbox(sandbox=sandbox))
+        sandbox.terminate.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
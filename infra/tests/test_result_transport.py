@@ -0,0 +1,121 @@
+"""Results are copied out in chunks; large diffs are gzipped into a store addressed by their sha256."""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from infra import result_transport
+from infra.result_transport import ContentWriter, read_result, spill_diff
+
+
+class ChunkedFile:
+    def __init__(self, data: bytes, reads: list[int]):
+        self.data = io.BytesIO(data)
+        self.reads = reads
+
+    def read(self, size: int) -> bytes:
+        self.reads.append(size)
+        return self.data.read(size)
+
+    def close(self) -> None:
+        pass
+
+
+class FakeSandbox:
+    def __init__(self, files: dict[str, bytes]):
+        self.files = files
+        self.reads: list[int] = []
+
+    def open(self, path: str, mode: str = "r") -> ChunkedFile:
+        return ChunkedFile(self.files[path], self.reads)
+
+
+class FailingFile(ChunkedFile):
+    def read(self, size: int) -> bytes:
+        if self.reads:
+            raise OSError("sandbox went away")
+        return super().read(size)
+
+
+class ResultTransportTest(unittest.TestCase):
+    def setUp(self):
+        self.store = Path(tempfile.mkdtemp())
+        patcher = mock.patch.dict(os.environ, {"RESULT_STORE_DIR": str(self.store), "RESULT_DIFF_INLINE_MAX": "1024"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        chunk = mock.patch.object(result_transport, "RESULT_CHUNK_BYTES", 100)
+        chunk.start()
+        self.addCleanup(chunk.stop)
+
+    def assert_stored(self, ref: dict, diff: str) -> None:
+        stored = Path(ref["path"]).read_bytes()
+        self.assertEqual(Path(ref["path"]).name, f"{ref['sha256']}.diff.gz")
+        self.assertEqual(hashlib.sha256(stored).hexdigest(), ref["sha256"])
+        self.assertEqual(ref["compressedBytes"], len(stored))
+        self.assertEqual(gzip.decompress(stored).decode("utf-8"), diff)
+
+    def test_read_result_in_chunks(self):
+        result = {"status": "complete", "summary": "s" * 450}
+        sb = FakeSandbox({"/workspace/result.json": json.dumps(result).encode("utf-8")})
+        self.assertEqual(read_result(sb, "/workspace/result.json"), result)
+        self.assertGreater(len(sb.reads), 4)
+        self.assertEqual(set(sb.reads), {100})
+
+    def test_diff_file_is_streamed_into_the_store(self):
+        diff = "".join(f"+line {n}\n" for n in range(500))
+        sb = FakeSandbox({"/workspace/result.json.diff.gz": gzip.compress(diff.encode("utf-8"))})
+        result = spill_diff(sb, {
+            "diff": "",
+            "diffFile": "/workspace/result.json.diff.gz",
+            "diffBytes": len(diff),
+        })
+        self.assertNotIn("diffFile", result)
+        self.assertNotIn("diffBytes", result)
+        self.assertEqual(result["diffRef"]["bytes"], len(diff))
+        self.assert_stored(result["diffRef"], diff)
+
+    def test_large_inline_diff_is_compressed_and_spilled(self):
+        diff = "+é\n" * 2000
+        result = spill_diff(FakeSandbox({}), {"diff": diff})
+        self.assertEqual(result["diff"], "")
+        self.assertEqual(result["diffRef"]["bytes"], len(diff.encode("utf-8")))
+        self.assert_stored(result["diffRef"], diff)
+
+    def test_same_diff_is_stored_once(self):
+        diff = "+x\n" * 1000
+        first = spill_diff(FakeSandbox({}), {"diff": diff})
+        second = spill_diff(FakeSandbox({}), {"diff": diff})
+        self.assertEqual(first["diffRef"], second["diffRef"])
+        self.assertEqual(len(list(self.store.glob("*.diff.gz"))), 1)
+
+    def test_small_result_passes_through(self):
+        result = {"status": "complete", "diff": "+x\n"}
+        self.assertEqual(spill_diff(FakeSandbox({}), dict(result)), result)
+        self.assertEqual(list(self.store.iterdir()), [])
+
+    def test_failed_copy_leaves_no_temp_file(self):
+        sb = FakeSandbox({"/workspace/d.gz": b"x" * 300})
+        sb.open = lambda path, mode="r": FailingFile(sb.files[path], sb.reads)
+        with self.assertRaises(OSError):
+            spill_diff(sb, {"diffFile": "/workspace/d.gz"})
+        self.assertEqual(list(self.store.iterdir()), [])
+
+    def test_content_writer_hashes_what_it_writes(self):
+        writer = ContentWriter(self.store)
+        for part in (b"abc", b"def"):
+            writer.write(part)
+        path = writer.commit("out")
+        self.assertEqual(writer.sha256(), hashlib.sha256(b"abcdef").hexdigest())
+        self.assertEqual((writer.size, path.read_bytes()), (6, b"abcdef"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""Sandbox sizing from run history: percentiles, rounding, the timeout floor and the history file."""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from infra import sizing as sizing_module
+from infra.sizing import (
+    MIN_TIMEOUT, SETUP_MARGIN_S, Sizing, handoff_features, load_history, record_run, size_for, task_class,
+)
+
+TASK = {"id": "t-1", "description": "Rename a helper", "scope": ["src/a.ts"]}
+
+
+class SizingTest(unittest.TestCase):
+    def setUp(self):
+        history = Path(tempfile.mkdtemp()) / "sizing.jsonl"
+        self.history = history
+        patcher = mock.patch.dict(os.environ, {
+            "SANDBOX_SIZING_HISTORY": str(history),
+            "SANDBOX_SIZING_MIN_SAMPLES": "5",
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def record(
+        self, agent_s: float, cores: float = 1.0, peak_mb: int = 1000, exit_code: int = 0, memory_mb=None,
+        handoff: dict | None = None,
+    ):
+        sizing = Sizing(task_class(TASK), memory_mb=memory_mb)
+        stats = {"avgCores": cores, "peakMemMb": peak_mb}
+        if handoff is not None:
+            stats.update(handoff_features(handoff))
+        record_run(sizing, "t-0", int(agent_s * 1000), exit_code, stats)
+
+    def test_defaults_until_enough_samples(self):
+        for _ in range(4):
+            self.record(100)
+        sizing = size_for(TASK)
+        self.assertEqual((sizing.cls, sizing.samples, sizing.cpu, sizing.memory_mb), ("edit-s", 0, None, None))
+        self.assertEqual(sizing.agent_timeout, sizing.timeout - SETUP_MARGIN_S)
+
+    def test_percentiles_with_headroom_and_rounding(self):
+        for n in range(1, 11):
+            self.record(agent_s=100 * n, cores=0.2 * n, peak_mb=300 * n)
+        sizing = size_for(TASK)
+        self.assertEqual(sizing.samples, 10)
+        # p90 of cores is 2.0 → × 1.5 = 3.0
+        self.assertEqual(sizing.cpu, 3.0)
+        # p90 of peaks is 3000 MB → × 1.3 = 3900, rounded up to 4096
+        self.assertEqual(sizing.memory_mb, 4096)
+        # p95 of agent time is 1000 s → × 1.5 + margin = 2100
+        self.assertEqual(sizing.timeout, 2100)
+        self.assertEqual(sizing.agent_timeout, 2100 - SETUP_MARGIN_S)
+
+    def test_short_runs_keep_the_timeout_floor(self):
+        for _ in range(5):
+            self.record(agent_s=30, cores=0.1, peak_mb=100)
+        sizing = size_for(TASK)
+        self.assertEqual(sizing.timeout, MIN_TIMEOUT)
+        # The agent still gets timeout - 600 s, never less.
+        self.assertEqual(sizing.agent_timeout, MIN_TIMEOUT - SETUP_MARGIN_S)
+        self.assertEqual(sizing.cpu, 1.0)
+        self.assertEqual(sizing.memory_mb, 1024)
+
+    def test_recent_oom_doubles_memory(self):
+        for _ in range(5):
+            self.record(agent_s=100, peak_mb=1000)
+        self.record(agent_s=100, peak_mb=1000, exit_code=137, memory_mb=2048)
+        self.assertEqual(size_for(TASK).memory_mb, 4096)
+
+    def test_handoff_features_are_recorded_and_idle_runs_skipped(self):
+        handoff = {"filesChanged": ["a.ts", "b.ts"], "metrics": {"tokensUsed": 5000}}
+        for _ in range(5):
+            self.record(agent_s=1000, cores=2.0, handoff=handoff)
+        # Runs that spent no tokens say nothing about the work's duration or CPU.
+        for _ in range(5):
+            self.record(agent_s=10, cores=0.1, handoff={"filesChanged": [], "metrics": {"tokensUsed": 0}})
+        sizing = size_for(TASK)
+        self.assertEqual(sizing.timeout, 2100)
+        self.assertEqual(sizing.cpu, 3.0)
+        self.assertEqual((sizing.files_changed, sizing.tokens_used), (2, 5000))
+        self.assertIn("2 files / 5000 tokens", sizing.describe())
+
+    def test_history_is_parsed_once_and_read_incrementally(self):
+        for _ in range(5):
+            self.record(100)
+        self.assertEqual(len(load_history("edit-s")), 5)
+        with mock.patch.object(sizing_module.json, "loads", wraps=sizing_module.json.loads) as loads:
+            self.record(100)
+            self.assertEqual(len(load_history("edit-s")), 6)
+        self.assertEqual(loads.call_count, 1)
+
+    def test_history_is_trimmed_to_the_class_window(self):
+        with mock.patch.dict(os.environ, {"SANDBOX_SIZING_HISTORY_MAX_BYTES": "20000"}):
+            for _ in range(200):
+                self.record(100)
+        self.assertLess(self.history.stat().st_size, 20000)
+        self.assertEqual(len(load_history("edit-s")), sizing_module.CLASS_WINDOW)
+
+    def test_task_class(self):
+        self.assertEqual(task_class({"description": "Add unit tests", "scope": ["a", "b", "c"]}), "test-m")
+        self.assertEqual(task_class({"conflictSourceBranch": "x", "description": "fix tests"}), "conflict-s")
+        self.assertEqual(task_class({"description": "Fix tsc errors", "scope": list("abcdefghij")}), "build-l")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+"""Sparse-checkout patterns are derived from the task scope."""
+
+from __future__ import annotations
+
+import os
+import unittest
+from unittest import mock
+
+from infra.sparse_checkout import scope_directory, scope_path, sparse_clone_script, sparse_patterns
+
+
+class ScopeDirectoryTest(unittest.TestCase):
+    def test_scope_paths_are_normalized(self):
+        self.assertEqual(scope_path("./src//a.ts"), "src/a.ts")
+        self.assertEqual(scope_path("/src/"), "src")
+        self.assertEqual(scope_path("src/**/*.ts"), "src")
+
+    def test_scope_entries_map_to_their_directory(self):
+        self.assertEqual(scope_directory("src/a/b.ts"), "src/a")
+        self.assertEqual(scope_directory("./src/a.ts"), "src")
+        self.assertEqual(scope_directory("/packages/core/"), "packages/core")
+        self.assertEqual(scope_directory("src/**/*.ts"), "src")
+        self.assertEqual(scope_directory("*.md"), "")
+        self.assertEqual(scope_directory("README.md"), "")
+
+
+@mock.patch.dict(os.environ, {"SPARSE_ALWAYS_INCLUDE": "**/package.json"})
+class SparsePatternsTest(unittest.TestCase):
+    def test_no_scope_clones_everything(self):
+        self.assertIsNone(sparse_patterns({"scope": []}))
+        self.assertIsNone(sparse_patterns({"scope": ["  "]}))
+        self.assertIsNone(sparse_patterns({}))
+
+    def test_root_files_plus_scope_directories_deduplicated(self):
+        patterns = sparse_patterns({"scope": ["src/b/x.ts", "src/a/y.ts", "./src/a/z.ts", "README.md"]})
+        self.assertEqual(patterns, ["/*", "!/*/", "/src/a/", "/src/b/", "**/package.json"])
+
+    def test_clone_script_sets_the_patterns(self):
+        script = sparse_clone_script("https://github.com/org/repo.git", "/workspace/repo", ["/*", "/src/"])
+        self.assertIn("--filter=blob:none --no-checkout", script)
+        self.assertIn("printf '%s\\n' '/*' /src/ | git -C /workspace/repo sparse-checkout set --no-cone --stdin", script)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""A socket client that half-closes still gets every frame of its requests; a reset peer is ignored."""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from infra import spawner_daemon
+from infra.spawner_daemon import FramedWriter
+
+
+class ResetStream:
+    def write(self, data: str) -> None:
+        raise ConnectionResetError("peer reset")
+
+    def flush(self) -> None:
+        pass
+
+
+def slow_run_task(payload: dict, emit, pool=None) -> dict:
+    time.sleep(0.2)
+    emit("[spawn] sandbox created")
+    return {"taskId": payload["task"]["id"], "status": "complete"}
+
+
+class FramedWriterTest(unittest.TestCase):
+    def test_reset_peer_does_not_raise(self):
+        FramedWriter(ResetStream()).write({"id": "r-1", "line": "x"})
+
+
+class SocketServerTest(unittest.TestCase):
+    def test_half_closed_connection_receives_its_handoff(self):
+        path = os.path.join(tempfile.mkdtemp(), "spawner.sock")
+        with mock.patch.object(spawner_daemon, "run_task", side_effect=slow_run_task):
+            threading.Thread(target=spawner_daemon.serve_socket, args=(path, 4), daemon=True).start()
+            for _ in range(100):
+                if os.path.exists(path):
+                    break
+                time.sleep(0.01)
+
+            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            client.connect(path)
+            request = {"id": "r-1", "payload": {"task": {"id": "t-1"}, "backend": "local"}}
+            client.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            client.shutdown(socket.SHUT_WR)
+            with client.makefile("rb") as f:
+                frames = [json.loads(line) for line in f]
+            client.close()
+
+        self.assertEqual(frames[0], {"ready": True})
+        self.assertEqual(frames[1], {"id": "r-1", "line": "[spawn] sandbox created"})
+        self.assertEqual(frames[-1], {"id": "r-1", "handoff": {"taskId": "t-1", "status": "complete"}})
+
+
+if __name__ == "__main__":
+    unittest.main()
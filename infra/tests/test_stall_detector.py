@@ -0,0 +1,131 @@
+"""Stall windows scale with the worker's phase, and a stalled worker gets a classified handoff."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+
+from infra import spawn_sandbox, stall_detector
+from infra.sandbox_pool import PooledSandbox
+from infra.stall_detector import StallDetector, stall_config_from_env
+
+
+class StallWindowTest(unittest.TestCase):
+    def test_windows_scale_with_phase_and_take_overrides(self):
+        with mock.patch.dict(os.environ, {"WORKER_STALL_S": "100", "WORKER_STALL_WINDOWS": "agent=30"}):
+            config = stall_config_from_env()
+        self.assertEqual(config["base_s"], 100)
+        self.assertEqual(config["windows"]["setup"], 200)
+        self.assertEqual(config["windows"]["tool_build"], 300)
+        self.assertEqual(config["windows"]["build_check"], 300)
+        self.assertEqual(config["windows"]["agent"], 30)
+
+    def test_window_follows_phase_and_build_tools(self):
+        detector = StallDetector(base_s=100, windows={"setup": 200, "agent": 100, "tool_build": 300})
+        self.assertEqual(detector.window(), 200)
+        detector.observe("[worker] Running agent prompt\n")
+        self.assertEqual(detector.window(), 100)
+        detector.observe("[worker] Tool start: bash npx tsc --noEmit\n")
+        self.assertEqual(detector.window(), 300)
+        detector.observe("[worker] Tool end: bash\n")
+        self.assertEqual(detector.window(), 100)
+        detector.observe("[worker] Tool start: read_file src/a.ts\n")
+        self.assertEqual(detector.window(), 100)
+
+    def test_stall_is_reported_once_after_the_window(self):
+        detector = StallDetector(base_s=0.05, windows={"agent": 0.05})
+        detector.observe("[worker] Running agent prompt\n")
+        self.assertIsNone(detector.check())
+        time.sleep(0.1)
+        stall = detector.check()
+        self.assertEqual(stall["phase"], "agent")
+        self.assertEqual(stall["tail"], ["Running agent prompt"])
+        self.assertIsNone(detector.check())
+
+    def test_disabled_detector_never_stalls(self):
+        detector = StallDetector(base_s=0)
+        time.sleep(0.01)
+        self.assertIsNone(detector.check())
+
+
+class HangingProcess:
+    """A worker that prints one line and then goes silent until the sandbox is terminated."""
+
+    def __init__(self, terminated: threading.Event):
+        self.returncode = None
+        self._terminated = terminated
+        self.stderr: list[str] = []
+
+    @property
+    def stdout(self):
+        yield "[worker] Running agent prompt\n"
+        self._terminated.wait(5)
+
+    def wait(self) -> int:
+        self.returncode = 137
+        return self.returncode
+
+
+class DoneProcess:
+    returncode = 0
+    stdout = ["  PID ELAPSED %CPU   RSS COMMAND\n", "   42   10:00  0.0  9000 node /agent/worker-runner.js\n"]
+
+    def wait(self) -> int:
+        return 0
+
+
+class StallingSandbox:
+    def __init__(self):
+        self.terminated = threading.Event()
+
+    def open(self, path: str, mode: str = "r"):
+        return mock.Mock()
+
+    def exec(self, *argv: str, timeout: int | None = None):
+        if argv[0] == "node":
+            return HangingProcess(self.terminated)
+        return DoneProcess()
+
+    def terminate(self) -> None:
+        self.terminated.set()
+
+
+class OnePool:
+    label = "warm pool"
+
+    def __init__(self):
+        self.entry = PooledSandbox(sandbox=StallingSandbox())
+
+    def lease(self) -> PooledSandbox:
+        return self.entry
+
+    def release(self, entry: PooledSandbox, recycle: bool = False) -> bool:
+        return False
+
+
+class StalledHandoffTest(unittest.TestCase):
+    def test_stalled_worker_returns_a_classified_handoff(self):
+        payload = {
+            "task": {"id": "t-1", "branch": "worker/t-1"},
+            "repoUrl": "https://github.com/org/repo.git",
+            "backend": "modal",
+        }
+        events: list[str] = []
+        env = {"WORKER_STALL_S": "0.05", "WORKER_OUTPUT_COALESCE": "0"}
+        with mock.patch.dict(os.environ, env), mock.patch.object(stall_detector, "CHECK_INTERVAL_S", 0.02):
+            handoff = spawn_sandbox.run_task(payload, emit=events.append, pool=OnePool())
+            spawn_sandbox.wait_for_teardowns()
+
+        self.assertEqual(handoff["status"], "failed")
+        self.assertEqual(handoff["failureKind"], "stalled")
+        self.assertIn("during agent", handoff["summary"])
+        self.assertIn("Running agent prompt", handoff["concerns"][1])
+        self.assertIn("node /agent/worker-runner.js", handoff["concerns"][2])
+        self.assertTrue(any("Worker stalled" in e and "terminating" in e for e in events))
+
+
+if __name__ == "__main__":
+    unittest.main()
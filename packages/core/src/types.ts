@@ -22,12 +22,21 @@ export interface Task {
   retryCount?: number;           // How many times this task has been retried (0 = first attempt)
 }
 
+// Large diff kept out of the handoff line (infra/result_transport.py)
+export interface DiffRef {
+  path: string;                  // Local gzip file, named by sha256
+  sha256: string;                // Of the compressed bytes
+  bytes: number;                 // Uncompressed diff size
+  compressedBytes: number;
+}
+
 // Handoff report from worker back to planner
 export interface Handoff {
   taskId: string;
   status: "complete" | "partial" | "blocked" | "failed";
   summary: string;               // What was done
-  diff: string;                 // Git diff output
+  diff: string;                 // Git diff output ("" when spilled to diffRef)
+  diffRef?: DiffRef;            // Where a large diff was spilled; read with readHandoffDiff()
   filesChanged: string[];       // List of changed file paths
   concerns: string[];           // Issues discovered
   suggestions: string[];        // Recommendations for planner
@@ -42,6 +51,10 @@ export interface Handoff {
   };
   /** tsc --noEmit exit code from post-agent build check. null = check did not run. */
   buildExitCode?: number | null;
+  /** Local path of a git bundle with the branch's commits (HANDOFF_MODE=bundle); the branch was not pushed. */
+  bundlePath?: string;
+  /** Why the spawner failed the task itself: "stalled" = no worker output for the phase's window (infra/stall_detector.py). */
+  failureKind?: "stalled";
 }
 
 // Worker sandbox status
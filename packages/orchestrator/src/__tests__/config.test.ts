@@ -52,6 +52,8 @@ describe("config", () => {
       assert.strictEqual(config.sandbox.idleTimeout, 300);
       assert.strictEqual(config.targetRepoPath, "./target-repo");
       assert.strictEqual(config.pythonPath, "python3");
+      assert.strictEqual(config.spawnerMode, "process");
+      assert.deepStrictEqual(config.batch, { maxTasks: 1, targetMs: 600_000, windowMs: 2_000 });
       assert.strictEqual(config.healthCheckInterval, 10);
       assert.strictEqual(config.readinessTimeoutMs, 120_000);
     });
@@ -194,6 +196,22 @@ describe("config", () => {
     });
   });
 
+  it("accepts daemon spawner mode", () => {
+    withEnv({ ...REQUIRED_ENV, SPAWNER_MODE: "daemon" }, () => {
+      const config = loadConfig();
+      assert.strictEqual(config.spawnerMode, "daemon");
+    });
+  });
+
+  it("throws on invalid spawner mode", () => {
+    withEnv({ ...REQUIRED_ENV, SPAWNER_MODE: "thread" }, () => {
+      assert.throws(
+        () => loadConfig(),
+        (err: Error) => err.message.includes("Invalid spawnerMode")
+      );
+    });
+  });
+
   it("numeric values are parsed correctly", () => {
     withEnv({ ...REQUIRED_ENV, MAX_WORKERS: "8" }, () => {
       const config = loadConfig();
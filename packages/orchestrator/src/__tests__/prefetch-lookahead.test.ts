@@ -0,0 +1,57 @@
+import { describe, it } from "node:test";
+import assert from "node:assert/strict";
+import type { Task } from "@agentswarm/core";
+import { PrefetchLookahead } from "../worker-pool.js";
+
+function makeTask(id: string): Task {
+  return {
+    id,
+    description: "Fix",
+    scope: ["a.ts"],
+    acceptance: "Compiles",
+    branch: `worker/${id}`,
+    status: "pending",
+    createdAt: Date.now(),
+    priority: 5,
+  };
+}
+
+describe("PrefetchLookahead", () => {
+  it("requests only the first depth waiting tasks", () => {
+    const sent: string[] = [];
+    const lookahead = new PrefetchLookahead(2, (t) => sent.push(t.id));
+    for (const id of ["a", "b", "c", "d"]) lookahead.enqueue(makeTask(id));
+    assert.deepStrictEqual(sent, ["a", "b"]);
+    assert.strictEqual(lookahead.size, 4);
+  });
+
+  it("moves the window to the front of the queue when a task gets its slot", () => {
+    const sent: string[] = [];
+    const lookahead = new PrefetchLookahead(2, (t) => sent.push(t.id));
+    for (const id of ["a", "b", "c", "d"]) lookahead.enqueue(makeTask(id));
+    sent.length = 0;
+
+    lookahead.dequeue("a");
+    // b is asked again in case the spawner refused it while its depth was full.
+    assert.deepStrictEqual(sent, ["b", "c"]);
+    assert.strictEqual(lookahead.size, 3);
+  });
+
+  it("ignores tasks that never waited", () => {
+    const sent: string[] = [];
+    const lookahead = new PrefetchLookahead(2, (t) => sent.push(t.id));
+    lookahead.enqueue(makeTask("a"));
+    sent.length = 0;
+    lookahead.dequeue("z");
+    assert.deepStrictEqual(sent, []);
+  });
+
+  it("does nothing with depth 0", () => {
+    const sent: string[] = [];
+    const lookahead = new PrefetchLookahead(0, (t) => sent.push(t.id));
+    lookahead.enqueue(makeTask("a"));
+    lookahead.dequeue("a");
+    assert.deepStrictEqual(sent, []);
+    assert.strictEqual(lookahead.size, 0);
+  });
+});
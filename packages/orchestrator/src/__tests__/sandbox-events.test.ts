@@ -0,0 +1,54 @@
+import { describe, it } from "node:test";
+import assert from "node:assert/strict";
+import { parseHandoffLine, parseSandboxEvent } from "../worker-pool.js";
+
+describe("parseSandboxEvent", () => {
+  it("parses phase events", () => {
+    const event = parseSandboxEvent(
+      '{"type":"phase","taskId":"task-1","phase":"clone","durationMs":3120,"atMs":4410,"ok":true,"bytes":1024}',
+    );
+    assert.strictEqual(event?.type, "phase");
+    assert.strictEqual(event?.phase, "clone");
+    assert.strictEqual(event?.type === "phase" ? event.durationMs : undefined, 3120);
+  });
+
+  it("parses coalesced progress events", () => {
+    const event = parseSandboxEvent(
+      '{"type":"progress","taskId":"task-1","phase":"agent","toolCalls":40,"detail":"Tool calls: 40","lines":12,"suppressed":0}',
+    );
+    assert.strictEqual(event?.type, "progress");
+    assert.strictEqual(event?.type === "progress" ? event.toolCalls : undefined, 40);
+  });
+
+  it("ignores the handoff and other JSON lines", () => {
+    assert.strictEqual(parseSandboxEvent('{"taskId":"task-1","status":"complete"}'), null);
+    assert.strictEqual(parseSandboxEvent('{"type":"other","phase":"x"}'), null);
+  });
+
+  it("ignores text and malformed lines", () => {
+    assert.strictEqual(parseSandboxEvent("[spawn] sandbox created for task task-1 (1.2s)"), null);
+    assert.strictEqual(parseSandboxEvent("{not json"), null);
+  });
+});
+
+describe("parseHandoffLine", () => {
+  it("recognizes the task's handoff", () => {
+    const handoff = parseHandoffLine('{"taskId":"task-1","status":"complete","summary":"done"}', "task-1");
+    assert.strictEqual(handoff?.status, "complete");
+  });
+
+  it("ignores events, other tasks and text", () => {
+    assert.strictEqual(
+      parseHandoffLine('{"type":"phase","taskId":"task-1","phase":"terminate","status":"x"}', "task-1"),
+      null,
+    );
+    assert.strictEqual(parseHandoffLine('{"taskId":"task-2","status":"complete"}', "task-1"), null);
+    assert.strictEqual(parseHandoffLine("[spawn] sandbox terminated for task task-1", "task-1"), null);
+  });
+
+  it("recognizes any task of a batch", () => {
+    const handoff = parseHandoffLine('{"taskId":"task-2","status":"failed"}', ["task-1", "task-2"]);
+    assert.strictEqual(handoff?.taskId, "task-2");
+    assert.strictEqual(parseHandoffLine('{"taskId":"task-3","status":"failed"}', ["task-1", "task-2"]), null);
+  });
+});
@@ -0,0 +1,33 @@
+import { describe, it } from "node:test";
+import assert from "node:assert/strict";
+import { parseSpawnerFrame } from "../spawner-daemon.js";
+
+describe("parseSpawnerFrame", () => {
+  it("parses line frames", () => {
+    const frame = parseSpawnerFrame('{"id":"task-1:1","line":"[spawn] sandbox created for task task-1 (1.2s)"}');
+    assert.deepStrictEqual(frame, { id: "task-1:1", line: "[spawn] sandbox created for task task-1 (1.2s)" });
+  });
+
+  it("parses handoff frames", () => {
+    const frame = parseSpawnerFrame('{"id":"task-1:1","handoff":{"taskId":"task-1","status":"complete"}}');
+    assert.strictEqual(frame?.id, "task-1:1");
+    assert.strictEqual(frame?.handoff?.status, "complete");
+  });
+
+  it("parses batch handoffs frames", () => {
+    const frame = parseSpawnerFrame(
+      '{"id":"task-1:1","handoffs":[{"taskId":"task-1","status":"complete"},{"taskId":"task-2","status":"failed"}]}',
+    );
+    assert.deepStrictEqual(frame?.handoffs?.map((h) => h.taskId), ["task-1", "task-2"]);
+  });
+
+  it("parses the ready frame", () => {
+    assert.deepStrictEqual(parseSpawnerFrame('{"ready":true}'), { ready: true });
+  });
+
+  it("returns null for non-JSON output", () => {
+    assert.strictEqual(parseSpawnerFrame("Traceback (most recent call last):"), null);
+    assert.strictEqual(parseSpawnerFrame("{not json"), null);
+    assert.strictEqual(parseSpawnerFrame(""), null);
+  });
+});
@@ -1,5 +1,9 @@
 import { describe, it } from "node:test";
 import assert from "node:assert/strict";
+import { mkdtempSync, writeFileSync, rmSync } from "node:fs";
+import { tmpdir } from "node:os";
+import { join } from "node:path";
+import { gzipSync } from "node:zlib";
 import type { Task, Handoff } from "@agentswarm/core";
 import { shouldDecompose, DEFAULT_SUBPLANNER_CONFIG, aggregateHandoffs, createFailureHandoff } from "../subplanner.js";
 import type { SubplannerConfig } from "../subplanner.js";
@@ -183,6 +187,30 @@ describe("aggregateHandoffs", () => {
     assert.strictEqual(result.metrics.durationMs, 5000);
   });
 
+  it("reads spilled diffs back from diffRef", () => {
+    const dir = mkdtempSync(join(tmpdir(), "diffref-"));
+    try {
+      const path = join(dir, "big.diff.gz");
+      const big = "diff --git a/big.ts b/big.ts\n" + "+x\n".repeat(100);
+      writeFileSync(path, gzipSync(Buffer.from(big)));
+      const parent = makeTask({ id: "parent-1", description: "Parent" });
+      const subtasks = [makeTask({ id: "sub-1" }), makeTask({ id: "sub-2" })];
+      const handoffs = [
+        makeHandoff({ taskId: "sub-1", diff: "diff --git a/small.ts" }),
+        makeHandoff({
+          taskId: "sub-2",
+          diff: "",
+          diffRef: { path, sha256: "0".repeat(64), bytes: big.length, compressedBytes: 0 },
+        }),
+      ];
+
+      const result = aggregateHandoffs(parent, subtasks, handoffs);
+      assert.strictEqual(result.diff, `diff --git a/small.ts\n${big}`);
+    } finally {
+      rmSync(dir, { recursive: true, force: true });
+    }
+  });
+
   it("filesChanged deduplicates across handoffs", () => {
     const parent = makeTask({ id: "parent-1", description: "Parent" });
     const subtasks = [makeTask({ id: "sub-1" }), makeTask({ id: "sub-2" })];
@@ -0,0 +1,131 @@
+import { describe, it } from "node:test";
+import assert from "node:assert/strict";
+import type { Handoff, Task } from "@agentswarm/core";
+import { DurationPredictor, TaskBatcher, batchSizeFor, normalizeScopePath, scopesOverlap } from "../task-batcher.js";
+
+function makeTask(id: string, scope: string[], overrides?: Partial<Task>): Task {
+  return {
+    id,
+    description: "Small fix",
+    scope,
+    acceptance: "Compiles",
+    branch: `worker/${id}`,
+    status: "pending",
+    createdAt: Date.now(),
+    priority: 5,
+    ...overrides,
+  };
+}
+
+function makeHandoff(taskId: string): Handoff {
+  return {
+    taskId,
+    status: "complete",
+    summary: "done",
+    diff: "",
+    filesChanged: [],
+    concerns: [],
+    suggestions: [],
+    metrics: { linesAdded: 0, linesRemoved: 0, filesCreated: 0, filesModified: 0, tokensUsed: 0, toolCallCount: 0, durationMs: 0 },
+  };
+}
+
+/** Predictor that has seen enough 60s runs in every bucket. */
+function warmPredictor(ms = 60_000): DurationPredictor {
+  const predictor = new DurationPredictor();
+  for (const scope of [["a"], ["a", "b", "c"], Array.from({ length: 9 }, (_, i) => `f${i}`)]) {
+    for (let i = 0; i < 3; i++) predictor.record(makeTask("seed", scope), ms);
+  }
+  return predictor;
+}
+
+const config = { maxTasks: 3, targetMs: 300_000, windowMs: 10 };
+
+describe("batchSizeFor", () => {
+  it("fits as many predicted tasks as the target allows, capped by maxTasks", () => {
+    assert.strictEqual(batchSizeFor(100_000, config), 3);
+    assert.strictEqual(batchSizeFor(150_000, config), 2);
+    assert.strictEqual(batchSizeFor(400_000, config), 1);
+    assert.strictEqual(batchSizeFor(10_000, { ...config, maxTasks: 1 }), 1);
+  });
+});
+
+describe("DurationPredictor", () => {
+  it("uses the default until a bucket has enough samples", () => {
+    const predictor = new DurationPredictor(900_000);
+    const task = makeTask("t", ["a"]);
+    predictor.record(task, 60_000);
+    assert.strictEqual(predictor.predict(task), 900_000);
+    predictor.record(task, 60_000);
+    predictor.record(task, 60_000);
+    assert.strictEqual(predictor.predict(task), 60_000);
+  });
+});
+
+describe("scopesOverlap", () => {
+  it("detects shared files", () => {
+    assert.strictEqual(scopesOverlap(makeTask("a", ["x.ts", "y.ts"]), makeTask("b", ["y.ts"])), true);
+    assert.strictEqual(scopesOverlap(makeTask("a", ["x.ts"]), makeTask("b", ["y.ts"])), false);
+  });
+
+  it("compares normalized paths", () => {
+    assert.strictEqual(normalizeScopePath("./src//a.ts"), "src/a.ts");
+    assert.strictEqual(normalizeScopePath("/src/"), "src");
+    assert.strictEqual(normalizeScopePath("src/**/*.ts"), "src");
+    assert.strictEqual(scopesOverlap(makeTask("a", ["./a.ts"]), makeTask("b", ["a.ts"])), true);
+  });
+
+  it("treats a directory or glob as overlapping the paths under it", () => {
+    assert.strictEqual(scopesOverlap(makeTask("a", ["src/"]), makeTask("b", ["src/a.ts"])), true);
+    assert.strictEqual(scopesOverlap(makeTask("a", ["src/a.ts"]), makeTask("b", ["src"])), true);
+    assert.strictEqual(scopesOverlap(makeTask("a", ["src/**/*.ts"]), makeTask("b", ["src/x/y.ts"])), true);
+    assert.strictEqual(scopesOverlap(makeTask("a", ["src/"]), makeTask("b", ["src2/a.ts"])), false);
+    assert.strictEqual(scopesOverlap(makeTask("a", ["src/a.ts"]), makeTask("b", ["src/ab.ts"])), false);
+  });
+});
+
+describe("TaskBatcher", () => {
+  it("only accepts short, non-conflict tasks", () => {
+    const batcher = new TaskBatcher(config, async () => [], warmPredictor());
+    assert.strictEqual(batcher.accepts(makeTask("a", ["x.ts"])), true);
+    assert.strictEqual(batcher.accepts(makeTask("b", ["x.ts"], { conflictSourceBranch: "worker/old" })), false);
+    const cold = new TaskBatcher(config, async () => [], new DurationPredictor());
+    assert.strictEqual(cold.accepts(makeTask("c", ["x.ts"])), false);
+  });
+
+  it("runs a full batch at once and resolves each task with its own handoff", async () => {
+    const batches: string[][] = [];
+    const batcher = new TaskBatcher(config, async (tasks) => {
+      batches.push(tasks.map((t) => t.id));
+      return tasks.map((t) => makeHandoff(t.id)).reverse();
+    }, warmPredictor());
+
+    const results = await Promise.all(["a", "b", "c"].map((id) => batcher.add(makeTask(id, [`${id}.ts`]))));
+    assert.deepStrictEqual(batches, [["a", "b", "c"]]);
+    assert.deepStrictEqual(results.map((h) => h.taskId), ["a", "b", "c"]);
+  });
+
+  it("starts a new batch for overlapping scopes and flushes on the window", async () => {
+    const batches: string[][] = [];
+    const batcher = new TaskBatcher(config, async (tasks) => {
+      batches.push(tasks.map((t) => t.id));
+      return tasks.map((t) => makeHandoff(t.id));
+    }, warmPredictor());
+
+    await Promise.all([
+      batcher.add(makeTask("a", ["shared.ts"])),
+      batcher.add(makeTask("b", ["shared.ts"])),
+    ]);
+    assert.deepStrictEqual(batches, [["a"], ["b"]]);
+  });
+
+  it("rejects tasks the batch returned no handoff for", async () => {
+    const batcher = new TaskBatcher(config, async (tasks) => [makeHandoff(tasks[0].id)], warmPredictor());
+    const [first, second] = await Promise.allSettled([
+      batcher.add(makeTask("a", ["a.ts"])),
+      batcher.add(makeTask("b", ["b.ts"])),
+    ]);
+    assert.strictEqual(first.status, "fulfilled");
+    assert.strictEqual(second.status, "rejected");
+  });
+});
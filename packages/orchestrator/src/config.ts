@@ -6,9 +6,24 @@ export interface FinalizationConfig {
   sweepTimeoutMs: number;
 }
 
+export type SpawnerMode = "process" | "daemon";
+
+/** Running several short tasks in one sandbox (see task-batcher.ts). */
+export interface BatchConfig {
+  /** Most tasks per sandbox. 1 = batching off. */
+  maxTasks: number;
+  /** Predicted agent time a batch may add up to. */
+  targetMs: number;
+  /** How long an open batch waits for more tasks before it is dispatched. */
+  windowMs: number;
+}
+
 export interface OrchestratorConfig extends HarnessConfig {
   targetRepoPath: string;
   pythonPath: string;
+  /** "process" = one spawn_sandbox.py per task; "daemon" = one long-lived spawner_daemon.py. */
+  spawnerMode: SpawnerMode;
+  batch: BatchConfig;
   healthCheckInterval: number;
   /** Max ms to wait for LLM endpoints to become ready at startup. 0 = skip probe. */
   readinessTimeoutMs: number;
@@ -19,6 +34,7 @@ export interface OrchestratorConfig extends HarnessConfig {
 export type LLMConfig = OrchestratorConfig["llm"];
 
 const ALLOWED_MERGE_STRATEGIES = ["fast-forward", "rebase", "merge-commit"] as const;
+const ALLOWED_SPAWNER_MODES = ["process", "daemon"] as const;
 
 function normalizeUrl(url: string): string {
   return url.replace(/\/+$/, "").replace(/\/v1$/, "");
@@ -81,6 +97,13 @@ export function loadConfig(): OrchestratorConfig {
     );
   }
 
+  const spawnerMode = process.env.SPAWNER_MODE || "process";
+  if (!ALLOWED_SPAWNER_MODES.includes(spawnerMode as SpawnerMode)) {
+    throw new Error(
+      `Invalid spawnerMode: ${spawnerMode}. Must be one of: ${ALLOWED_SPAWNER_MODES.join(", ")}`
+    );
+  }
+
   cachedConfig = {
     maxWorkers: Number(process.env.MAX_WORKERS) || 50,
     workerTimeout: Number(process.env.WORKER_TIMEOUT) || 1800,
@@ -105,6 +128,12 @@ export function loadConfig(): OrchestratorConfig {
     },
     targetRepoPath: process.env.TARGET_REPO_PATH || "./target-repo",
     pythonPath: process.env.PYTHON_PATH || "python3",
+    spawnerMode: spawnerMode as SpawnerMode,
+    batch: {
+      maxTasks: Number(process.env.WORKER_BATCH_MAX) || 1,
+      targetMs: Number(process.env.WORKER_BATCH_TARGET_MS) || 600_000,
+      windowMs: Number(process.env.WORKER_BATCH_WINDOW_MS) || 2_000,
+    },
     healthCheckInterval: Number(process.env.HEALTH_CHECK_INTERVAL) || 10,
     readinessTimeoutMs: process.env.LLM_READINESS_TIMEOUT_MS
       ? Number(process.env.LLM_READINESS_TIMEOUT_MS)
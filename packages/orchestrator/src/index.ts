@@ -1,6 +1,8 @@
 export * from "./config.js";
 export * from "./task-queue.js";
 export * from "./worker-pool.js";
+export * from "./spawner-daemon.js";
+export * from "./task-batcher.js";
 export * from "./merge-queue.js";
 export * from "./monitor.js";
 export * from "./llm-client.js";
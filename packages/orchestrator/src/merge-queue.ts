@@ -1,4 +1,5 @@
 import { execFile } from "node:child_process";
+import { rm } from "node:fs/promises";
 import { promisify } from "node:util";
 import type { HarnessConfig, Tracer, Span } from "@agentswarm/core";
 import {
@@ -99,6 +100,10 @@ export class MergeQueue {
 
   /** Retry-before-fix: how many times a conflicting branch is re-queued before escalating. */
   private retryCount: Map<string, number>;
+  /** Branches handed off as local git bundles (HANDOFF_MODE=bundle) instead of pushed to origin, not yet fetched. */
+  private bundles: Map<string, string>;
+  /** Branches that exist only as the local refs/remotes/origin/<branch> (bundle fetched, never pushed). */
+  private localOnly: Set<string>;
   private maxConflictRetries: number;
 
   constructor(config: {
@@ -127,6 +132,8 @@ export class MergeQueue {
     this.mergeResultCallbacks = [];
     this.conflictCallbacks = [];
     this.retryCount = new Map();
+    this.bundles = new Map();
+    this.localOnly = new Set();
     this.maxConflictRetries = config.maxConflictRetries ?? 2;
   }
 
@@ -134,7 +141,15 @@ export class MergeQueue {
     this.tracer = tracer;
   }
 
-  enqueue(branch: string, priority: number = 5): void {
+  /**
+   * @param bundlePath git bundle holding the branch (see infra/handoff.py). It is
+   * fetched (and removed) on the first merge attempt; later re-enqueues of the
+   * same branch pass only the name and reuse the local tracking ref.
+   */
+  enqueue(branch: string, priority: number = 5, bundlePath?: string): void {
+    if (bundlePath) {
+      this.bundles.set(branch, bundlePath);
+    }
     if (this.merged.has(branch)) {
       logger.debug(`Branch ${branch} already merged, skipping`);
       return;
@@ -254,17 +269,28 @@ export class MergeQueue {
     try {
       await ensureCleanState(this.mainBranch, cwd);
 
-      try {
-        await execFileAsync("git", ["fetch", "origin", branch], { cwd });
-      } catch (fetchError) {
-        const fetchMsg = fetchError instanceof Error ? fetchError.message : String(fetchError);
-        logger.warn(`Failed to fetch branch ${branch} from origin, trying local`, { error: fetchMsg });
+      const bundlePath = this.bundles.get(branch);
+      if (bundlePath && await this.fetchBundle(branch, bundlePath, cwd)) {
+        // The tracking ref now holds the branch; later attempts (e.g. after a
+        // retry rebase rewrote it) must not fetch over it.
+        this.bundles.delete(branch);
+        this.localOnly.add(branch);
+        try { await rm(bundlePath, { force: true }); } catch { /* best effort */ }
+      } else if (!bundlePath && !this.localOnly.has(branch)) {
+        try {
+          await execFileAsync("git", ["fetch", "origin", branch], { cwd });
+        } catch (fetchError) {
+          const fetchMsg = fetchError instanceof Error ? fetchError.message : String(fetchError);
+          logger.warn(`Failed to fetch branch ${branch} from origin, trying local`, { error: fetchMsg });
+        }
       }
-      logger.debug("Fetch completed for branch", { branch, taskId });
+      const localOnly = this.localOnly.has(branch);
+      logger.debug("Fetch completed for branch", { branch, taskId, source: bundlePath ? "bundle" : localOnly ? "local" : "origin" });
 
       await checkoutBranch(this.mainBranch, cwd);
 
-      // After fetch, the branch exists as a remote tracking ref (origin/<branch>).
+      // After fetch, the branch exists as a remote tracking ref (origin/<branch>);
+      // bundles are fetched into the same ref so everything below is shared.
       // git merge cannot resolve bare branch names like "worker/task-049" to their
       // remote tracking counterparts — it only checks refs/heads/. We must use the
       // explicit origin/ prefix so git resolves refs/remotes/origin/<branch>.
@@ -297,11 +323,15 @@ export class MergeQueue {
             totalMerged: this.stats.totalMerged,
           });
 
-          try {
-            await execFileAsync("git", ["push", "origin", "--delete", branch], { cwd });
-            logger.debug(`Deleted remote branch ${branch}`, { branch, taskId });
-          } catch {
-            /* best effort */
+          if (localOnly) {
+            this.localOnly.delete(branch);
+          } else {
+            try {
+              await execFileAsync("git", ["push", "origin", "--delete", branch], { cwd });
+              logger.debug(`Deleted remote branch ${branch}`, { branch, taskId });
+            } catch {
+              /* best effort */
+            }
           }
         } catch (pushError) {
           const pushMsg = pushError instanceof Error ? pushError.message : String(pushError);
@@ -339,7 +369,12 @@ export class MergeQueue {
             await execFileAsync("git", ["checkout", "-b", localBranch, `origin/${branch}`], { cwd });
             const rebaseResult = await rebaseBranch(localBranch, this.mainBranch, cwd);
             if (rebaseResult.success) {
-              await execFileAsync("git", ["push", "origin", `${localBranch}:${branch}`, "--force"], { cwd });
+              if (localOnly) {
+                // The branch only exists locally: keep the rebased commits in the tracking ref.
+                await execFileAsync("git", ["update-ref", `refs/remotes/origin/${branch}`, localBranch], { cwd });
+              } else {
+                await execFileAsync("git", ["push", "origin", `${localBranch}:${branch}`, "--force"], { cwd });
+              }
               rebased = true;
               logger.info("Rebased branch onto latest main before retry", { branch, taskId });
             }
@@ -378,6 +413,17 @@ export class MergeQueue {
           retriesExhausted: retries,
         });
 
+        if (localOnly) {
+          // Conflict-fix workers start from origin/<branch>, so publish it now.
+          try {
+            await execFileAsync("git", ["push", "origin", `refs/remotes/origin/${branch}:refs/heads/${branch}`, "--force"], { cwd });
+            this.localOnly.delete(branch);
+          } catch (pushError) {
+            const pushMsg = pushError instanceof Error ? pushError.message : String(pushError);
+            logger.warn(`Failed to push bundled branch ${branch} for conflict resolution`, { branch, taskId, error: pushMsg });
+          }
+        }
+
         for (const cb of this.conflictCallbacks) {
           cb({ branch, conflictingFiles: conflicts });
         }
@@ -426,6 +472,36 @@ export class MergeQueue {
     }
   }
 
+  /**
+   * Fetch a bundled branch into refs/remotes/origin/<branch>. A bundle only
+   * carries commits past the sandbox's origin/main, so if that base is
+   * missing here, fetch main from origin and try once more. Returns whether
+   * the branch was fetched.
+   */
+  private async fetchBundle(branch: string, bundlePath: string, cwd: string): Promise<boolean> {
+    const refspec = `+refs/heads/${branch}:refs/remotes/origin/${branch}`;
+    try {
+      await execFileAsync("git", ["fetch", bundlePath, refspec], { cwd });
+      return true;
+    } catch (fetchError) {
+      const fetchMsg = fetchError instanceof Error ? fetchError.message : String(fetchError);
+      logger.warn(`Failed to fetch bundle for ${branch}, fetching ${this.mainBranch} and retrying`, {
+        branch,
+        bundlePath,
+        error: fetchMsg,
+      });
+    }
+    try {
+      await execFileAsync("git", ["fetch", "origin", this.mainBranch], { cwd });
+      await execFileAsync("git", ["fetch", bundlePath, refspec], { cwd });
+      return true;
+    } catch (retryError) {
+      const retryMsg = retryError instanceof Error ? retryError.message : String(retryError);
+      logger.warn(`Failed to fetch bundle for ${branch}, trying local`, { branch, bundlePath, error: retryMsg });
+      return false;
+    }
+  }
+
   isBranchMerged(branch: string): boolean {
     return this.merged.has(branch);
   }
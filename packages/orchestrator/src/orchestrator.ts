@@ -176,6 +176,8 @@ export async function createOrchestrator(
       llm: config.llm,
       git: config.git,
       pythonPath: config.pythonPath,
+      spawnerMode: config.spawnerMode,
+      batch: config.batch,
       gitToken: process.env.GIT_TOKEN,
     },
     workerPrompt,
@@ -8,7 +8,7 @@ import type { MergeQueue } from "./merge-queue.js";
 import type { Monitor } from "./monitor.js";
 import { Subplanner, shouldDecompose, DEFAULT_SUBPLANNER_CONFIG } from "./subplanner.js";
 import { createPlannerPiSession, cleanupPiSession, type PiSessionResult } from "./shared.js";
-import { type RepoState, type RawTaskInput, readRepoState, parsePlannerResponse, parseLLMTaskArray, ConcurrencyLimiter, slugifyForBranch } from "./shared.js";
+import { type RepoState, type RawTaskInput, readRepoState, parsePlannerResponse, parseLLMTaskArray, ConcurrencyLimiter, slugifyForBranch, handoffDiffSize } from "./shared.js";
 import { ScopeTracker } from "./scope-tracker.js";
 import type { SweepResult } from "./reconciler.js";
 
@@ -545,7 +545,13 @@ export class Planner {
     const dispatchSpan = this.rootSpan?.child("planner.dispatchTask", { taskId: task.id, agentId: "planner" });
     const promise = (async () => {
       logger.debug("Awaiting dispatch slot", { taskId: task.id, activeSlots: this.dispatchLimiter.getActive(), queuedWaiting: this.dispatchLimiter.getQueueLength() });
+      // All slots busy: let the spawner provision this task's sandbox while it waits.
+      const willDecompose = !!this.subplanner && shouldDecompose(task, DEFAULT_SUBPLANNER_CONFIG, 0);
+      if (!willDecompose && this.dispatchLimiter.getActive() >= this.config.maxWorkers) {
+        this.workerPool.awaitingSlot(task);
+      }
       await this.dispatchLimiter.acquire();
+      this.workerPool.slotAcquired(task.id);
 
       const current = this.taskQueue.getById(task.id);
       if (current && current.status !== "pending") {
@@ -668,7 +674,7 @@ export class Planner {
         if (task.conflictSourceBranch) {
           this.mergeQueue.resetRetryCount(task.branch);
         }
-        this.mergeQueue.enqueue(task.branch, task.priority);
+        this.mergeQueue.enqueue(task.branch, task.priority, handoff.bundlePath);
       } else if (
         (handoff.status === "failed" || handoff.status === "blocked") &&
         (task.retryCount ?? 0) < MAX_TASK_RETRIES
@@ -687,7 +693,7 @@ export class Planner {
         }
       }
 
-      logger.debug("Handoff details", { taskId: task.id, status: handoff.status, diffSize: handoff.diff.length, summary: handoff.summary.slice(0, 300), concerns: handoff.concerns, suggestions: handoff.suggestions });
+      logger.debug("Handoff details", { taskId: task.id, status: handoff.status, diffSize: handoffDiffSize(handoff), summary: handoff.summary.slice(0, 300), concerns: handoff.concerns, suggestions: handoff.suggestions });
       logger.info("Collected handoff", {
         taskId: task.id,
         status: handoff.status,
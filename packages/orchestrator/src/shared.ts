@@ -1,8 +1,10 @@
 import { readFile } from "node:fs/promises";
-import { mkdtempSync, writeFileSync, rmSync } from "node:fs";
+import { mkdtempSync, writeFileSync, rmSync, readFileSync } from "node:fs";
+import { gunzipSync } from "node:zlib";
 import { tmpdir } from "node:os";
 import { join } from "node:path";
 import { createLogger, getRecentCommits, getFileTree } from "@agentswarm/core";
+import type { Handoff } from "@agentswarm/core";
 import { spawn } from "node:child_process";
 import {
   AuthStorage,
@@ -161,6 +163,30 @@ export function slugifyForBranch(description: string): string {
     .replace(/-+$/, "");           // trim trailing hyphen after truncation
 }
 
+/**
+ * A handoff's diff text. Large diffs arrive spilled to a local gzip file
+ * (`diffRef`, see infra/result_transport.py) and are only read here, when
+ * the text is actually needed. Empty if the file is gone.
+ */
+export function readHandoffDiff(handoff: Handoff): string {
+  if (!handoff.diffRef) return handoff.diff;
+  try {
+    return gunzipSync(readFileSync(handoff.diffRef.path)).toString("utf-8");
+  } catch (err) {
+    logger.warn("Spilled diff unreadable", {
+      taskId: handoff.taskId,
+      path: handoff.diffRef.path,
+      error: err instanceof Error ? err.message : String(err),
+    });
+    return "";
+  }
+}
+
+/** Diff size in bytes without reading a spilled diff. */
+export function handoffDiffSize(handoff: Handoff): number {
+  return handoff.diffRef?.bytes ?? handoff.diff.length;
+}
+
 const GIT_READONLY_SUBCOMMANDS = new Set([
   "log",
   "diff",
@@ -0,0 +1,195 @@
+/**
+ * Spawner Daemon client
+ *
+ * Talks to a single long-lived `infra/spawner_daemon.py` process over
+ * NDJSON stdin/stdout framing instead of spawning one Python process per task.
+ * The daemon keeps `import modal`, the App lookup and the worker image warm.
+ *
+ *   request  → {"id": "<requestId>", "payload": {...}}
+ *   line     ← {"id": "<requestId>", "line": "..."}
+ *   handoff  ← {"id": "<requestId>", "handoff": {...}}
+ *   handoffs ← {"id": "<requestId>", "handoffs": [...]}  (batch payloads, one per task)
+ *   ready    ← {"ready": true}
+ *   prefetch → {"op": "prefetch", "payload": {...}}   (no reply)
+ */
+
+import { spawn, type ChildProcess } from "node:child_process";
+import { createInterface } from "node:readline";
+import type { Handoff } from "@agentswarm/core";
+import { createLogger } from "@agentswarm/core";
+
+const logger = createLogger("worker-pool", "root-planner");
+
+const READY_TIMEOUT_MS = 120_000;
+const STOP_GRACE_MS = 10_000;
+/** How long `line` frames are still routed after a request's handoff (sandbox teardown). */
+const TEARDOWN_TAIL_MS = 120_000;
+
+export interface SpawnerRequestHandlers {
+  onLine: (line: string) => void;
+  onHandoff: (handoff: Handoff) => void;
+  onError: (error: Error) => void;
+}
+
+export interface SpawnerFrame {
+  id?: string;
+  line?: string;
+  handoff?: Handoff;
+  handoffs?: Handoff[];
+  ready?: boolean;
+}
+
+/** Parse one stdout line from the daemon. Returns null for non-frame output. */
+export function parseSpawnerFrame(raw: string): SpawnerFrame | null {
+  if (!raw.startsWith("{")) return null;
+  try {
+    const frame = JSON.parse(raw) as SpawnerFrame;
+    return typeof frame === "object" && frame !== null ? frame : null;
+  } catch {
+    return null;
+  }
+}
+
+export class SpawnerDaemon {
+  private proc: ChildProcess | null = null;
+  private pending: Map<string, SpawnerRequestHandlers> = new Map();
+  private tails: Map<string, (line: string) => void> = new Map();
+  private readyPromise: Promise<void> | null = null;
+
+  constructor(private readonly pythonPath: string) {}
+
+  start(): Promise<void> {
+    if (this.readyPromise) return this.readyPromise;
+
+    this.readyPromise = new Promise<void>((resolve, reject) => {
+      const proc = spawn(this.pythonPath, ["-u", "infra/spawner_daemon.py"], {
+        cwd: process.cwd(),
+        env: { ...process.env, PYTHONUNBUFFERED: "1" },
+        stdio: ["pipe", "pipe", "pipe"],
+      });
+      this.proc = proc;
+
+      let ready = false;
+      const readyTimer = setTimeout(() => {
+        if (ready) return;
+        reject(new Error(`Spawner daemon not ready after ${READY_TIMEOUT_MS / 1000}s`));
+        proc.kill("SIGKILL");
+      }, READY_TIMEOUT_MS);
+
+      const rl = createInterface({ input: proc.stdout! });
+      rl.on("line", (raw: string) => {
+        const frame = parseSpawnerFrame(raw);
+        if (!frame) {
+          if (raw.trim()) logger.debug("Spawner daemon output", { line: raw.slice(0, 200) });
+          return;
+        }
+        if (frame.ready) {
+          ready = true;
+          clearTimeout(readyTimer);
+          logger.info("Spawner daemon ready", { pid: proc.pid });
+          resolve();
+          return;
+        }
+        if (!frame.id) return;
+        const handlers = this.pending.get(frame.id);
+        if (!handlers) {
+          if (frame.line !== undefined) this.tails.get(frame.id)?.(frame.line);
+          return;
+        }
+        if (frame.line !== undefined) {
+          handlers.onLine(frame.line);
+        } else if (frame.handoff !== undefined || frame.handoffs !== undefined) {
+          this.pending.delete(frame.id);
+          this.tail(frame.id, handlers.onLine);
+          for (const handoff of frame.handoffs ?? [frame.handoff!]) {
+            handlers.onHandoff(handoff);
+          }
+        }
+      });
+
+      proc.stderr!.on("data", (chunk: Buffer) => {
+        const text = chunk.toString("utf-8").trim();
+        if (text) logger.debug("Spawner daemon stderr", { stderr: text.slice(0, 500) });
+      });
+
+      proc.on("error", (err: Error) => {
+        clearTimeout(readyTimer);
+        if (!ready) reject(err);
+        this.failAll(err);
+      });
+
+      proc.on("close", (code: number | null) => {
+        clearTimeout(readyTimer);
+        const err = new Error(`Spawner daemon exited (code ${code})`);
+        if (!ready) reject(err);
+        if (this.pending.size > 0) {
+          logger.error("Spawner daemon exited with tasks in flight", { exitCode: code, inFlight: this.pending.size });
+        }
+        this.failAll(err);
+        this.proc = null;
+        this.readyPromise = null;
+      });
+    });
+
+    return this.readyPromise;
+  }
+
+  /** Submit a run_task payload (already JSON-encoded). Handlers fire as frames arrive. */
+  submit(requestId: string, payload: string, handlers: SpawnerRequestHandlers): void {
+    if (!this.proc || !this.proc.stdin || this.proc.stdin.destroyed) {
+      handlers.onError(new Error("Spawner daemon is not running"));
+      return;
+    }
+    this.pending.set(requestId, handlers);
+    this.proc.stdin.write(`{"id":${JSON.stringify(requestId)},"payload":${payload}}\n`);
+  }
+
+  /**
+   * Hint that `payload`'s task is queued behind busy slots so the daemon can
+   * provision its sandbox ahead of submit. Best effort: dropped if not running.
+   */
+  prefetch(payload: string): void {
+    if (!this.proc || !this.proc.stdin || this.proc.stdin.destroyed) return;
+    this.proc.stdin.write(`{"op":"prefetch","payload":${payload}}\n`);
+  }
+
+  /** Stop routing frames for a request (e.g. after the orchestrator-side timeout fired). */
+  forget(requestId: string): void {
+    this.pending.delete(requestId);
+    this.tails.delete(requestId);
+  }
+
+  /** Keep routing a finished request's teardown lines for a while after its handoff. */
+  private tail(requestId: string, onLine: (line: string) => void): void {
+    this.tails.set(requestId, onLine);
+    setTimeout(() => this.tails.delete(requestId), TEARDOWN_TAIL_MS).unref();
+  }
+
+  getInFlightCount(): number {
+    return this.pending.size;
+  }
+
+  async stop(): Promise<void> {
+    const proc = this.proc;
+    if (!proc) return;
+    proc.stdin?.end();
+    await new Promise<void>((resolve) => {
+      const timer = setTimeout(() => {
+        proc.kill("SIGKILL");
+        resolve();
+      }, STOP_GRACE_MS);
+      proc.once("close", () => {
+        clearTimeout(timer);
+        resolve();
+      });
+    });
+  }
+
+  private failAll(err: Error): void {
+    const handlers = Array.from(this.pending.values());
+    this.pending.clear();
+    for (const h of handlers) {
+      h.onError(err);
+    }
+  }
+}
@@ -6,7 +6,7 @@ import type { WorkerPool } from "./worker-pool.js";
 import type { MergeQueue } from "./merge-queue.js";
 import type { Monitor } from "./monitor.js";
 import { createPlannerPiSession, cleanupPiSession, type PiSessionResult } from "./shared.js";
-import { type RepoState, type RawTaskInput, readRepoState, parsePlannerResponse, parseLLMTaskArray, ConcurrencyLimiter, slugifyForBranch } from "./shared.js";
+import { type RepoState, type RawTaskInput, readRepoState, parsePlannerResponse, parseLLMTaskArray, ConcurrencyLimiter, slugifyForBranch, readHandoffDiff } from "./shared.js";
 
 const logger = createLogger("subplanner", "subplanner");
 
@@ -113,7 +113,7 @@ export function aggregateHandoffs(parentTask: Task, subtasks: Task[], handoffs:
     taskId: parentTask.id,
     status,
     summary,
-    diff: handoffs.map((h) => h.diff).filter(Boolean).join("\n"),
+    diff: handoffs.map(readHandoffDiff).filter(Boolean).join("\n"),
     filesChanged: Array.from(filesChangedSet),
     concerns: allConcerns,
     suggestions: allSuggestions,
@@ -375,7 +375,8 @@ export class Subplanner {
       for (const subtask of allSubtasks) {
         const taskObj = this.taskQueue.getById(subtask.id);
         if (taskObj?.status === "complete") {
-          this.mergeQueue.enqueue(subtask.branch, subtask.priority);
+          const handoff = allHandoffs.find((h) => h.taskId === subtask.id);
+          this.mergeQueue.enqueue(subtask.branch, subtask.priority, handoff?.bundlePath);
         }
       }
 
@@ -558,7 +559,14 @@ export class Subplanner {
       activeTasks.add(subtask.id);
 
       const promise = (async () => {
+        if (
+          !shouldDecompose(subtask, this.subplannerConfig, currentDepth + 1) &&
+          this.dispatchLimiter.getActive() >= this.config.maxWorkers
+        ) {
+          this.workerPool.awaitingSlot(subtask);
+        }
         await this.dispatchLimiter.acquire();
+        this.workerPool.slotAcquired(subtask.id);
         logger.debug("Subtask dispatch acquired slot", { subtaskId: subtask.id, limiterActive: this.dispatchLimiter.getActive(), limiterQueued: this.dispatchLimiter.getQueueLength() });
 
         try {
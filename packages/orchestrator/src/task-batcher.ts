@@ -0,0 +1,195 @@
+/**
+ * Task Batcher — several short tasks per sandbox
+ *
+ * For a task that touches a handful of lines, sandbox create, clone and the
+ * worker-runner bootstrap cost more than the edit. When batching is enabled
+ * (WORKER_BATCH_MAX > 1) WorkerPool routes every task predicted to be short
+ * through a TaskBatcher, which holds an open batch for up to `windowMs` and
+ * dispatches it as one sandbox once it is full or the window closes:
+ *
+ *   - a task is batchable when at least two tasks of its predicted duration
+ *     fit in `targetMs`, and it is not a conflict-fix task (those branch from
+ *     another branch, not the shared base)
+ *   - a task joins the open batch if its scope does not overlap any member's
+ *     and the batch's predicted total stays within `targetMs`; scope paths
+ *     are compared normalized, and a directory or glob overlaps every path
+ *     under it (same rule as check_batch in infra/batching.py)
+ *   - otherwise the open batch is dispatched and the task opens a new one
+ *
+ * Predictions come from DurationPredictor: an EWMA of completed tasks' agent
+ * time per scope-size bucket. Until a bucket has samples the default
+ * prediction applies, which is deliberately too long to batch.
+ *
+ * The spawner runs the batch back to back in one sandbox (infra/batching.py)
+ * and answers with one handoff per task; each task's promise resolves with
+ * its own handoff.
+ */
+
+import type { Task, Handoff } from "@agentswarm/core";
+import { createLogger } from "@agentswarm/core";
+import type { BatchConfig } from "./config.js";
+
+const logger = createLogger("task-batcher", "root-planner");
+
+/** Prediction for a bucket with no history: 15 minutes, i.e. never batched by default. */
+const DEFAULT_PREDICTION_MS = 900_000;
+const EWMA_ALPHA = 0.3;
+const MIN_SAMPLES = 3;
+
+export function scopeBucket(task: Task): "s" | "m" | "l" {
+  const n = task.scope.length;
+  return n <= 2 ? "s" : n <= 8 ? "m" : "l";
+}
+
+export class DurationPredictor {
+  private ewma: Map<string, { ms: number; samples: number }> = new Map();
+
+  constructor(private readonly defaultMs: number = DEFAULT_PREDICTION_MS) {}
+
+  predict(task: Task): number {
+    const entry = this.ewma.get(scopeBucket(task));
+    return entry && entry.samples >= MIN_SAMPLES ? entry.ms : this.defaultMs;
+  }
+
+  record(task: Task, durationMs: number): void {
+    if (!(durationMs > 0)) return;
+    const bucket = scopeBucket(task);
+    const entry = this.ewma.get(bucket);
+    if (!entry) {
+      this.ewma.set(bucket, { ms: durationMs, samples: 1 });
+    } else {
+      entry.ms = EWMA_ALPHA * durationMs + (1 - EWMA_ALPHA) * entry.ms;
+      entry.samples++;
+    }
+  }
+}
+
+/** How many tasks of `predictedMs` one sandbox should run back to back. */
+export function batchSizeFor(predictedMs: number, config: BatchConfig): number {
+  if (config.maxTasks <= 1 || predictedMs <= 0) return 1;
+  return Math.max(1, Math.min(config.maxTasks, Math.floor(config.targetMs / predictedMs)));
+}
+
+const GLOB = /[*?[]/;
+
+/** Repo-relative scope path without "./", slashes at either end or a glob tail ("" is the repo root). */
+export function normalizeScopePath(path: string): string {
+  let p = path.trim();
+  const glob = p.search(GLOB);
+  if (glob >= 0) {
+    // "src/**/*.ts" → "src"
+    const prefix = p.slice(0, glob);
+    p = prefix.includes("/") ? prefix.slice(0, prefix.lastIndexOf("/")) : "";
+  }
+  return p
+    .split("/")
+    .filter((part) => part !== "" && part !== ".")
+    .join("/");
+}
+
+/** Same path, or one is a directory (or the repo root) containing the other. */
+export function scopePathsOverlap(a: string, b: string): boolean {
+  const x = normalizeScopePath(a);
+  const y = normalizeScopePath(b);
+  return x === y || x === "" || y === "" || y.startsWith(`${x}/`) || x.startsWith(`${y}/`);
+}
+
+export function scopesOverlap(a: Task, b: Task): boolean {
+  const left = a.scope.filter((path) => path.trim());
+  const right = b.scope.filter((path) => path.trim());
+  return left.some((x) => right.some((y) => scopePathsOverlap(x, y)));
+}
+
+interface BatchEntry {
+  task: Task;
+  predictedMs: number;
+  resolve: (handoff: Handoff) => void;
+  reject: (error: Error) => void;
+}
+
+interface OpenBatch {
+  entries: BatchEntry[];
+  predictedMs: number;
+  timer: ReturnType<typeof setTimeout>;
+}
+
+export class TaskBatcher {
+  private open: OpenBatch | null = null;
+  private batchesDispatched = 0;
+
+  constructor(
+    private readonly config: BatchConfig,
+    private readonly run: (tasks: Task[]) => Promise<Handoff[]>,
+    readonly predictor: DurationPredictor = new DurationPredictor(),
+  ) {}
+
+  accepts(task: Task): boolean {
+    return !task.conflictSourceBranch && batchSizeFor(this.predictor.predict(task), this.config) > 1;
+  }
+
+  /** Queue `task` for the open batch; resolves with its own handoff. */
+  add(task: Task): Promise<Handoff> {
+    return new Promise<Handoff>((resolve, reject) => {
+      const entry: BatchEntry = { task, predictedMs: this.predictor.predict(task), resolve, reject };
+      if (this.open && !this.fits(this.open, entry)) {
+        this.flush();
+      }
+      if (!this.open) {
+        this.open = {
+          entries: [],
+          predictedMs: 0,
+          timer: setTimeout(() => this.flush(), this.config.windowMs),
+        };
+      }
+      this.open.entries.push(entry);
+      this.open.predictedMs += entry.predictedMs;
+      if (this.open.entries.length >= this.config.maxTasks) {
+        this.flush();
+      }
+    });
+  }
+
+  /** Dispatch the open batch now (window closed, batch full, or shutdown). */
+  flush(): void {
+    const batch = this.open;
+    if (!batch) return;
+    this.open = null;
+    clearTimeout(batch.timer);
+
+    const tasks = batch.entries.map((e) => e.task);
+    this.batchesDispatched++;
+    logger.info("Dispatching task batch", {
+      taskIds: tasks.map((t) => t.id),
+      size: tasks.length,
+      predictedMs: Math.round(batch.predictedMs),
+    });
+
+    this.run(tasks).then(
+      (handoffs) => {
+        const byId = new Map(handoffs.map((h) => [h.taskId, h]));
+        for (const entry of batch.entries) {
+          const handoff = byId.get(entry.task.id);
+          if (handoff) {
+            entry.resolve(handoff);
+          } else {
+            entry.reject(new Error(`Batch returned no handoff for task ${entry.task.id}`));
+          }
+        }
+      },
+      (error: unknown) => {
+        const err = error instanceof Error ? error : new Error(String(error));
+        for (const entry of batch.entries) entry.reject(err);
+      },
+    );
+  }
+
+  getBatchesDispatched(): number {
+    return this.batchesDispatched;
+  }
+
+  private fits(batch: OpenBatch, entry: BatchEntry): boolean {
+    if (batch.entries.length >= this.config.maxTasks) return false;
+    if (batch.predictedMs + entry.predictedMs > this.config.targetMs) return false;
+    return !batch.entries.some((e) => scopesOverlap(e.task, entry.task));
+  }
+}
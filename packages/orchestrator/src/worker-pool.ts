@@ -4,21 +4,126 @@
  * Each task gets its own short-lived Modal sandbox:
  *   create → write task.json → exec worker-runner.js → read result.json → terminate
  *
- * There is no persistent pool. `start()` and `stop()` are no-ops.
- * `assignTask()` spawns a Python subprocess that handles the full sandbox lifecycle.
+ * There is no persistent sandbox pool. In "process" spawner mode `assignTask()`
+ * spawns a Python subprocess that handles the full sandbox lifecycle; in
+ * "daemon" mode `start()` launches one long-lived spawner_daemon.py and every
+ * task is submitted to it over NDJSON framing.
  *
  * stdout from spawn_sandbox.py is streamed line-by-line so that intermediate
  * worker logs (tool calls, progress, etc.) are re-emitted as NDJSON "Worker progress"
- * events in real-time — visible in the dashboard while agents are running.
+ * events in real-time — visible in the dashboard while agents are running. The
+ * spawner coalesces worker output into `{"type":"progress"}` summaries (full
+ * output stays in logs/workers/<taskId>.log).
+ *
+ * Handoff lines stay small: a large diff is spilled to a local gzip file by
+ * the spawner and referenced as `diffRef` (infra/result_transport.py), and
+ * only the last stdout line is kept for the exit fallback.
+ *
+ * The handoff is printed before the sandbox is terminated, so a task resolves
+ * (and frees its dispatch slot) on the handoff line; teardown finishes in the
+ * background and is reported as a "Sandbox teardown" event.
+ *
+ * With batching enabled, short tasks go through a TaskBatcher and share one
+ * sandbox (see task-batcher.ts); the spawner answers with one handoff per task.
  */
 
 import { spawn } from "node:child_process";
 import { createInterface } from "node:readline";
 import type { Task, Handoff, HarnessConfig, Tracer, Span } from "@agentswarm/core";
 import { createLogger } from "@agentswarm/core";
+import type { BatchConfig, SpawnerMode } from "./config.js";
+import { SpawnerDaemon } from "./spawner-daemon.js";
+import { TaskBatcher } from "./task-batcher.js";
 
 const logger = createLogger("worker-pool", "root-planner");
 
+/** Per-phase timing emitted by spawn_sandbox.py as `{"type":"phase",...}` lines. */
+export interface SandboxPhaseEvent {
+  type: "phase";
+  taskId: string;
+  phase: string;
+  durationMs: number;
+  atMs: number;
+  ok: boolean;
+  bytes?: number;
+  [attr: string]: string | number | boolean | undefined;
+}
+
+/** Coalesced worker output emitted by spawn_sandbox.py as `{"type":"progress",...}` lines. */
+export interface WorkerProgressEvent {
+  type: "progress";
+  taskId: string;
+  phase: string;
+  toolCalls: number;
+  detail: string;
+  lines: number;
+  suppressed: number;
+}
+
+export type SandboxEvent = SandboxPhaseEvent | WorkerProgressEvent;
+
+/** Parse a sandbox stdout line as a structured event. Returns null for anything else (incl. the handoff). */
+export function parseSandboxEvent(line: string): SandboxEvent | null {
+  if (!line.startsWith("{")) return null;
+  try {
+    const event = JSON.parse(line) as Partial<SandboxEvent> | null;
+    if (!event || typeof event.phase !== "string") return null;
+    if (event.type !== "phase" && event.type !== "progress") return null;
+    return event as SandboxEvent;
+  } catch {
+    return null;
+  }
+}
+
+/** The final handoff line for `taskId` (or any of a batch's task ids): a JSON object that is not a sandbox event. */
+export function parseHandoffLine(line: string, taskId: string | string[]): Handoff | null {
+  if (!line.startsWith("{")) return null;
+  try {
+    const handoff = JSON.parse(line) as (Partial<Handoff> & { type?: unknown }) | null;
+    if (!handoff || handoff.type !== undefined) return null;
+    const ids = Array.isArray(taskId) ? taskId : [taskId];
+    if (!ids.includes(handoff.taskId as string) || typeof handoff.status !== "string") return null;
+    return handoff as Handoff;
+  } catch {
+    return null;
+  }
+}
+
+/**
+ * Tasks waiting for a dispatch slot, in arrival order (the dispatch limiter
+ * is FIFO). Keeps prefetch requests on the first `depth` of them: a task is
+ * requested when it enters that window, and the whole window is requested
+ * again whenever a waiting task leaves it, since the spawner may have refused
+ * some while its prefetch depth was full. The spawner ignores duplicates.
+ */
+export class PrefetchLookahead {
+  private waiting: Task[] = [];
+
+  constructor(
+    private readonly depth: number,
+    private readonly send: (task: Task) => void,
+  ) {}
+
+  /** `task` is now waiting for a slot. */
+  enqueue(task: Task): void {
+    if (this.depth <= 0) return;
+    this.waiting.push(task);
+    if (this.waiting.length <= this.depth) this.send(task);
+  }
+
+  /** `taskId` got its slot (or stopped waiting); the next tasks in line move into the window. */
+  dequeue(taskId: string): void {
+    const index = this.waiting.findIndex((t) => t.id === taskId);
+    if (index < 0) return;
+    this.waiting.splice(index, 1);
+    for (const task of this.waiting.slice(0, this.depth)) this.send(task);
+  }
+
+  get size(): number {
+    return this.waiting.length;
+  }
+}
+
 export interface Worker {
   id: string;
   currentTask: Task;
@@ -34,8 +139,13 @@ export class WorkerPool {
     llm: HarnessConfig["llm"];
     git: HarnessConfig["git"];
     pythonPath: string;
+    spawnerMode?: SpawnerMode;
+    batch?: BatchConfig;
     gitToken?: string;
   };
+  private daemon: SpawnerDaemon | null = null;
+  private batcher: TaskBatcher | null = null;
+  private lookahead: PrefetchLookahead | null = null;
   private tracer: Tracer | null = null;
   private taskCompleteCallbacks: ((handoff: Handoff) => void)[];
   private workerFailedCallbacks: ((taskId: string, error: Error) => void)[];
@@ -49,6 +159,8 @@ export class WorkerPool {
       llm: HarnessConfig["llm"];
       git: HarnessConfig["git"];
       pythonPath: string;
+      spawnerMode?: SpawnerMode;
+      batch?: BatchConfig;
       gitToken?: string;
     },
     workerPrompt: string,
@@ -59,6 +171,9 @@ export class WorkerPool {
     this.taskCompleteCallbacks = [];
     this.workerFailedCallbacks = [];
     this.activeToolCalls = new Map();
+    if (config.batch && config.batch.maxTasks > 1) {
+      this.batcher = new TaskBatcher(config.batch, (tasks) => this.runBatch(tasks));
+    }
   }
 
   setTracer(tracer: Tracer): void {
@@ -66,19 +181,68 @@ export class WorkerPool {
   }
 
   /**
-   * No-op — ephemeral model has no persistent sandboxes to start.
+   * Ephemeral model has no persistent sandboxes to start. In daemon spawner
+   * mode this launches the spawner daemon and waits for it to report ready.
    */
   async start(): Promise<void> {
-    logger.info("Worker pool ready (ephemeral mode)", { maxWorkers: this.config.maxWorkers });
+    if (this.config.spawnerMode === "daemon" && !this.daemon) {
+      this.daemon = new SpawnerDaemon(this.config.pythonPath);
+      await this.daemon.start();
+      // The daemon inherits this environment and bounds its prefetches by the same depth.
+      this.lookahead = new PrefetchLookahead(
+        Number(process.env.SANDBOX_PREFETCH_DEPTH) || 0,
+        (task) => this.prefetch(task),
+      );
+    }
+    logger.info("Worker pool ready (ephemeral mode)", {
+      maxWorkers: this.config.maxWorkers,
+      spawnerMode: this.config.spawnerMode ?? "process",
+    });
   }
 
   /**
-   * No-op — ephemeral sandboxes self-terminate after each task.
+   * Ephemeral sandboxes self-terminate after each task; only the spawner
+   * daemon (if any) needs shutting down.
    */
   async stop(): Promise<void> {
+    this.batcher?.flush();
+    if (this.daemon) {
+      await this.daemon.stop();
+      this.daemon = null;
+      this.lookahead = null;
+    }
     logger.info("Worker pool stopped", { activeCount: this.activeWorkers.size });
   }
 
+  /**
+   * `task` is about to wait for a dispatch slot. The spawner daemon
+   * provisions sandboxes for the first SANDBOX_PREFETCH_DEPTH waiting tasks
+   * (see PrefetchLookahead). No-op in "process" spawner mode.
+   */
+  awaitingSlot(task: Task): void {
+    this.lookahead?.enqueue(task);
+  }
+
+  /** `taskId` got its dispatch slot or was dropped; moves the prefetch window along. */
+  slotAcquired(taskId: string): void {
+    this.lookahead?.dequeue(taskId);
+  }
+
+  /**
+   * Ask the spawner daemon to provision a sandbox for a task that is still
+   * waiting for a dispatch slot. Only the task and repo are sent — the full
+   * payload follows on assignTask. No-op in "process" spawner mode.
+   */
+  prefetch(task: Task): void {
+    if (!this.daemon) return;
+    this.daemon.prefetch(JSON.stringify({
+      task,
+      repoUrl: this.config.git.repoUrl,
+      gitToken: this.config.gitToken || process.env.GIT_TOKEN || "",
+    }));
+    logger.debug("Sandbox prefetch requested", { taskId: task.id });
+  }
+
   async assignTask(task: Task, parentSpan?: Span): Promise<Handoff> {
     const worker: Worker = {
       id: `ephemeral-${task.id}`,
@@ -94,29 +258,20 @@ export class WorkerPool {
 
     const traceCtx = workerSpan && this.tracer ? this.tracer.propagationContext(workerSpan) : undefined;
 
-    const endpoint = this.config.llm.endpoints[0];
-    const baseUrl = endpoint.endpoint.replace(/\/+$/, "");
-    const llmEndpointUrl = baseUrl.endsWith("/v1") ? baseUrl : `${baseUrl}/v1`;
-
-    const payload = JSON.stringify({
-      task,
-      systemPrompt: this.workerPrompt,
-      repoUrl: this.config.git.repoUrl,
-      gitToken: this.config.gitToken || process.env.GIT_TOKEN || "",
-      llmConfig: {
-        endpoint: llmEndpointUrl,
-        model: this.config.llm.model,
-        maxTokens: this.config.llm.maxTokens,
-        temperature: this.config.llm.temperature,
-        apiKey: endpoint.apiKey,
-      },
-      trace: traceCtx,
-    });
-
-    logger.debug("Sandbox payload prepared", { taskId: task.id, endpointName: endpoint.name, model: this.config.llm.model, payloadSize: payload.length, hasTraceCtx: !!traceCtx });
-
     try {
-      const handoff = await this.runSandboxStreaming(task.id, task.branch, payload, workerSpan);
+      let handoff: Handoff;
+      if (this.batcher?.accepts(task)) {
+        logger.debug("Task queued for a batch", { taskId: task.id, predictedMs: Math.round(this.batcher.predictor.predict(task)) });
+        handoff = await this.batcher.add(task);
+      } else {
+        const payload = this.buildPayload([task], traceCtx);
+        [handoff] = this.daemon
+          ? await this.runSandboxViaDaemon([task], payload, workerSpan)
+          : await this.runSandboxStreaming([task], payload, workerSpan);
+      }
+      if (handoff.status === "complete") {
+        this.batcher?.predictor.record(task, handoff.metrics.durationMs);
+      }
 
       for (const cb of this.taskCompleteCallbacks) {
         cb(handoff);
@@ -128,11 +283,16 @@ export class WorkerPool {
         tokensUsed: handoff.metrics.tokensUsed,
         toolCallCount: handoff.metrics.toolCallCount,
         durationMs: handoff.metrics.durationMs,
+        ...(handoff.failureKind ? { failureKind: handoff.failureKind } : {}),
       });
       workerSpan?.setStatus("ok");
       workerSpan?.end();
 
-      logger.info("Task completed", { taskId: task.id, status: handoff.status });
+      if (handoff.failureKind === "stalled") {
+        logger.warn("Task stalled", { taskId: task.id, summary: handoff.summary });
+      } else {
+        logger.info("Task completed", { taskId: task.id, status: handoff.status });
+      }
 
       return handoff;
     } catch (error) {
@@ -153,32 +313,84 @@ export class WorkerPool {
     }
   }
 
-  private runSandboxStreaming(taskId: string, branchName: string, payload: string, workerSpan?: Span): Promise<Handoff> {
-    return new Promise<Handoff>((resolve, reject) => {
+  /** run_task payload for `tasks`: one task, or a batch sharing one sandbox (infra/batching.py). */
+  private buildPayload(tasks: Task[], traceCtx?: ReturnType<Tracer["propagationContext"]>): string {
+    const endpoint = this.config.llm.endpoints[0];
+    const baseUrl = endpoint.endpoint.replace(/\/+$/, "");
+    const llmEndpointUrl = baseUrl.endsWith("/v1") ? baseUrl : `${baseUrl}/v1`;
+
+    const payload = JSON.stringify({
+      task: tasks[0],
+      ...(tasks.length > 1 ? { batch: tasks } : {}),
+      systemPrompt: this.workerPrompt,
+      repoUrl: this.config.git.repoUrl,
+      gitToken: this.config.gitToken || process.env.GIT_TOKEN || "",
+      llmConfig: {
+        endpoint: llmEndpointUrl,
+        model: this.config.llm.model,
+        maxTokens: this.config.llm.maxTokens,
+        temperature: this.config.llm.temperature,
+        apiKey: endpoint.apiKey,
+      },
+      trace: traceCtx,
+    });
+
+    logger.debug("Sandbox payload prepared", { taskId: tasks[0].id, batchSize: tasks.length, endpointName: endpoint.name, model: this.config.llm.model, payloadSize: payload.length, hasTraceCtx: !!traceCtx });
+    return payload;
+  }
+
+  /** TaskBatcher's runner: one sandbox for all of `tasks`, one handoff each. */
+  private runBatch(tasks: Task[]): Promise<Handoff[]> {
+    const payload = this.buildPayload(tasks);
+    return this.daemon
+      ? this.runSandboxViaDaemon(tasks, payload)
+      : this.runSandboxStreaming(tasks, payload);
+  }
+
+  /**
+   * Run `payload` in a spawn_sandbox.py process. Resolves once every task in
+   * `tasks` has its handoff line (one task, or a batch); progress lines are
+   * reported under the first task's id.
+   */
+  private runSandboxStreaming(tasks: Task[], payload: string, workerSpan?: Span): Promise<Handoff[]> {
+    const taskId = tasks[0].id;
+    const taskIds = tasks.map((t) => t.id);
+    return new Promise<Handoff[]>((resolve, reject) => {
+      // Payload goes over stdin: a full prompt + task spec can exceed ARG_MAX as argv.
       const proc = spawn(
         this.config.pythonPath,
-        ["-u", "infra/spawn_sandbox.py", payload],
+        ["-u", "infra/spawn_sandbox.py"],
         {
           cwd: process.cwd(),
           env: { ...process.env, PYTHONUNBUFFERED: "1" },
-          stdio: ["ignore", "pipe", "pipe"],
+          stdio: ["pipe", "pipe", "pipe"],
         },
       );
+      proc.stdin!.on("error", (err: Error) => {
+        logger.warn("Failed to write sandbox payload to stdin", { taskId, error: err.message });
+      });
+      proc.stdin!.end(payload);
 
       logger.debug("Sandbox process spawned", { taskId, pythonPath: this.config.pythonPath, timeoutSec: this.config.workerTimeout });
 
-      const stdoutLines: string[] = [];
+      // Only the last line is kept (the handoff fallback below); handoff lines
+      // stay small because large diffs travel by reference (diffRef).
+      let lastLine: string | null = null;
+      let stdoutLineCount = 0;
       const stderrChunks: string[] = [];
+      const handoffs = new Map<string, Handoff>();
       let settled = false;
+      let handoffAt: number | null = null;
 
       const timer = setTimeout(() => {
         if (settled) return;
         settled = true;
         proc.kill("SIGKILL");
-        this.timedOutBranches.push(branchName);
+        this.timedOutBranches.push(...tasks.map((t) => t.branch));
         logger.error("Worker timed out", {
           taskId,
-          branch: branchName,
+          branch: tasks[0].branch,
+          ...(tasks.length > 1 ? { batch: taskIds } : {}),
           timeoutSec: this.config.workerTimeout,
         });
         reject(
@@ -191,20 +403,19 @@ export class WorkerPool {
       const rl = createInterface({ input: proc.stdout! });
 
       rl.on("line", (line: string) => {
-        stdoutLines.push(line);
-        this.forwardWorkerLine(taskId, line);
-
-        if (workerSpan) {
-          const lower = line.toLowerCase();
-          if (lower.includes("sandbox created")) {
-            workerSpan.event("sandbox.created");
-          } else if (lower.includes("repo cloned")) {
-            workerSpan.event("sandbox.cloned");
-          } else if (lower.includes("starting worker agent")) {
-            workerSpan.event("sandbox.workerStarted");
-          } else if (lower.includes("pushed branch")) {
-            workerSpan.event("sandbox.pushed");
-          }
+        lastLine = line;
+        stdoutLineCount++;
+        // After the handoff the span has ended; teardown lines are only logged.
+        this.handleSandboxLine(taskId, line, settled ? undefined : workerSpan);
+        if (settled) return;
+        const handoff = parseHandoffLine(line, taskIds);
+        if (handoff) {
+          handoffs.set(handoff.taskId, handoff);
+          if (handoffs.size < taskIds.length) return;
+          clearTimeout(timer);
+          settled = true;
+          handoffAt = Date.now();
+          resolve(taskIds.map((id) => handoffs.get(id)!));
         }
       });
 
@@ -214,12 +425,15 @@ export class WorkerPool {
 
       proc.on("close", (_code: number | null) => {
         clearTimeout(timer);
+        if (handoffAt !== null) {
+          logger.debug("Sandbox process exited after handoff", { taskId, afterHandoffMs: Date.now() - handoffAt, exitCode: _code });
+        }
         if (settled) return;
         settled = true;
 
         const stderr = stderrChunks.join("");
 
-        logger.debug("Sandbox process exited", { taskId, exitCode: _code, stdoutLines: stdoutLines.length, stderrSize: stderr.length });
+        logger.debug("Sandbox process exited", { taskId, exitCode: _code, stdoutLines: stdoutLineCount, stderrSize: stderr.length });
 
         if (stderr) {
           const hasErrors = /error|exception|traceback|fatal|panic/i.test(stderr);
@@ -236,14 +450,17 @@ export class WorkerPool {
           }
         }
 
-        if (stdoutLines.length === 0) {
+        if (lastLine === null) {
           reject(new Error(`Sandbox produced no output for task ${taskId}`));
           return;
         }
+        if (taskIds.length > 1) {
+          reject(new Error(`Sandbox exited with ${handoffs.size}/${taskIds.length} batch handoffs (batch led by ${taskId})`));
+          return;
+        }
 
-        const lastLine = stdoutLines[stdoutLines.length - 1];
         try {
-          resolve(JSON.parse(lastLine) as Handoff);
+          resolve([JSON.parse(lastLine) as Handoff]);
         } catch {
           reject(
             new Error(
@@ -262,6 +479,96 @@ export class WorkerPool {
     });
   }
 
+  /**
+   * Daemon-mode equivalent of runSandboxStreaming: the same line handling and
+   * timeout, but lines and the handoff arrive as frames from the shared daemon.
+   * On timeout the daemon keeps driving the sandbox to its own exec timeout;
+   * its frames are simply dropped.
+   */
+  private runSandboxViaDaemon(tasks: Task[], payload: string, workerSpan?: Span): Promise<Handoff[]> {
+    const daemon = this.daemon!;
+    const taskId = tasks[0].id;
+    const taskIds = tasks.map((t) => t.id);
+    const requestId = `${taskId}:${Date.now()}`;
+
+    return new Promise<Handoff[]>((resolve, reject) => {
+      const handoffs = new Map<string, Handoff>();
+      let settled = false;
+
+      const timer = setTimeout(() => {
+        if (settled) return;
+        settled = true;
+        daemon.forget(requestId);
+        this.timedOutBranches.push(...tasks.map((t) => t.branch));
+        logger.error("Worker timed out", {
+          taskId,
+          branch: tasks[0].branch,
+          ...(tasks.length > 1 ? { batch: taskIds } : {}),
+          timeoutSec: this.config.workerTimeout,
+        });
+        reject(
+          new Error(
+            `Sandbox timed out after ${this.config.workerTimeout}s for task ${taskId}`,
+          ),
+        );
+      }, this.config.workerTimeout * 1000);
+
+      logger.debug("Sandbox request submitted to daemon", { taskId, requestId, inFlight: daemon.getInFlightCount() });
+
+      daemon.submit(requestId, payload, {
+        // Lines keep arriving after the handoff while the daemon tears the sandbox down.
+        onLine: (line) => this.handleSandboxLine(taskId, line, settled ? undefined : workerSpan),
+        onHandoff: (handoff) => {
+          if (settled) return;
+          handoffs.set(handoff.taskId, handoff);
+          if (handoffs.size < taskIds.length) return;
+          clearTimeout(timer);
+          settled = true;
+          resolve(taskIds.map((id) => handoffs.get(id)!));
+        },
+        onError: (err) => {
+          clearTimeout(timer);
+          if (settled) return;
+          settled = true;
+          reject(err);
+        },
+      });
+    });
+  }
+
+  private handleSandboxLine(taskId: string, line: string, workerSpan?: Span): void {
+    const event = parseSandboxEvent(line);
+    if (!event) {
+      this.forwardWorkerLine(taskId, line);
+      return;
+    }
+
+    if (event.type === "progress") {
+      this.activeToolCalls.set(taskId, event.toolCalls);
+      logger.info("Worker progress", {
+        taskId,
+        phase: "execution",
+        workerPhase: event.phase,
+        toolCalls: event.toolCalls,
+        detail: event.detail,
+        lines: event.lines,
+        ...(event.suppressed > 0 ? { suppressed: event.suppressed } : {}),
+      });
+      return;
+    }
+
+    const attrs: Record<string, string | number | boolean> = {};
+    for (const [key, value] of Object.entries(event)) {
+      if (value !== undefined && key !== "type" && key !== "taskId" && key !== "phase") attrs[key] = value;
+    }
+    workerSpan?.event(`sandbox.${event.phase}`, attrs);
+    logger.info("Sandbox phase", { taskId, phase: event.phase, ...attrs });
+    if (event.phase === "terminate") {
+      // Runs after the handoff resolved the task; its own metric for the dashboard.
+      logger.info("Sandbox teardown", { taskId, teardownMs: event.durationMs, ok: event.ok, recycled: event.recycled });
+    }
+  }
+
   private forwardWorkerLine(taskId: string, line: string): void {
     if (line.startsWith("{")) {
       logger.debug("Worker JSON output", { taskId, line: line.slice(0, 300) });
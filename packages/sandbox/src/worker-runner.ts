@@ -1,5 +1,6 @@
 import { execSync } from "node:child_process";
-import { readFileSync, writeFileSync, existsSync, appendFileSync } from "node:fs";
+import { readFileSync, writeFileSync, existsSync, appendFileSync, mkdirSync } from "node:fs";
+import { gzipSync } from "node:zlib";
 import type { Task, Handoff } from "@agentswarm/core";
 import {
   enableTracing,
@@ -19,9 +20,17 @@ import {
   SettingsManager,
 } from "@mariozechner/pi-coding-agent";
 
-const TASK_PATH = "/workspace/task.json";
-const RESULT_PATH = "/workspace/result.json";
-const WORK_DIR = "/workspace/repo";
+/** Sandbox workspace root; the local sandbox backend points this at a per-task directory. */
+const WORKSPACE_DIR = process.env.WORKSPACE_DIR || "/workspace";
+const TASK_PATH = `${WORKSPACE_DIR}/task.json`;
+const RESULT_PATH = `${WORKSPACE_DIR}/result.json`;
+/** Batch payloads write one result per task here (see infra/batching.py). */
+const RESULTS_DIR = `${WORKSPACE_DIR}/results`;
+const WORK_DIR = `${WORKSPACE_DIR}/repo`;
+/** Diffs above this go to `<result>.diff.gz` instead of inline (see infra/result_transport.py). */
+const DIFF_INLINE_MAX = 64 * 1024;
+/** Content-addressed payload blobs (see infra/blob_store.py). */
+const BLOB_DIR = `${process.env.SANDBOX_CACHE_DIR || "/cache"}/blobs`;
 
 const ARTIFACT_PATTERNS = [
   /^node_modules\//,
@@ -60,7 +69,7 @@ function isArtifact(filePath: string): boolean {
  * so writing our worker instructions here keeps them separate from any
  * AGENTS.md that already exists in the target repo (both get loaded).
  */
-const WORKER_AGENTS_MD_PATH = "/workspace/AGENTS.md";
+const WORKER_AGENTS_MD_PATH = `${WORKSPACE_DIR}/AGENTS.md`;
 
 /**
  * All 7 built-in Pi tools — gives workers full filesystem and search
@@ -75,6 +84,8 @@ const fullPiTools = [...codingTools, grepTool, findTool, lsTool];
 
 interface TaskPayload {
   task: Task;
+  /** Tasks run back to back in this sandbox, `task` first (infra/batching.py). */
+  batch?: Task[];
   systemPrompt: string;
   llmConfig: {
     endpoint: string;
@@ -84,6 +95,8 @@ interface TaskPayload {
     apiKey?: string;
   };
   repoUrl?: string;
+  /** Payload fields shipped by content hash instead of inline: field → sha256. */
+  blobRefs?: Record<string, string>;
   /** Trace propagation context from the orchestrator. */
   trace?: {
     traceId: string;
@@ -95,6 +108,14 @@ function log(msg: string): void {
   process.stderr.write(`[worker] ${msg}\n`);
 }
 
+/** "<tool> <first line of its command/path>", read defensively from a tool_execution_* event. */
+function describeToolCall(event: object): string {
+  const name = "toolName" in event && typeof event.toolName === "string" ? event.toolName : "tool";
+  const args = "args" in event && event.args && typeof event.args === "object" ? (event.args as Record<string, unknown>) : {};
+  const target = [args.command, args.path, args.file_path].find((v): v is string => typeof v === "string");
+  return target ? `${name} ${target.split("\n")[0].slice(0, 120)}` : name;
+}
+
 function safeExec(cmd: string, cwd: string): string {
   try {
     return execSync(cmd, { cwd, encoding: "utf-8", timeout: 30_000 }).trim();
@@ -103,12 +124,40 @@ function safeExec(cmd: string, cwd: string): string {
   }
 }
 
-function writeResult(handoff: Handoff): void {
-  writeFileSync(RESULT_PATH, JSON.stringify(handoff, null, 2), "utf-8");
-  log(`Result written to ${RESULT_PATH}`);
+function writeResult(handoff: Handoff, path: string = RESULT_PATH): void {
+  if (handoff.diff.length > DIFF_INLINE_MAX) {
+    const diffFile = `${path}.diff.gz`;
+    const diff = Buffer.from(handoff.diff, "utf-8");
+    writeFileSync(diffFile, gzipSync(diff));
+    handoff = { ...handoff, diff: "", diffFile, diffBytes: diff.length } as Handoff;
+    log(`Diff (${diff.length} bytes) written to ${diffFile}`);
+  }
+  writeFileSync(path, JSON.stringify(handoff), "utf-8");
+  log(`Result written to ${path}`);
+}
+
+function failedHandoff(taskId: string, summary: string, concern: string, suggestion: string): Handoff {
+  return {
+    taskId,
+    status: "failed",
+    summary,
+    diff: "",
+    filesChanged: [],
+    concerns: [concern],
+    suggestions: [suggestion],
+    metrics: {
+      linesAdded: 0,
+      linesRemoved: 0,
+      filesCreated: 0,
+      filesModified: 0,
+      tokensUsed: 0,
+      toolCallCount: 0,
+      durationMs: 0,
+    },
+  };
 }
 
-export function buildTaskPrompt(task: Task): string {
+export function buildTaskPrompt(task: Task, sparse = false): string {
   const parts: string[] = [
     `## Task: ${task.id}`,
     `**Description:** ${task.description}`,
@@ -119,19 +168,41 @@ export function buildTaskPrompt(task: Task): string {
     "Complete this task. Commit your changes when done. Stay focused on the scoped files.",
   ];
 
+  if (sparse) {
+    parts.push(
+      "",
+      "This is a sparse checkout: only root files, package manifests, tsconfigs and the scoped " +
+        "directories are present. Run `git sparse-checkout add <dir>` to bring in another directory.",
+    );
+  }
+
   return parts.join("\n");
 }
 
+function resolveBlobRefs(payload: TaskPayload): TaskPayload {
+  if (!payload.blobRefs) return payload;
+  const resolved: Record<string, unknown> = { ...payload };
+  for (const [field, hash] of Object.entries(payload.blobRefs)) {
+    resolved[field] = readFileSync(`${BLOB_DIR}/${hash}`, "utf-8");
+  }
+  log(`Resolved ${Object.keys(payload.blobRefs).length} payload blob(s) from ${BLOB_DIR}`);
+  return resolved as unknown as TaskPayload;
+}
+
 export async function runWorker(): Promise<void> {
   const startTime = Date.now();
 
   log("Reading task payload...");
   const raw = readFileSync(TASK_PATH, "utf-8");
-  const payload: TaskPayload = JSON.parse(raw);
+  const payload: TaskPayload = resolveBlobRefs(JSON.parse(raw));
   const { task, systemPrompt, llmConfig } = payload;
+  const tasks = payload.batch && payload.batch.length > 1 ? payload.batch : [task];
   log(`Task: ${task.id} — ${task.description.slice(0, 80)}`);
+  if (tasks.length > 1) {
+    log(`Batch of ${tasks.length} tasks: ${tasks.map((t) => t.id).join(", ")}`);
+  }
 
-  enableTracing("/workspace");
+  enableTracing(WORKSPACE_DIR);
   let workerSpan: Span | undefined;
   if (payload.trace) {
     const tracer = Tracer.fromPropagated(payload.trace);
@@ -147,7 +218,7 @@ export async function runWorker(): Promise<void> {
   // any AGENTS.md in the target repo itself get loaded and concatenated.
   if (systemPrompt) {
     writeFileSync(WORKER_AGENTS_MD_PATH, systemPrompt, "utf-8");
-    log("Worker instructions written to /workspace/AGENTS.md");
+    log(`Worker instructions written to ${WORKER_AGENTS_MD_PATH}`);
   }
 
   const authStorage = new AuthStorage();
@@ -177,7 +248,69 @@ export async function runWorker(): Promise<void> {
   }
   log(`Model registered: ${llmConfig.model} via ${llmConfig.endpoint}`);
 
-  const startSha = safeExec("git rev-parse HEAD", WORK_DIR);
+  const baseSha = safeExec("git rev-parse HEAD", WORK_DIR);
+  // SANDBOX_CLONE_MODE=sparse: only the task's scope is checked out (infra/sparse_checkout.py).
+  const sparse = safeExec("git config --get core.sparseCheckout", WORK_DIR) === "true";
+  const ctx: AgentContext = { model, authStorage, modelRegistry, sparse, workerSpan };
+
+  if (tasks.length === 1) {
+    const handoff = await runAgentTask(task, baseSha, ctx);
+    handoff.metrics.durationMs = Date.now() - startTime;
+    workerSpan?.setAttributes({
+      toolCallCount: handoff.metrics.toolCallCount,
+      tokensUsed: handoff.metrics.tokensUsed,
+      filesChanged: handoff.filesChanged.length,
+      linesAdded: handoff.metrics.linesAdded,
+      linesRemoved: handoff.metrics.linesRemoved,
+      durationMs: handoff.metrics.durationMs,
+    });
+    workerSpan?.setStatus("ok");
+    workerSpan?.end();
+    closeTracing();
+
+    writeResult(handoff);
+    log(`Done. Duration: ${handoff.metrics.durationMs}ms, Tools: ${handoff.metrics.toolCallCount}, Tokens: ${handoff.metrics.tokensUsed}`);
+    return;
+  }
+
+  mkdirSync(RESULTS_DIR, { recursive: true });
+  for (const [i, batchTask] of tasks.entries()) {
+    if (i > 0) {
+      // Same base for every task: drop the previous task's tree, branch from baseSha.
+      log(`Batch task ${i + 1}/${tasks.length}: ${batchTask.id} — ${batchTask.description.slice(0, 80)}`);
+      safeExec("git reset -q --hard && git clean -fdq", WORK_DIR);
+      safeExec(`git checkout -q -B ${batchTask.branch} ${baseSha}`, WORK_DIR);
+    }
+    let handoff: Handoff;
+    try {
+      handoff = await runAgentTask(batchTask, baseSha, ctx);
+    } catch (err: unknown) {
+      const message = err instanceof Error ? err.message : String(err);
+      log(`ERROR: batch task ${batchTask.id} crashed: ${message}`);
+      handoff = failedHandoff(batchTask.id, `Worker crashed: ${message}`, message, "Check worker logs for stack trace");
+    }
+    workerSpan?.event("sandbox.batchTaskEnd", { taskId: batchTask.id, status: handoff.status, durationMs: handoff.metrics.durationMs });
+    writeResult(handoff, `${RESULTS_DIR}/${batchTask.id}.json`);
+  }
+  workerSpan?.setAttributes({ batchSize: tasks.length, durationMs: Date.now() - startTime });
+  workerSpan?.setStatus("ok");
+  workerSpan?.end();
+  closeTracing();
+  log(`Done. Batch of ${tasks.length}, duration: ${Date.now() - startTime}ms`);
+}
+
+interface AgentContext {
+  model: NonNullable<ReturnType<ModelRegistry["find"]>>;
+  authStorage: AuthStorage;
+  modelRegistry: ModelRegistry;
+  sparse: boolean;
+  workerSpan?: Span;
+}
+
+/** One agent session for `task` on the current branch; the diff is taken against `startSha`. */
+async function runAgentTask(task: Task, startSha: string, ctx: AgentContext): Promise<Handoff> {
+  const startTime = Date.now();
+  const { model, authStorage, modelRegistry, sparse, workerSpan } = ctx;
   workerSpan?.event("sandbox.agentSessionCreate");
   log("Creating agent session (full Pi capabilities)...");
   const { session } = await createAgentSession({
@@ -197,10 +330,16 @@ export async function runWorker(): Promise<void> {
   session.subscribe((event) => {
     if (event.type === "tool_execution_start") {
       toolCallCount++;
+      // Heartbeat for the spawner's stall detector (infra/stall_detector.py):
+      // long-running build/test commands get a longer silence window.
+      log(`Tool start: ${describeToolCall(event)}`);
       if (toolCallCount % 5 === 0) {
         log(`Tool calls: ${toolCallCount}`);
       }
     }
+    if (event.type === "tool_execution_end") {
+      log(`Tool end: ${describeToolCall(event)}`);
+    }
     if (event.type === "message_end" && "message" in event) {
       const msg = event.message;
       if (msg && typeof msg === "object" && "role" in msg && msg.role === "assistant") {
@@ -227,7 +366,7 @@ export async function runWorker(): Promise<void> {
     }
   });
 
-  const prompt = buildTaskPrompt(task);
+  const prompt = buildTaskPrompt(task, sparse);
   workerSpan?.event("sandbox.agentPromptStart");
   log("Running agent prompt...");
   await session.prompt(prompt);
@@ -279,7 +418,10 @@ export async function runWorker(): Promise<void> {
   }
 
   let buildExitCode: number | null = null;
-  if (!isEmptyResponse && existsSync(`${WORK_DIR}/tsconfig.json`)) {
+  // A sparse tree is missing most sources, so tsc would fail on unrelated imports.
+  if (sparse) {
+    log("Skipping post-agent build check — sparse checkout.");
+  } else if (!isEmptyResponse && existsSync(`${WORK_DIR}/tsconfig.json`)) {
     log("Running post-agent build check (tsc --noEmit)...");
     try {
       execSync("npx tsc --noEmit", { cwd: WORK_DIR, encoding: "utf-8", timeout: 60_000 });
@@ -349,20 +491,7 @@ export async function runWorker(): Promise<void> {
     },
   };
 
-  workerSpan?.setAttributes({
-    toolCallCount,
-    tokensUsed,
-    filesChanged: filesChanged.length,
-    linesAdded,
-    linesRemoved,
-    durationMs: handoff.metrics.durationMs,
-  });
-  workerSpan?.setStatus("ok");
-  workerSpan?.end();
-  closeTracing();
-
-  writeResult(handoff);
-  log(`Done. Duration: ${handoff.metrics.durationMs}ms, Tools: ${toolCallCount}, Tokens: ${tokensUsed}`);
+  return handoff;
 }
 
 function readTaskIdSafe(): string {
@@ -385,24 +514,12 @@ runWorker().catch((err: unknown) => {
   closeTracing();
 
   const taskId = readTaskIdSafe();
-  const failureHandoff: Handoff = {
+  const failureHandoff = failedHandoff(
     taskId,
-    status: "failed",
-    summary: `Worker crashed: ${errorMessage}`,
-    diff: "",
-    filesChanged: [],
-    concerns: [errorMessage],
-    suggestions: ["Check worker logs for stack trace"],
-    metrics: {
-      linesAdded: 0,
-      linesRemoved: 0,
-      filesCreated: 0,
-      filesModified: 0,
-      tokensUsed: 0,
-      toolCallCount: 0,
-      durationMs: 0,
-    },
-  };
+    `Worker crashed: ${errorMessage}`,
+    errorMessage,
+    "Check worker logs for stack trace",
+  );
 
   writeResult(failureHandoff);
   process.exit(1);
@@ -1,19 +1,24 @@
 import argparse
 import asyncio
 import json
+import math
 import os
+import platform
+import subprocess
 import sys
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Add repo root to path
 REPO_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(REPO_ROOT))
 
-import modal
-import aiohttp
+# modal / aiohttp are imported per test so the benchmark suite also runs
+# against the local backend on machines without them.
 
-from infra.sandbox_image import create_agent_image, create_worker_image
 
 def test_image_builds():
     """Verify the sandbox image builds and has all required tools."""
@@ -21,6 +26,10 @@ def test_image_builds():
     print("TEST 1: Image Build & Tool Verification")
     print("=" * 60)
 
+    import modal
+
+    from infra.sandbox_image import create_agent_image
+
     app = modal.App.lookup("agentswarm-test", create_if_missing=True)
     image = create_agent_image()
 
@@ -70,6 +79,10 @@ def test_sandbox_basic():
     print("TEST 2: Basic Sandbox Operations")
     print("=" * 60)
 
+    import modal
+
+    from infra.sandbox_image import create_agent_image
+
     app = modal.App.lookup("agentswarm-test", create_if_missing=True)
     image = create_agent_image()
 
@@ -142,6 +155,11 @@ async def test_agent_server():
     print("TEST 3: Agent HTTP Server")
     print("=" * 60)
 
+    import aiohttp
+    import modal
+
+    from infra.sandbox_image import create_worker_image
+
     # Check if sandbox package is built
     dist_dir = REPO_ROOT / "packages" / "sandbox" / "dist"
     if not dist_dir.exists() or not (dist_dir / "server.js").exists():
@@ -229,6 +247,11 @@ async def test_full_agent(glm5_endpoint: str):
     print("TEST 4: Full Agent Loop (with GLM-5)")
     print("=" * 60)
 
+    import aiohttp
+    import modal
+
+    from infra.sandbox_image import create_worker_image
+
     # Load worker prompt
     prompt_path = REPO_ROOT / "prompts" / "worker.md"
     system_prompt = prompt_path.read_text()
@@ -367,6 +390,298 @@ async def test_full_agent(glm5_endpoint: str):
         sb.terminate()
 
 
+# =============================================================================
+# Benchmarks: sandbox lifecycle latency and throughput
+# =============================================================================
+#
+#   python scripts/test_sandbox.py bench                      # Modal if usable, else local
+#   python scripts/test_sandbox.py bench --backend local --concurrency 1,10
+#   python scripts/test_sandbox.py bench --compare bench-baseline.json
+#
+# Every sample goes through the same backend API run_task uses
+# (infra/sandbox_backend.py), so a provisioning change shows up here as it
+# would in production. Results are summarized as n/mean/p50/p95/p99 per
+# metric and written as JSON; --compare flags metrics whose p50 or p95 got
+# worse than a previous run by more than --regression.
+
+BENCH_SANDBOX_TIMEOUT = 600
+FILE_SIZES_MB = (1, 16)
+# Synthetic repos for clone timing: label -> (files, bytes per file).
+CLONE_REPOS = {"small": (50, 2_000), "medium": (500, 20_000), "large": (2_000, 50_000)}
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 < p <= 100)."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values: list[float], failures: int = 0) -> dict:
+    if not values:
+        return {"n": 0, "failures": failures}
+    return {
+        "n": len(values),
+        "failures": failures,
+        "mean": round(sum(values) / len(values), 4),
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "min": round(min(values), 4),
+        "max": round(max(values), 4),
+    }
+
+
+def modal_available() -> bool:
+    try:
+        import modal  # noqa: F401
+    except ImportError:
+        return False
+    return bool(os.environ.get("MODAL_TOKEN_ID")) or (Path.home() / ".modal.toml").exists()
+
+
+def bench_backend(name: str):
+    from infra.sandbox_backend import get_backend
+
+    if name == "auto":
+        name = "modal" if modal_available() else "local"
+    return get_backend(name)
+
+
+def _exec_ok(sb, *argv: str, timeout: int = 600) -> None:
+    proc = sb.exec(*argv, timeout=timeout)
+    proc.wait()
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(argv)} exited {proc.returncode}: {proc.stderr.read()[:300]}")
+
+
+def _provision(backend) -> tuple[object, float, float]:
+    """(sandbox, create seconds, seconds until the first exec returned)."""
+    start = time.perf_counter()
+    sb = backend.create(timeout=BENCH_SANDBOX_TIMEOUT)
+    created = time.perf_counter() - start
+    _exec_ok(sb, "true")
+    return sb, created, time.perf_counter() - start
+
+
+def bench_create(backend, iterations: int) -> dict:
+    create, ready = [], []
+    failures = 0
+    for _ in range(iterations):
+        try:
+            sb, created, until_ready = _provision(backend)
+        except Exception as e:
+            print(f"  create failed: {e}")
+            failures += 1
+            continue
+        create.append(created)
+        ready.append(until_ready)
+        sb.terminate()
+    return {"create_s": summarize(create, failures), "ready_s": summarize(ready, failures)}
+
+
+def bench_exec(sb, iterations: int) -> dict:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        _exec_ok(sb, "true")
+        samples.append(time.perf_counter() - start)
+    return {"exec_rtt_s": summarize(samples)}
+
+
+def bench_files(sb, iterations: int) -> dict:
+    """Write/read throughput through ``sb.open`` (MB/s) per file size."""
+    results = {}
+    for size_mb in FILE_SIZES_MB:
+        data = os.urandom(size_mb * 1024 * 1024)
+        path = f"/workspace/bench-{size_mb}mb.bin"
+        write, read = [], []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            f = sb.open(path, "wb")
+            f.write(data)
+            f.close()
+            write.append(size_mb / (time.perf_counter() - start))
+
+            start = time.perf_counter()
+            f = sb.open(path, "rb")
+            got = 0
+            while chunk := f.read(1 << 20):
+                got += len(chunk)
+            f.close()
+            read.append(size_mb / (time.perf_counter() - start))
+            if got != len(data):
+                raise RuntimeError(f"read back {got} of {len(data)} bytes from {path}")
+        results[f"write_{size_mb}mb_mbps"] = summarize(write)
+        results[f"read_{size_mb}mb_mbps"] = summarize(read)
+    return results
+
+
+def make_bench_repo(root: Path, files: int, file_bytes: int) -> Path:
+    """A throwaway git repo of incompressible files, bundled; returns the bundle path."""
+    repo = root / f"repo-{files}x{file_bytes}"
+    git = ["git", "-C", str(repo), "-c", "user.name=bench", "-c", "user.email=bench@localhost"]
+    subprocess.run(["git", "init", "-q", "-b", "main", str(repo)], check=True)
+    for i in range(files):
+        (repo / f"f{i:05d}.bin").write_bytes(os.urandom(file_bytes))
+    subprocess.run([*git, "add", "-A"], check=True)
+    subprocess.run([*git, "commit", "-q", "-m", "bench"], check=True)
+    bundle = root / f"{repo.name}.bundle"
+    subprocess.run([*git, "bundle", "create", "-q", str(bundle), "main"], check=True)
+    return bundle
+
+
+def bench_clone(sb, iterations: int, repo_urls: list[str]) -> dict:
+    """
+    Clone time versus repo size: synthetic repos are uploaded as git bundles
+    (upload timed separately) and cloned from disk inside the sandbox;
+    ``repo_urls`` are cloned over the network as run_task would.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="sandbox-bench-") as tmp:
+        for label, (files, file_bytes) in CLONE_REPOS.items():
+            bundle = make_bench_repo(Path(tmp), files, file_bytes)
+            start = time.perf_counter()
+            f = sb.open(f"/workspace/{label}.bundle", "wb")
+            with open(bundle, "rb") as src:
+                while chunk := src.read(1 << 20):
+                    f.write(chunk)
+            f.close()
+            upload = time.perf_counter() - start
+            samples = []
+            for i in range(iterations):
+                dest = f"/workspace/clone-{label}-{i}"
+                start = time.perf_counter()
+                _exec_ok(sb, "git", "clone", "-q", f"/workspace/{label}.bundle", dest)
+                samples.append(time.perf_counter() - start)
+                _exec_ok(sb, "rm", "-rf", dest)
+            results[f"clone_{label}_s"] = {
+                **summarize(samples),
+                "sizeMb": round(bundle.stat().st_size / 1024 / 1024, 1),
+                "uploadS": round(upload, 3),
+            }
+    for n, url in enumerate(repo_urls):
+        samples = []
+        for i in range(iterations):
+            dest = f"/workspace/clone-url{n}-{i}"
+            start = time.perf_counter()
+            _exec_ok(sb, "git", "clone", "-q", url, dest)
+            samples.append(time.perf_counter() - start)
+            _exec_ok(sb, "rm", "-rf", dest)
+        # Host part only: the URL may carry a token.
+        results[f"clone_url{n}_s"] = {**summarize(samples), "url": url.split("@")[-1]}
+    return results
+
+
+def bench_concurrency(backend, levels: list[int]) -> dict:
+    """Provision ``level`` sandboxes at once; per-sandbox ready latency and wall time per level."""
+    results = {}
+    for level in levels:
+        ready: list[float] = []
+        failures = 0
+        lock = threading.Lock()
+
+        def one() -> None:
+            nonlocal failures
+            try:
+                sb, _, until_ready = _provision(backend)
+            except Exception as e:
+                with lock:
+                    failures += 1
+                print(f"  [{level}] provision failed: {e}")
+                return
+            with lock:
+                ready.append(until_ready)
+            sb.terminate()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            for _ in range(level):
+                pool.submit(one)
+        wall = time.perf_counter() - start
+        summary = {**summarize(ready, failures), "wallS": round(wall, 3)}
+        results[f"concurrent_{level}_ready_s"] = summary
+        print(f"  concurrency {level}: p50 {summary.get('p50')}s, wall {wall:.1f}s, failures {failures}")
+    return results
+
+
+def run_benchmarks(backend, iterations: int, levels: list[int], repo_urls: list[str]) -> dict:
+    print("\n" + "=" * 60)
+    print(f"BENCHMARK: Sandbox Lifecycle ({backend.name} backend)")
+    print("=" * 60)
+    results: dict = {}
+
+    print("  Create latency...")
+    results.update(bench_create(backend, iterations))
+
+    sb, _, _ = _provision(backend)
+    try:
+        print("  Exec round trip...")
+        results.update(bench_exec(sb, iterations * 5))
+        print("  File throughput...")
+        results.update(bench_files(sb, iterations))
+        print("  Clone time vs repo size...")
+        results.update(bench_clone(sb, iterations, repo_urls))
+    finally:
+        sb.terminate()
+
+    print("  Concurrency...")
+    results.update(bench_concurrency(backend, levels))
+    return results
+
+
+def compare_results(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Metrics whose p50 or p95 got worse by more than ``threshold`` (throughputs: dropped)."""
+    regressions = []
+    for metric, summary in current["results"].items():
+        before = baseline.get("results", {}).get(metric)
+        if not before:
+            continue
+        higher_is_better = metric.endswith("_mbps")
+        for stat in ("p50", "p95"):
+            if not before.get(stat) or stat not in summary:
+                continue
+            ratio = summary[stat] / before[stat]
+            worse = ratio < 1 - threshold if higher_is_better else ratio > 1 + threshold
+            if worse:
+                regressions.append(f"{metric} {stat}: {before[stat]} -> {summary[stat]} ({ratio:.2f}x)")
+    return regressions
+
+
+def bench_main(args) -> bool:
+    backend = bench_backend(args.backend)
+    levels = [int(level) for level in args.concurrency.split(",") if level]
+    started = time.time()
+    results = run_benchmarks(backend, args.iterations, levels, args.repo_url)
+    report = {
+        "backend": backend.name,
+        "startedAt": started,
+        "durationS": round(time.time() - started, 1),
+        "host": platform.node(),
+        "config": {"iterations": args.iterations, "concurrency": levels, "repoUrls": len(args.repo_url)},
+        "results": results,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"\n  Results written to {args.output}")
+    for metric, summary in results.items():
+        print(
+            f"  {metric:28s} p50 {summary.get('p50', '-'):>9}  "
+            f"p95 {summary.get('p95', '-'):>9}  p99 {summary.get('p99', '-'):>9}"
+        )
+
+    if not args.compare:
+        return True
+    baseline = json.loads(Path(args.compare).read_text())
+    if baseline.get("backend") != report["backend"]:
+        print(f"  ⚠️  Baseline is from the {baseline.get('backend')} backend")
+    regressions = compare_results(report, baseline, args.regression)
+    for line in regressions:
+        print(f"  ❌ Regression: {line}")
+    if not regressions:
+        print(f"  ✅ No regressions beyond {args.regression:.0%} against {args.compare}")
+    return not regressions
+
+
 # =============================================================================
 # CLI
 # =============================================================================
@@ -375,18 +690,32 @@ def main():
     parser = argparse.ArgumentParser(description="AgentSwarm E2E Tests")
     parser.add_argument(
         "test",
-        choices=["image", "basic", "server", "full", "all"],
-        help="Which test to run",
+        choices=["image", "basic", "server", "full", "all", "bench"],
+        help="Which test to run ('bench' runs the lifecycle benchmarks; not part of 'all')",
     )
     parser.add_argument(
         "--glm5-endpoint",
         default=os.environ.get("GLM5_ENDPOINT", ""),
         help="GLM-5 endpoint URL (required for 'full' test)",
     )
+    bench = parser.add_argument_group("bench")
+    bench.add_argument("--backend", choices=["auto", "modal", "local"], default="auto",
+                       help="Sandbox backend (auto: Modal when installed and configured, else local)")
+    bench.add_argument("--iterations", type=int, default=10, help="Samples per sequential metric")
+    bench.add_argument("--concurrency", default="1,10,50,100", help="Comma-separated concurrent sandbox counts")
+    bench.add_argument("--repo-url", action="append", default=[],
+                       help="Also time a network clone of this URL (repeatable)")
+    bench.add_argument("--output", default="sandbox-bench.json", help="Where to write the JSON results")
+    bench.add_argument("--compare", default="", help="Previous results JSON to check for regressions")
+    bench.add_argument("--regression", type=float, default=0.2,
+                       help="Relative p50/p95 change that counts as a regression")
     args = parser.parse_args()
 
     results = {}
 
+    if args.test == "bench":
+        results["bench"] = bench_main(args)
+
     if args.test in ("image", "all"):
         results["image"] = test_image_builds()
 